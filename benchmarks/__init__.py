@@ -0,0 +1,11 @@
+"""Benchmarks for totem.
+
+These are not part of the package and are not collected by pytest.
+Run them from the root of the repository with:
+
+    python -m benchmarks [--baseline FILE] [--save-baseline] [NAME_PATTERN ...]
+
+Each benchmark module exposes a `get_benchmarks(options)` function
+that returns the benchmarks it contains. See `benchmarks.core`
+for how results are measured and compared against a baseline.
+"""
@@ -0,0 +1,186 @@
+"""Run the benchmarks from the command line.
+
+Examples:
+
+    # Record a baseline before making a change
+    python -m benchmarks --save-baseline
+
+    # Compare against it afterwards; exits with 1 if anything regressed,
+    # failed or is missing compared to the baseline
+    python -m benchmarks
+
+    # Only run the local hook benchmarks, with smaller repositories
+    python -m benchmarks 'hooks.*' --commits 10,1000
+
+    # Only run the microbenchmarks of the checks and store the results
+    python -m benchmarks 'checks.*' --output results.json
+"""
+
+import argparse
+import importlib
+import os
+import sys
+from typing import Dict, List
+
+from benchmarks.core import (
+    DEFAULT_THRESHOLD,
+    create_document,
+    find_missing,
+    find_regressions,
+    load_document,
+    run_benchmarks,
+    save_document,
+)
+
+# The modules that contain benchmarks, in the order they run
+MODULES = [
+    'benchmarks.checks',
+    'benchmarks.startup',
+    'benchmarks.hooks',
+    'benchmarks.pr',
+]
+
+DEFAULT_BASELINE_PATH = os.path.join('.benchmarks', 'baseline.json')
+
+
+def main(argv: List[str] = None) -> int:
+    """Run all selected benchmarks and compare them against the baseline.
+
+    :param list argv: the command line arguments
+    :return: the exit code
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument(
+        'patterns', nargs='*', help='Only run benchmarks whose name matches these'
+    )
+    parser.add_argument(
+        '--baseline',
+        default=DEFAULT_BASELINE_PATH,
+        help='The JSON file with the baseline results',
+    )
+    parser.add_argument(
+        '--save-baseline',
+        action='store_true',
+        help='Store the results as the new baseline instead of comparing',
+    )
+    parser.add_argument('--output', help='Also store the results in this JSON file')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help='The allowed relative slowdown of the median (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=5, help='The number of timed runs'
+    )
+    parser.add_argument(
+        '--commits',
+        type=_parse_sizes,
+        default=[10, 1000, 100000],
+        help='The sizes of the repositories, as comma-separated commit counts',
+    )
+    parser.add_argument(
+        '--pr-commits',
+        type=_parse_sizes,
+        default=[10, 250],
+        help='The sizes of the pull requests, as comma-separated commit counts',
+    )
+    parser.add_argument(
+        '--api-latency',
+        type=float,
+        default=0,
+        help='The latency of every response of the fake Github API, in seconds',
+    )
+    parser.add_argument(
+        '--batch-sizes',
+        type=_parse_sizes,
+        default=[100, 10000],
+        help='The numbers of commits and titles the checks are run on',
+    )
+    parser.add_argument(
+        '--body-sizes',
+        type=_parse_sizes,
+        default=[10000, 1000000],
+        help='The sizes of the PR bodies the checks are run on, in bytes',
+    )
+    parser.add_argument(
+        '--pattern-counts',
+        type=_parse_sizes,
+        default=[10, 100],
+        help='The numbers of patterns of the PR body include/exclude checks',
+    )
+    options = parser.parse_args(argv)
+
+    benchmarks = []
+    skipped = []
+    for name in MODULES:
+        try:
+            module = importlib.import_module(name)
+        except ImportError as e:
+            print('Skipping {}: {}'.format(name, e))
+            skipped.append(name)
+            continue
+        benchmarks.extend(module.get_benchmarks(options))
+
+    errors: Dict[str, str] = {}
+    results = run_benchmarks(benchmarks, options.patterns, errors=errors)
+    print(
+        '{} benchmarks succeeded, {} failed, {} modules skipped'.format(
+            len(results), len(errors), len(skipped)
+        )
+    )
+    document = create_document(results)
+    if options.output:
+        save_document(document, options.output)
+
+    if options.save_baseline:
+        if errors:
+            print('Not storing an incomplete baseline, since benchmarks failed')
+            return 1
+        save_document(document, options.baseline)
+        print('Baseline stored in "{}"'.format(options.baseline))
+        return 0
+
+    baseline = load_document(options.baseline)
+    if baseline is None:
+        print('No baseline found in "{}"'.format(options.baseline))
+        return 1 if errors else 0
+
+    missing = find_missing(results, baseline, options.patterns)
+    for name in missing:
+        print('Missing: {} is in the baseline but has no results'.format(name))
+    regressions = find_regressions(results, baseline, options.threshold)
+    for regression in regressions:
+        if regression['metric'] == 'peak_memory':
+            template = (
+                'Regression: {name} allocated {current:,.1f} KiB, {change:.0%} '
+                'more than the baseline ({baseline:,.1f} KiB)'
+            )
+            scale = 1 / 1024
+        else:
+            template = (
+                'Regression: {name} took {current:.2f} ms, {change:.0%} slower '
+                'than the baseline ({baseline:.2f} ms)'
+            )
+            scale = 1000
+        print(
+            template.format(
+                name=regression['name'],
+                current=regression['current'] * scale,
+                baseline=regression['baseline'] * scale,
+                change=regression['change'],
+            )
+        )
+    if regressions or missing or errors:
+        return 1
+    print('No regressions beyond {:.0%}'.format(options.threshold))
+    return 0
+
+
+def _parse_sizes(value: str) -> List[int]:
+    return [int(x) for x in value.split(',') if x.strip()]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
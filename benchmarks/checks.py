@@ -0,0 +1,383 @@
+"""Microbenchmarks of the checks in `totem.checks.checks`, as their input grows.
+
+Each benchmark runs a check on synthetic content and reports its throughput
+in items per second (branch names, titles, commits or bytes of a PR body)
+and the peak memory allocated by a single run. The content is created
+before timing starts, so neither its creation nor its size are measured.
+
+The content is generated with a fixed seed, so that every run and every
+commit checks exactly the same data and results can be compared.
+"""
+
+import contextlib
+import functools
+import random
+import string
+from typing import List, Tuple
+
+from benchmarks.core import Benchmark
+
+SEED = 42
+
+# The words that synthetic text is made of
+WORDS = (
+    'add fix update remove refactor improve handle support allow make use '
+    'check config parser report branch commit message title body pattern '
+    'cache suite result provider factory service request response error '
+    'the a of for to in on with from when if and or not'
+).split()
+
+# The configuration of the commit message check, as in contrib/config/sample.yml
+COMMIT_MESSAGE_OPTIONS = {
+    'subject': {
+        'min_length': 10,
+        'max_length': 50,
+        'pattern': r'^[A-Z].+(?<!\.)$',
+        'pattern_descr': 'Commit message subject must start with a capital letter',
+    },
+    'body': {
+        'max_line_length': 72,
+        'smart_require': {'min_changes': 15, 'min_body_lines': 3},
+    },
+}
+
+
+def get_benchmarks(options) -> List[Benchmark]:
+    """Return a benchmark for each check and size of input.
+
+    :param argparse.Namespace options: the command line options
+    :rtype: list
+    """
+    benchmarks = []
+
+    def add(name, prepare, items):
+        benchmarks.append(
+            Benchmark(
+                name, prepare, repeat=options.repeat, items=items, trace_memory=True
+            )
+        )
+
+    for size in options.batch_sizes:
+        add(
+            'checks.branch_name[items={}]'.format(size),
+            lambda size=size: prepare_branch_names(size),
+            size,
+        )
+        add(
+            'checks.pr_title[items={}]'.format(size),
+            lambda size=size: prepare_titles(size),
+            size,
+        )
+        add(
+            'checks.commit_message.run[commits={}]'.format(size),
+            lambda size=size: prepare_commit_messages(size, columnar=False),
+            size,
+        )
+        add(
+            'checks.commit_message.run_many[commits={}]'.format(size),
+            lambda size=size: prepare_commit_messages(size, columnar=True),
+            size,
+        )
+        # Parsing should never be slower than splitting the messages into
+        # stripped lines, as the commit message check used to do
+        add(
+            'checks.messages.measure[commits={}]'.format(size),
+            lambda size=size: prepare_message_parsing(size, split=False),
+            size,
+        )
+        add(
+            'checks.messages.split[commits={}]'.format(size),
+            lambda size=size: prepare_message_parsing(size, split=True),
+            size,
+        )
+
+    for size in options.body_sizes:
+        add(
+            'checks.pr_body_checklist[bytes={}]'.format(size),
+            lambda size=size: prepare_checklist(size),
+            size,
+        )
+        for count in options.pattern_counts:
+            for check_type in ('pr_body_includes', 'pr_body_excludes'):
+                add(
+                    'checks.{}[patterns={},bytes={}]'.format(check_type, count, size),
+                    functools.partial(prepare_body_patterns, check_type, size, count),
+                    size,
+                )
+
+    return benchmarks
+
+
+@contextlib.contextmanager
+def prepare_branch_names(count: int):
+    """Yield a function that checks the given number of branch names.
+
+    :param int count: the number of branch names
+    """
+    from totem.checks.checks import BranchNameCheck
+    from totem.checks.config import CheckConfig
+
+    check = BranchNameCheck(CheckConfig('branch_name', 'error'))
+    names = generate_branch_names(count)
+    yield lambda: [check.run({'branch': name}) for name in names]
+
+
+@contextlib.contextmanager
+def prepare_titles(count: int):
+    """Yield a function that checks the given number of PR titles.
+
+    :param int count: the number of titles
+    """
+    from totem.checks.checks import PRTitleCheck
+    from totem.checks.config import CheckConfig
+
+    check = PRTitleCheck(CheckConfig('pr_title', 'error', pattern='^[A-Z].+$'))
+    titles = [generate_subject(x) for x in _get_randoms(count)]
+    yield lambda: [check.run({'title': title}) for title in titles]
+
+
+@contextlib.contextmanager
+def prepare_commit_messages(count: int, columnar: bool):
+    """Yield a function that checks a batch of commits with
+    CommitMessagesCheck, either via `run()` or via `run_many()`.
+
+    :param int count: the number of commits
+    :param bool columnar: if True, the commits are given as columns
+        to `run_many()`, otherwise as CommitInfo objects to `run()`
+    """
+    from totem.checks.checks import CommitMessagesCheck
+    from totem.checks.config import CheckConfig
+
+    check = CommitMessagesCheck(
+        CheckConfig('commit_message', 'error', **COMMIT_MESSAGE_OPTIONS)
+    )
+    commits = generate_commits(count)
+    if columnar:
+        batch = {
+            'message': [x.message for x in commits],
+            'total': [x.total for x in commits],
+            'sha': [x.sha for x in commits],
+            'url': [x.url for x in commits],
+        }
+        yield lambda: check.run_many(batch)
+    else:
+        content = {'commits': commits}
+        yield lambda: check.run(content)
+
+
+@contextlib.contextmanager
+def prepare_message_parsing(count: int, split: bool):
+    """Yield a function that finds the subject length, the number of body
+    lines and the longest body line of a batch of commit messages.
+
+    :param int count: the number of messages
+    :param bool split: if True, the messages are split into stripped lines
+        with `split_message()`, otherwise they are measured with
+        `measure_message()`, as the commit message check does
+    """
+    from totem.checks.messages import measure_message
+
+    messages = [x.message for x in generate_commits(count)]
+    if split:
+        yield lambda: [split_message(message) for message in messages]
+    else:
+        yield lambda: [measure_message(message) for message in messages]
+
+
+def split_message(message: str) -> Tuple[int, int, int]:
+    """Return the subject length, the number of body lines and the length
+    of the longest body line of the given commit message, by splitting it
+    into stripped lines, as the commit message check did before
+    `measure_message()` existed.
+
+    :param str message: the full commit message
+    :rtype: tuple
+    """
+    lines = [line.strip() for line in message.splitlines()]
+    subject = message.rstrip('\n')
+    body_lines: List[str] = []
+    if '' in lines:
+        separator_index = lines.index('')
+        subject = '\n'.join(lines[0:separator_index])
+        body_lines = lines[separator_index + 1 :]
+    return len(subject), len(body_lines), max([len(x) for x in body_lines] or [0])
+
+
+@contextlib.contextmanager
+def prepare_checklist(size: int):
+    """Yield a function that checks a PR body of the given size
+    for unfinished checklist items.
+
+    :param int size: the size of the body in bytes
+    """
+    from totem.checks.checks import PRBodyChecklistCheck
+    from totem.checks.config import CheckConfig
+
+    check = PRBodyChecklistCheck(CheckConfig('pr_body_checklist', 'error'))
+    content = {'body': generate_body(size)}
+    yield lambda: check.run(content)
+
+
+@contextlib.contextmanager
+def prepare_body_patterns(check_type: str, size: int, count: int):
+    """Yield a function that searches a PR body of the given size
+    for the given number of patterns.
+
+    :param str check_type: either 'pr_body_includes' or 'pr_body_excludes'
+    :param int size: the size of the body in bytes
+    :param int count: the number of patterns
+    """
+    from totem.checks.checks import PRBodyExcludesCheck, PRBodyIncludesCheck
+    from totem.checks.config import CheckConfig
+
+    classes = {
+        'pr_body_includes': PRBodyIncludesCheck,
+        'pr_body_excludes': PRBodyExcludesCheck,
+    }
+    patterns = generate_patterns(count)
+
+    # Half of the patterns appear in the body, at random positions
+    found = [_get_pattern_text(x) for x in range(0, count, 2)]
+    check = classes[check_type](CheckConfig(check_type, 'error', patterns=patterns))
+    content = {'body': generate_body(size, extra_lines=found)}
+    yield lambda: check.run(content)
+
+
+def generate_branch_names(count: int) -> List[str]:
+    """Return the given number of branch names; most of them are valid
+    for the default pattern of the branch name check.
+
+    :param int count: the number of names
+    :rtype: list
+    """
+    names = []
+    for rnd in _get_randoms(count):
+        name = '-'.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 6)))
+        if rnd.random() < 0.1:
+            name = 'feature/{}'.format(name)
+        names.append(name)
+    return names
+
+
+def generate_subject(rnd: random.Random) -> str:
+    """Return a commit subject or PR title; most of them are valid,
+    but some are too short, too long, lowercase or end with a dot.
+
+    :param random.Random rnd: the random generator to use
+    :rtype: str
+    """
+    subject = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 12)))
+    if rnd.random() < 0.8:
+        subject = subject.capitalize()
+    if rnd.random() < 0.1:
+        subject += '.'
+    return subject
+
+
+def generate_commits(count: int):
+    """Return the given number of commits, with a realistic mix
+    of messages that pass and fail the commit message check.
+
+    :param int count: the number of commits
+    :return: a list of CommitInfo objects
+    :rtype: list
+    """
+    from totem.checks.records import CommitInfo
+
+    commits = []
+    for index, rnd in enumerate(_get_randoms(count)):
+        message = generate_subject(rnd)
+        if rnd.random() < 0.7:
+            lines = []
+            for _ in range(rnd.randint(1, 8)):
+                words = rnd.randint(3, 16)
+                lines.append(' '.join(rnd.choice(WORDS) for _ in range(words)))
+            message = '{}\n\n{}\n'.format(message, '\n'.join(lines))
+        additions = int(rnd.expovariate(1 / 20))
+        deletions = int(rnd.expovariate(1 / 10))
+        commits.append(
+            CommitInfo(
+                message,
+                sha='{:040x}'.format(index),
+                url='https://github.com/owner/repo/commit/{:040x}'.format(index),
+                additions=additions,
+                deletions=deletions,
+            )
+        )
+    return commits
+
+
+def generate_body(size: int, extra_lines: List[str] = None) -> str:
+    """Return a markdown PR body of approximately the given size,
+    made of paragraphs and checklists, with some unfinished items.
+
+    :param int size: the size of the body in bytes
+    :param list extra_lines: lines to insert at random positions
+    :rtype: str
+    """
+    rnd = random.Random(SEED)
+    lines = []
+    length = 0
+    while length < size:
+        if rnd.random() < 0.2:
+            mark = ' ' if rnd.random() < 0.1 else 'x'
+            line = '- [{}] {}'.format(
+                mark, ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 8)))
+            )
+        else:
+            line = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(5, 20)))
+        lines.append(line)
+        length += len(line) + 1
+
+    for line in extra_lines or []:
+        lines.insert(rnd.randrange(len(lines) + 1), line)
+    return '\n'.join(lines)
+
+
+def generate_patterns(count: int) -> List[str]:
+    """Return the given number of patterns, as they would appear
+    in the configuration of the PR body include/exclude checks.
+
+    Each pattern matches the text returned by `_get_pattern_text()`
+    for the same index and is unlikely to match anything else.
+
+    :param int count: the number of patterns
+    :rtype: list
+    """
+    patterns = []
+    for index in range(count):
+        kind = index % 3
+        if kind == 0:
+            patterns.append(r'Ticket-{}\b'.format(1000 + index))
+        elif kind == 1:
+            patterns.append(r'^#+ Section {}$'.format(index))
+        else:
+            patterns.append(r'Reviewed-by-\w+-{}'.format(index))
+    return patterns
+
+
+def _get_pattern_text(index: int) -> str:
+    """Return a line that matches the pattern of the given index.
+
+    :param int index: the index of the pattern, as in `generate_patterns()`
+    :rtype: str
+    """
+    kind = index % 3
+    if kind == 0:
+        return 'Related to Ticket-{}'.format(1000 + index)
+    elif kind == 1:
+        return '## Section {}'.format(index)
+    return 'Reviewed-by-{}-{}'.format(
+        random.Random(index).choice(string.ascii_lowercase), index
+    )
+
+
+def _get_randoms(count: int):
+    """Generate a seeded random generator for each of the given number of items,
+    so that the items are the same on every run.
+
+    :param int count: the number of items
+    """
+    rnd = random.Random(SEED)
+    for _ in range(count):
+        yield rnd
@@ -0,0 +1,338 @@
+"""Contains the functionality for running benchmarks and comparing
+their results against a baseline.
+
+A benchmark is prepared once, e.g. by creating a repository, and then
+its body is timed for a number of runs. Benchmarks that process a known number
+of items also report their throughput, and can measure the peak memory
+allocated by a single run. The median duration and the peak memory of each
+benchmark are compared to the ones stored in the baseline; if either is higher
+by more than a threshold, the benchmark is reported as a regression.
+
+Baselines depend on the machine they were recorded on, so they are not
+stored in the repository. Record one with `--save-baseline` before making
+a change, then run the benchmarks again after the change.
+"""
+
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, Iterable, List, Union
+
+RESULTS_VERSION = 1
+
+# The default relative increase of a metric that counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# The metrics that are compared against the baseline; lower is better for all
+COMPARED_METRICS = ('median', 'peak_memory')
+
+
+class Benchmark:
+    """A single benchmark.
+
+    The `prepare` callable returns a context manager that sets up
+    everything the benchmark needs, yields the function to be timed
+    and cleans up on exit.
+
+    The timed function may return the duration of the run in seconds,
+    if only a part of its work should be measured, e.g. when it runs
+    something in a subprocess. Otherwise the whole call is timed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prepare: Callable[[], ContextManager[Callable]],
+        repeat: int = 5,
+        warmup: int = 1,
+        items: int = None,
+        trace_memory: bool = False,
+    ):
+        """Constructor.
+
+        :param str name: the unique name of the benchmark
+        :param callable prepare: a callable that returns a context manager
+            which yields the function to time
+        :param int repeat: the number of timed runs
+        :param int warmup: the number of runs to do before timing
+        :param int items: the number of items each run processes, if known,
+            e.g. commits or bytes; used for calculating the throughput
+        :param bool trace_memory: if True, the peak memory allocated by
+            a single run is also measured, in an extra run that is not timed
+        """
+        self.name = name
+        self.prepare = prepare
+        self.repeat = repeat
+        self.warmup = warmup
+        self.items = items
+        self.trace_memory = trace_memory
+
+    def run(self) -> dict:
+        """Prepare the benchmark, time all its runs and return the statistics.
+
+        :return: the statistics of all runs, in seconds
+        :rtype: dict
+        """
+        with self.prepare() as func:
+            for _ in range(self.warmup):
+                func()
+            durations = [_time(func) for _ in range(self.repeat)]
+            peak_memory = _trace_peak_memory(func) if self.trace_memory else None
+
+        stats = get_statistics(durations)
+        if self.items is not None:
+            stats['items'] = self.items
+            if stats['median']:
+                stats['throughput'] = self.items / stats['median']
+        if peak_memory is not None:
+            stats['peak_memory'] = peak_memory
+        return stats
+
+
+@contextmanager
+def prepared(func: Callable):
+    """Yield the given function, for benchmarks that need no set-up.
+
+    :param callable func: the function to time
+    """
+    yield func
+
+
+def get_statistics(durations: List[float]) -> dict:
+    """Return the statistics of the given durations.
+
+    :param list durations: the duration of each run, in seconds
+    :rtype: dict
+    """
+    return {
+        'unit': 'seconds',
+        'runs': len(durations),
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'mean': statistics.mean(durations),
+        'max': max(durations),
+    }
+
+
+def run_benchmarks(
+    benchmarks: Iterable[Benchmark],
+    patterns: List[str] = None,
+    output=sys.stdout,
+    errors: Dict[str, str] = None,
+) -> Dict[str, dict]:
+    """Run all given benchmarks whose name matches any of the given patterns.
+
+    :param iterable benchmarks: the benchmarks to run
+    :param list patterns: shell-style patterns; if empty, all benchmarks run
+    :param output: a file object to write the progress to
+    :param dict errors: if given, the error of each benchmark that failed
+        is added to it, with the name of the benchmark as the key
+    :return: the statistics of each benchmark that succeeded,
+        with its name as the key
+    :rtype: dict
+    """
+    results = {}
+    for benchmark in benchmarks:
+        if not matches(benchmark.name, patterns):
+            continue
+        output.write('{} ... '.format(benchmark.name))
+        output.flush()
+        try:
+            stats = benchmark.run()
+        except Exception as e:
+            output.write('error: {}\n'.format(e))
+            if errors is not None:
+                errors[benchmark.name] = str(e)
+            continue
+        results[benchmark.name] = stats
+        output.write('{}\n'.format(format_statistics(stats)))
+    return results
+
+
+def matches(name: str, patterns: List[str] = None) -> bool:
+    """Return True if the given benchmark name matches any of the given patterns.
+
+    :param str name: the name of a benchmark
+    :param list patterns: shell-style patterns; if empty, all names match
+    :rtype: bool
+    """
+    return not patterns or any(fnmatch.fnmatch(name, x) for x in patterns)
+
+
+def format_statistics(stats: dict) -> str:
+    """Return a short, human-readable version of the given statistics.
+
+    :param dict stats: the statistics of a benchmark
+    :rtype: str
+    """
+    text = 'median {:.2f} ms (min {:.2f} ms, max {:.2f} ms, {} runs)'.format(
+        stats['median'] * 1000, stats['min'] * 1000, stats['max'] * 1000, stats['runs']
+    )
+    if stats.get('throughput'):
+        text += ', {:,.0f} items/s'.format(stats['throughput'])
+    if stats.get('peak_memory') is not None:
+        text += ', peak {:,.1f} KiB'.format(stats['peak_memory'] / 1024)
+    return text
+
+
+def create_document(results: Dict[str, dict]) -> dict:
+    """Return a document with the given results and information about
+    the environment they were measured in, to be stored as JSON.
+
+    :param dict results: the statistics of each benchmark
+    :rtype: dict
+    """
+    return {
+        'version': RESULTS_VERSION,
+        'commit': _get_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created_at': time.time(),
+        'results': results,
+    }
+
+
+def load_document(path: str) -> Union[dict, None]:
+    """Load a results document from the given path.
+
+    :param str path: the path of the JSON file
+    :return: the document, or None if the file does not exist
+    :rtype: dict
+    :raise ValueError: if the file is not a valid results document
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        document = json.load(f)
+    if document.get('version') != RESULTS_VERSION:
+        raise ValueError('Unsupported results version in "{}"'.format(path))
+    return document
+
+
+def save_document(document: dict, path: str):
+    """Store the given results document as JSON.
+
+    :param dict document: the document to store
+    :param str path: the path of the JSON file
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def find_regressions(
+    results: Dict[str, dict], baseline: dict, threshold: float = DEFAULT_THRESHOLD
+) -> List[dict]:
+    """Compare the given results with a baseline and return every metric
+    that increased more than the threshold allows.
+
+    The median duration and the peak memory are compared. Benchmarks
+    and metrics that do not exist in the baseline are ignored.
+
+    :param dict results: the statistics of each benchmark
+    :param dict baseline: a results document, as created by `create_document()`
+    :param float threshold: the allowed relative increase of each metric,
+        e.g. 0.25 allows a benchmark to be up to 25% slower
+    :return: a list of dictionaries like
+        {
+          'name': <name>,
+          'metric': <metric>,
+          'baseline': <value>,
+          'current': <value>,
+          'change': <ratio>,
+        }
+    :rtype: list
+    """
+    regressions = []
+    for name, stats in sorted(results.items()):
+        previous = baseline['results'].get(name) or {}
+        for metric in COMPARED_METRICS:
+            if not previous.get(metric) or stats.get(metric) is None:
+                continue
+            change = stats[metric] / previous[metric] - 1
+            if change > threshold:
+                regressions.append(
+                    {
+                        'name': name,
+                        'metric': metric,
+                        'baseline': previous[metric],
+                        'current': stats[metric],
+                        'change': change,
+                    }
+                )
+    return regressions
+
+
+def find_missing(
+    results: Dict[str, dict], baseline: dict, patterns: List[str] = None
+) -> List[str]:
+    """Return the benchmarks of the baseline that were selected
+    but have no results, e.g. because they failed or could not be loaded.
+
+    :param dict results: the statistics of each benchmark
+    :param dict baseline: a results document, as created by `create_document()`
+    :param list patterns: the shell-style patterns that selected the benchmarks
+    :return: the names of the missing benchmarks, sorted
+    :rtype: list
+    """
+    return sorted(
+        name
+        for name in baseline['results']
+        if name not in results and matches(name, patterns)
+    )
+
+
+def _time(func: Callable) -> float:
+    """Call the given function and return the duration of the call in seconds,
+    or the duration the function itself returned.
+
+    :param callable func: the function to time
+    :rtype: float
+    """
+    start = time.perf_counter()
+    duration = func()
+    if isinstance(duration, (int, float)):
+        return float(duration)
+    return time.perf_counter() - start
+
+
+def _trace_peak_memory(func: Callable) -> int:
+    """Call the given function and return the peak memory it allocated.
+
+    :param callable func: the function to call
+    :return: the peak size of the allocated memory, in bytes
+    :rtype: int
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _get_commit() -> Union[str, None]:
+    """Return the Git commit the benchmarks ran on, if known.
+
+    :return: the SHA of the commit, or None
+    :rtype: str
+    """
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('utf-8').strip()
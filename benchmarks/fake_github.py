@@ -0,0 +1,630 @@
+"""A local stand-in for the parts of the Github REST API that totem uses:
+repositories, pull requests, commits and issue comments.
+
+It serves a single repository with a single pull request, its commits
+and its comments, from memory. Point totem to it by setting
+the GITHUB_API_URL environment variable to `server.url`.
+
+In order to reproduce the behaviour of the real API offline, it can:
+ - delay every response by a fixed latency, plus random jitter
+ - paginate lists with a configurable page size, via Link headers
+ - send rate limit headers and reject requests once the limit is spent
+ - respond with errors to matching requests (see `ErrorRule`)
+
+It can also run on its own, e.g. for load testing a PR run by hand:
+
+    python -m benchmarks.fake_github --port 8000 --commits 250 --latency 0.05
+    GITHUB_API_URL=http://127.0.0.1:8000 totem -p https://github.com/owner/repo/pull/1
+
+Totem does not use the GraphQL API, so it is not provided.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import List, Tuple, Union
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+REPO_NAME = 'owner/repo'
+
+PR_NUMBER = 1
+
+# The page size Github uses, unless told otherwise, and the maximum it allows
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+
+# The number of requests Github allows per hour to authenticated users
+DEFAULT_RATE_LIMIT = 5000
+RATE_LIMIT_WINDOW = 3600
+
+
+class ErrorRule:
+    """Makes the fake API respond with an error to the requests that match it,
+    instead of the actual response.
+
+    >>> server.inject_error(502, path='/pulls/1/commits', times=2)
+    >>> server.inject_error(500, probability=0.1)
+    """
+
+    def __init__(
+        self,
+        status: int,
+        path: str = None,
+        method: str = None,
+        times: int = None,
+        probability: float = None,
+        message: str = None,
+        headers: dict = None,
+    ):
+        """Constructor.
+
+        :param int status: the status code of the error response
+        :param str path: a regex that is searched for in the path of the request;
+            if not given, all paths match
+        :param str method: the HTTP method of the matching requests;
+            if not given, all methods match
+        :param int times: the maximum number of times to respond with the error;
+            if not given, there is no limit
+        :param float probability: the probability of responding with the error
+            to a matching request, from 0 to 1; if not given, it always does
+        :param str message: the message of the error response
+        :param dict headers: extra headers of the error response, e.g. Retry-After
+        """
+        self.status = status
+        self.path = path
+        self.method = method
+        self.times = times
+        self.probability = probability
+        self.message = message or 'Injected error'
+        self.headers = headers or {}
+
+    def matches(self, method: str, path: str, rnd: random.Random) -> bool:
+        """Return True if the given request should get this error.
+
+        Every match counts towards the maximum number of times.
+
+        :param str method: the HTTP method of the request
+        :param str path: the path of the request
+        :param random.Random rnd: the random generator to use for the probability
+        :rtype: bool
+        """
+        if self.times is not None and self.times <= 0:
+            return False
+        if self.method and self.method != method:
+            return False
+        if self.path and not re.search(self.path, path):
+            return False
+        if self.probability is not None and rnd.random() >= self.probability:
+            return False
+        if self.times is not None:
+            self.times -= 1
+        return True
+
+
+class FakeGithubServer:
+    """Serves a fake Github API on a local port, in a background thread.
+
+    Can be used as a context manager:
+    >>> with FakeGithubServer(commits=100, latency=0.05) as server:
+    ...     os.environ['GITHUB_API_URL'] = server.url
+    """
+
+    def __init__(
+        self,
+        commits: int = 10,
+        body: str = None,
+        branch: str = 'feature',
+        latency: float = 0,
+        jitter: float = 0,
+        page_size: int = DEFAULT_PER_PAGE,
+        rate_limit: int = DEFAULT_RATE_LIMIT,
+        port: int = 0,
+        seed: int = 0,
+    ):
+        """Constructor.
+
+        :param int commits: the number of commits of the pull request
+        :param str body: the body of the pull request
+        :param str branch: the name of the branch of the pull request
+        :param float latency: the time in seconds to wait before every response
+        :param float jitter: the maximum random time in seconds to add
+            to the latency of every response
+        :param int page_size: the number of items per page of lists,
+            if the client does not define it
+        :param int rate_limit: the number of requests allowed per hour
+        :param int port: the port to listen to; a random free port if 0
+        :param int seed: the seed of the random jitter and injected errors
+        """
+        self.state = FakeGithubState(
+            commits=commits,
+            body=body,
+            branch=branch,
+            latency=latency,
+            jitter=jitter,
+            page_size=page_size,
+            rate_limit=rate_limit,
+            seed=seed,
+        )
+        self.port = port
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """The base URL of the API."""
+        host, port = self._httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def pr_url(self) -> str:
+        """The URL of the pull request, as given to totem."""
+        return 'https://github.com/{}/pull/{}'.format(REPO_NAME, PR_NUMBER)
+
+    @property
+    def requests(self) -> List[Tuple[str, str]]:
+        """All requests received so far, as (method, path) tuples."""
+        return list(self.state.requests)
+
+    def inject_error(self, status: int, **options) -> ErrorRule:
+        """Respond with the given status code to matching requests.
+
+        :param int status: the status code of the error response
+        :param options: any other parameters of ErrorRule
+        :return: the rule that was added
+        :rtype: ErrorRule
+        """
+        rule = ErrorRule(status, **options)
+        self.state.errors.append(rule)
+        return rule
+
+    def start(self):
+        """Start serving requests."""
+        handler = type('Handler', (FakeGithubHandler,), {'state': self.state})
+        self._httpd = _ThreadingHTTPServer(('127.0.0.1', self.port), handler)
+        self.state.base_url = self.url
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            kwargs={'poll_interval': 0.05},
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving requests."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def __enter__(self) -> 'FakeGithubServer':
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class FakeGithubState:
+    """Holds all data served by the fake API and creates its JSON representation,
+    along with the settings that control its behaviour."""
+
+    def __init__(
+        self,
+        commits: int,
+        body: str = None,
+        branch: str = 'feature',
+        latency: float = 0,
+        jitter: float = 0,
+        page_size: int = DEFAULT_PER_PAGE,
+        rate_limit: int = DEFAULT_RATE_LIMIT,
+        seed: int = 0,
+    ):
+        """Constructor.
+
+        See FakeGithubServer for the parameters.
+        """
+        self.base_url = ''
+        self.branch = branch
+        self.body = body if body is not None else '- [x] Tests\n- [x] Docs\n'
+        self.commits = [
+            {
+                'sha': '{:040x}'.format(i + 1),
+                'message': 'Change number {}\n\nUpdate the content.\n'.format(i),
+            }
+            for i in range(commits)
+        ]
+        self.comments: List[dict] = []
+        self._next_comment_id = 1
+
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.rate_limit = rate_limit
+        self.rate_limit_remaining = rate_limit
+        self.rate_limit_reset = int(time.time()) + RATE_LIMIT_WINDOW
+        self.errors: List[ErrorRule] = []
+        self.requests: List[Tuple[str, str]] = []
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def begin_request(
+        self, method: str, path: str
+    ) -> Tuple[float, Union[ErrorRule, None], bool]:
+        """Register a new request and decide how to respond to it.
+
+        :param str method: the HTTP method of the request
+        :param str path: the path of the request
+        :return: the delay before responding in seconds, the error rule
+            that matches the request, if any, and whether the request
+            is within the rate limit
+        :rtype: tuple
+        """
+        with self._lock:
+            self.requests.append((method, path))
+            delay = self.latency
+            if self.jitter:
+                delay += self.random.uniform(0, self.jitter)
+
+            # The rate limit endpoint does not count against the limit
+            allowed = True
+            if path != '/rate_limit':
+                now = time.time()
+                if now >= self.rate_limit_reset:
+                    self.rate_limit_remaining = self.rate_limit
+                    self.rate_limit_reset = int(now) + RATE_LIMIT_WINDOW
+                if self.rate_limit_remaining > 0:
+                    self.rate_limit_remaining -= 1
+                else:
+                    allowed = False
+
+            error = next(
+                (x for x in self.errors if x.matches(method, path, self.random)), None
+            )
+        return delay, error, allowed
+
+    def get_rate_limit_headers(self) -> dict:
+        return {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(self.rate_limit_remaining),
+            'X-RateLimit-Reset': str(self.rate_limit_reset),
+            'X-RateLimit-Used': str(self.rate_limit - self.rate_limit_remaining),
+            'X-RateLimit-Resource': 'core',
+        }
+
+    def get_rate_limit(self) -> dict:
+        core = {
+            'limit': self.rate_limit,
+            'remaining': self.rate_limit_remaining,
+            'reset': self.rate_limit_reset,
+            'used': self.rate_limit - self.rate_limit_remaining,
+        }
+        return {'resources': {'core': core}, 'rate': core}
+
+    def get_repo(self) -> dict:
+        return {
+            'id': 1,
+            'name': REPO_NAME.split('/')[1],
+            'full_name': REPO_NAME,
+            'url': self._url('/repos/{}'.format(REPO_NAME)),
+            'html_url': 'https://github.com/{}'.format(REPO_NAME),
+        }
+
+    def get_pull(self) -> dict:
+        return {
+            'id': PR_NUMBER,
+            'number': PR_NUMBER,
+            'title': 'Add a feature',
+            'body': self.body,
+            'state': 'open',
+            'url': self._url('/repos/{}/pulls/{}'.format(REPO_NAME, PR_NUMBER)),
+            'issue_url': self._url(
+                '/repos/{}/issues/{}'.format(REPO_NAME, PR_NUMBER)
+            ),
+            'html_url': 'https://github.com/{}/pull/{}'.format(REPO_NAME, PR_NUMBER),
+            'head': {'ref': self.branch, 'sha': self._head_sha()},
+            'base': {'ref': 'master', 'sha': '{:040x}'.format(0)},
+            'commits': len(self.commits),
+        }
+
+    def get_issue(self) -> dict:
+        return {
+            'id': PR_NUMBER,
+            'number': PR_NUMBER,
+            'title': 'Add a feature',
+            'body': self.body,
+            'url': self._url('/repos/{}/issues/{}'.format(REPO_NAME, PR_NUMBER)),
+            'comments_url': self._url(
+                '/repos/{}/issues/{}/comments'.format(REPO_NAME, PR_NUMBER)
+            ),
+        }
+
+    def get_commit(self, sha: str, full: bool = True) -> Union[dict, None]:
+        """Return the given commit, as returned by the commits endpoint
+        if `full` is True, otherwise as listed in a pull request.
+
+        :param str sha: the SHA of the commit
+        :param bool full: if True, the statistics of the commit are included
+        :rtype: dict
+        """
+        commit = next((x for x in self.commits if x['sha'] == sha), None)
+        if commit is None:
+            return None
+        data = {
+            'sha': sha,
+            'url': self._url('/repos/{}/commits/{}'.format(REPO_NAME, sha)),
+            'html_url': 'https://github.com/{}/commit/{}'.format(REPO_NAME, sha),
+            'commit': {'message': commit['message']},
+        }
+        if full:
+            data['stats'] = {'additions': 10, 'deletions': 2, 'total': 12}
+        return data
+
+    def get_commits(self) -> List[dict]:
+        return [self.get_commit(x['sha'], full=False) for x in self.commits]
+
+    def get_comment(self, comment_id: int) -> Union[dict, None]:
+        return next((x for x in self.comments if x['id'] == comment_id), None)
+
+    def create_comment(self, body: str) -> dict:
+        with self._lock:
+            comment_id = self._next_comment_id
+            self._next_comment_id += 1
+            comment = {
+                'id': comment_id,
+                'body': body,
+                'url': self._url(
+                    '/repos/{}/issues/comments/{}'.format(REPO_NAME, comment_id)
+                ),
+                'html_url': 'https://github.com/{}/pull/{}#issuecomment-{}'.format(
+                    REPO_NAME, PR_NUMBER, comment_id
+                ),
+                'created_at': '2018-01-01T00:00:00Z',
+                'updated_at': '2018-01-01T00:{:02d}:00Z'.format(comment_id % 60),
+            }
+            self.comments.append(comment)
+        return comment
+
+    def delete_comment(self, comment_id: int) -> bool:
+        with self._lock:
+            comment = self.get_comment(comment_id)
+            if comment is None:
+                return False
+            self.comments.remove(comment)
+        return True
+
+    def _head_sha(self) -> str:
+        return self.commits[-1]['sha'] if self.commits else '{:040x}'.format(0)
+
+    def _url(self, path: str) -> str:
+        return '{}{}'.format(self.base_url, path)
+
+
+class FakeGithubHandler(BaseHTTPRequestHandler):
+    """Handles the requests of the fake API, using the state of the server."""
+
+    state: FakeGithubState = None
+
+    # Each route is a regex of the path and the name of the method to call
+    ROUTES = [
+        ('GET', r'^/rate_limit$', 'get_rate_limit'),
+        ('GET', r'^/repos/{repo}$', 'get_repo'),
+        ('GET', r'^/repos/{repo}/pulls/(\d+)$', 'get_pull'),
+        ('GET', r'^/repos/{repo}/pulls/(\d+)/commits$', 'list_commits'),
+        ('GET', r'^/repos/{repo}/commits/(\w+)$', 'get_commit'),
+        ('GET', r'^/repos/{repo}/issues/(\d+)$', 'get_issue'),
+        ('GET', r'^/repos/{repo}/issues/(\d+)/comments$', 'list_comments'),
+        ('POST', r'^/repos/{repo}/issues/(\d+)/comments$', 'create_comment'),
+        ('GET', r'^/repos/{repo}/issues/comments/(\d+)$', 'get_comment'),
+        ('DELETE', r'^/repos/{repo}/issues/comments/(\d+)$', 'delete_comment'),
+    ]
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, *args):
+        """Do not log every request to stderr."""
+
+    def get_rate_limit(self):
+        return 200, self.state.get_rate_limit()
+
+    def get_repo(self):
+        return 200, self.state.get_repo()
+
+    def get_pull(self, number: str):
+        if int(number) != PR_NUMBER:
+            return _not_found()
+        return 200, self.state.get_pull()
+
+    def list_commits(self, number: str):
+        if int(number) != PR_NUMBER:
+            return _not_found()
+        return self._paginate(self.state.get_commits())
+
+    def get_commit(self, sha: str):
+        commit = self.state.get_commit(sha)
+        return (200, commit) if commit else _not_found()
+
+    def get_issue(self, number: str):
+        if int(number) != PR_NUMBER:
+            return _not_found()
+        return 200, self.state.get_issue()
+
+    def list_comments(self, number: str):
+        if int(number) != PR_NUMBER:
+            return _not_found()
+        return self._paginate(list(self.state.comments))
+
+    def create_comment(self, number: str):
+        if int(number) != PR_NUMBER:
+            return _not_found()
+        return 201, self.state.create_comment(self._read_json().get('body', ''))
+
+    def get_comment(self, comment_id: str):
+        comment = self.state.get_comment(int(comment_id))
+        return (200, comment) if comment else _not_found()
+
+    def delete_comment(self, comment_id: str):
+        if not self.state.delete_comment(int(comment_id)):
+            return _not_found()
+        return 204, None
+
+    def _dispatch(self, method: str):
+        """Call the method of the route that matches the request
+        and send its response, unless the request is over the rate limit
+        or an error is injected."""
+        self._extra_headers = {}
+        self._body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        path = urlsplit(self.path).path
+
+        delay, error, allowed = self.state.begin_request(method, path)
+        if delay:
+            time.sleep(delay)
+
+        if not allowed:
+            status, data = 403, {
+                'message': 'API rate limit exceeded for user.',
+                'documentation_url': 'https://developer.github.com/v3/'
+                '#rate-limiting',
+            }
+        elif error is not None:
+            self._extra_headers.update(error.headers)
+            status, data = error.status, {'message': error.message}
+        else:
+            status, data = self._route(method, path)
+        self._respond(status, data)
+
+    def _route(self, method: str, path: str) -> tuple:
+        """Call the method of the route that matches the request.
+
+        :param str method: the HTTP method of the request
+        :param str path: the path of the request
+        :return: the status code and the data of the response
+        :rtype: tuple
+        """
+        repo = re.escape(REPO_NAME)
+        for route_method, pattern, name in self.ROUTES:
+            if route_method != method:
+                continue
+            match = re.match(pattern.format(repo=repo), path)
+            if match:
+                return getattr(self, name)(*match.groups())
+        return _not_found()
+
+    def _paginate(self, items: list) -> Tuple[int, list]:
+        """Return the page of the given items that was requested,
+        adding a Link header that points to the next and last pages.
+
+        :param list items: all items
+        :return: the status code and the items of the page
+        :rtype: tuple
+        """
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        page = max(int(query.get('page', ['1'])[0]), 1)
+        per_page = int(query.get('per_page', [self.state.page_size])[0])
+        per_page = min(max(per_page, 1), MAX_PER_PAGE)
+        last_page = max((len(items) + per_page - 1) // per_page, 1)
+
+        if page < last_page:
+            links = []
+            for rel, number in (('next', page + 1), ('last', last_page)):
+                links.append(
+                    '<{}{}?{}>; rel="{}"'.format(
+                        self.state.base_url,
+                        url.path,
+                        urlencode({'page': number, 'per_page': per_page}),
+                        rel,
+                    )
+                )
+            self._extra_headers['Link'] = ', '.join(links)
+
+        start = (page - 1) * per_page
+        return 200, items[start : start + per_page]
+
+    def _read_json(self) -> dict:
+        if not self._body:
+            return {}
+        return json.loads(self._body.decode('utf-8'))
+
+    def _respond(self, status: int, data):
+        body = b'' if data is None else json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in self.state.get_rate_limit_headers().items():
+            self.send_header(key, value)
+        for key, value in self._extra_headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _not_found() -> Tuple[int, dict]:
+    return 404, {'message': 'Not Found'}
+
+
+def main(argv: List[str] = None):
+    """Run the fake API until interrupted.
+
+    :param list argv: the command line arguments
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.fake_github')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--commits', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--jitter', type=float, default=0)
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PER_PAGE)
+    parser.add_argument('--rate-limit', type=int, default=DEFAULT_RATE_LIMIT)
+    parser.add_argument(
+        '--error-rate',
+        type=float,
+        default=0,
+        help='The probability of responding to any request with a 502 error',
+    )
+    options = parser.parse_args(argv)
+
+    server = FakeGithubServer(
+        commits=options.commits,
+        latency=options.latency,
+        jitter=options.jitter,
+        page_size=options.page_size,
+        rate_limit=options.rate_limit,
+        port=options.port,
+    )
+    if options.error_rate:
+        server.inject_error(502, probability=options.error_rate, message='Bad Gateway')
+    server.start()
+    print('Serving a fake Github API on {}'.format(server.url))
+    print('Pull request URL: {}'.format(server.pr_url))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
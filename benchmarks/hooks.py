@@ -0,0 +1,91 @@
+"""Benchmarks of the end-to-end latency of the local modes,
+i.e. what a developer waits for when totem runs as a Git hook.
+
+Each size gets a synthetic repository with merges on master and a branch
+on top of it (see `benchmarks.repos`). Every timed run resets the cached
+repository objects, so that it behaves like a new invocation of the hook.
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+from typing import List
+
+from benchmarks.core import Benchmark
+from benchmarks.repos import HEAD_BRANCH, HEAD_DETACHED, create_repo, stage_change
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG_PATH = os.path.join(ROOT, 'contrib', 'config', 'default.yml')
+
+# The shape of the repositories, apart from their size, so that commit
+# statistics are calculated from diffs of realistic size
+REPO_OPTIONS = {
+    'files_per_commit': (1, 5),
+    'lines_per_file': (1, 100),
+    'merge_every': 50,
+}
+
+# The check class of each mode and what HEAD points to
+MODES = {
+    'local': ('LocalCheck', HEAD_BRANCH),
+    'local-detached': ('LocalCheck', HEAD_DETACHED),
+    'pre-commit': ('PreCommitLocalCheck', HEAD_BRANCH),
+}
+
+
+def get_benchmarks(options) -> List[Benchmark]:
+    """Return a benchmark for each local mode and repository size.
+
+    :param argparse.Namespace options: the command line options
+    :rtype: list
+    """
+    benchmarks = []
+    for commits in options.commits:
+        for mode in sorted(MODES):
+            benchmarks.append(
+                Benchmark(
+                    'hooks.{}[commits={}]'.format(mode, commits),
+                    lambda mode=mode, commits=commits: prepare(mode, commits),
+                    repeat=options.repeat,
+                )
+            )
+    return benchmarks
+
+
+@contextlib.contextmanager
+def prepare(mode: str, commits: int):
+    """Create a repository of the given size and yield a function
+    that runs the checks of the given mode in it.
+
+    :param str mode: one of MODES
+    :param int commits: the number of commits of the repository
+    """
+    import totem.main
+    from totem.checks.cache import parse_yaml
+    from totem.git import clear_repo_cache
+
+    with open(CONFIG_PATH, 'rb') as f:
+        config = parse_yaml(f.read())
+    class_name, head = MODES[mode]
+    cls = getattr(totem.main, class_name)
+
+    def run():
+        clear_repo_cache()
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls(config).run()
+
+    directory = tempfile.mkdtemp(prefix='totem-benchmark-')
+    cwd = os.getcwd()
+    try:
+        create_repo(directory, commits, head=head, **REPO_OPTIONS)
+        if mode == 'pre-commit':
+            stage_change(directory, 'Add a staged change\n')
+        os.chdir(directory)
+        yield run
+    finally:
+        os.chdir(cwd)
+        clear_repo_cache()
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,71 @@
+"""Benchmarks of the end-to-end latency of the PR mode,
+against a local fake Github API.
+
+This includes creating the comment report and deleting the previous one,
+so it covers all requests a CI run makes. The network latency is zero
+by default; set it with `--api-latency` to see how the run scales with it.
+"""
+
+import contextlib
+import io
+import os
+from typing import List
+
+from benchmarks.core import Benchmark
+from benchmarks.fake_github import FakeGithubServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG_PATH = os.path.join(ROOT, 'contrib', 'config', 'sample.yml')
+
+
+def get_benchmarks(options) -> List[Benchmark]:
+    """Return a benchmark for each size of pull request.
+
+    :param argparse.Namespace options: the command line options
+    :rtype: list
+    """
+    return [
+        Benchmark(
+            'pr[commits={}]'.format(commits),
+            lambda commits=commits: prepare(commits, latency=options.api_latency),
+            repeat=options.repeat,
+        )
+        for commits in options.pr_commits
+    ]
+
+
+@contextlib.contextmanager
+def prepare(commits: int, latency: float = 0):
+    """Start a fake Github API with a pull request of the given size
+    and yield a function that runs all PR checks on it.
+
+    :param int commits: the number of commits of the pull request
+    :param float latency: the latency of every response of the API, in seconds
+    """
+    from totem.checks.cache import parse_yaml
+    from totem.github import github_service
+    from totem.main import PRCheck
+
+    with open(CONFIG_PATH, 'rb') as f:
+        config = parse_yaml(f.read())
+    config['settings']['pr_comment_report']['delete_previous'] = True
+
+    with FakeGithubServer(commits=commits, latency=latency) as server:
+
+        def run():
+            # Every run starts with no cached Github objects, like a CI run
+            github_service.cache_clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                PRCheck(config, server.pr_url).run()
+
+        previous_url = os.environ.get('GITHUB_API_URL')
+        os.environ['GITHUB_API_URL'] = server.url
+        try:
+            yield run
+        finally:
+            github_service.cache_clear()
+            if previous_url is None:
+                os.environ.pop('GITHUB_API_URL', None)
+            else:
+                os.environ['GITHUB_API_URL'] = previous_url
@@ -0,0 +1,328 @@
+"""Creates synthetic Git repositories for benchmarks and tests.
+
+Repositories are built with `git fast-import`, which writes all objects
+in a single pass, so even a history of 100k commits takes a few seconds.
+The content is generated from a seed, so the same parameters always create
+the same history, with the same SHAs.
+
+The shape of the repository is configurable: the number of commits,
+the size of the diff of each commit, the distribution of the kinds of
+commit messages (see MESSAGE_KINDS), merges of side branches into master
+and the state of HEAD (a branch on top of master, master itself,
+or a detached HEAD).
+
+>>> create_repo(path, commits=1000, merge_every=50, head=HEAD_DETACHED)
+"""
+
+import os
+import random
+import subprocess
+from typing import Dict, Iterator, List, Tuple
+
+BRANCH_NAME = 'feature/benchmark'
+
+# The branch that side branches are created on, before being merged
+SIDE_BRANCH_NAME = 'side'
+
+AUTHOR = 'Totem Benchmark <benchmark@example.com>'
+
+# The timestamp of the first commit; each commit is a minute after the previous
+START_TIMESTAMP = 1500000000
+
+# What HEAD points to, after the repository is created
+HEAD_BRANCH = 'branch'  # A branch on top of master, with `branch_commits` commits
+HEAD_MASTER = 'master'  # Master itself
+HEAD_DETACHED = 'detached'  # The tip of the branch, but detached
+HEADS = (HEAD_BRANCH, HEAD_MASTER, HEAD_DETACHED)
+
+# Files are spread over directories, so that each commit rewrites small trees,
+# which makes fast-import a lot faster
+FILES_PER_DIRECTORY = 10
+
+# The kinds of commit messages, with regard to the default rules of
+# the commit message check
+MESSAGE_VALID = 'valid'  # A proper subject and body
+MESSAGE_SUBJECT_ONLY = 'subject_only'  # A proper subject and no body
+MESSAGE_LONG_SUBJECT = 'long_subject'  # A subject that is too long
+MESSAGE_LOWERCASE = 'lowercase'  # A subject that starts with a lowercase letter
+MESSAGE_TRAILING_DOT = 'trailing_dot'  # A subject that ends with a dot
+MESSAGE_LONG_BODY_LINE = 'long_body_line'  # A body with a line that is too long
+MESSAGE_KINDS = (
+    MESSAGE_VALID,
+    MESSAGE_SUBJECT_ONLY,
+    MESSAGE_LONG_SUBJECT,
+    MESSAGE_LOWERCASE,
+    MESSAGE_TRAILING_DOT,
+    MESSAGE_LONG_BODY_LINE,
+)
+
+# The default relative frequency of each kind of commit message
+DEFAULT_MESSAGE_WEIGHTS = {
+    MESSAGE_VALID: 60,
+    MESSAGE_SUBJECT_ONLY: 20,
+    MESSAGE_LONG_SUBJECT: 5,
+    MESSAGE_LOWERCASE: 5,
+    MESSAGE_TRAILING_DOT: 5,
+    MESSAGE_LONG_BODY_LINE: 5,
+}
+
+WORDS = (
+    'add fix update remove refactor improve handle support allow make use '
+    'check config parser report branch commit message title body pattern '
+    'cache suite result provider factory service request response error '
+    'the a of for to in on with from when if and or not'
+).split()
+
+# The number of commits written to fast-import at once
+CHUNK_SIZE = 500
+
+
+def create_repo(
+    path: str,
+    commits: int,
+    branch_commits: int = 3,
+    files: int = 100,
+    files_per_commit: Tuple[int, int] = (1, 1),
+    lines_per_file: Tuple[int, int] = (1, 1),
+    message_weights: Dict[str, float] = None,
+    merge_every: int = 0,
+    merge_commits: int = 2,
+    head: str = HEAD_BRANCH,
+    seed: int = 0,
+) -> str:
+    """Create a repository with a history on master and a branch on top of it.
+
+    :param str path: the directory to create the repository in
+    :param int commits: the number of commits on the first-parent history
+        of master, including merge commits
+    :param int branch_commits: the number of commits on the branch
+    :param int files: the number of files the commits change
+    :param tuple files_per_commit: the minimum and maximum number of files
+        each commit changes
+    :param tuple lines_per_file: the minimum and maximum number of lines
+        of each file a commit writes; together with `files_per_commit`
+        they define the size of the diff of each commit
+    :param dict message_weights: the relative frequency of each kind
+        of commit message, with the kind as the key (see MESSAGE_KINDS);
+        defaults to DEFAULT_MESSAGE_WEIGHTS
+    :param int merge_every: if positive, every this many commits on master,
+        a side branch is created and merged back into master with a merge commit
+    :param int merge_commits: the number of commits of each merged side branch
+    :param str head: what HEAD points to at the end (see HEADS)
+    :param int seed: the seed of all generated content
+    :return: the path of the repository
+    :rtype: str
+    :raise ValueError: if a parameter is invalid
+    :raise RuntimeError: if Git fails to import the history
+    """
+    if head not in HEADS:
+        raise ValueError('Unknown HEAD "{}", use one of {}'.format(head, HEADS))
+    weights = message_weights or DEFAULT_MESSAGE_WEIGHTS
+    unknown = set(weights) - set(MESSAGE_KINDS)
+    if unknown:
+        raise ValueError('Unknown message kinds: {}'.format(sorted(unknown)))
+
+    generator = _HistoryGenerator(
+        files=files,
+        files_per_commit=files_per_commit,
+        lines_per_file=lines_per_file,
+        message_weights=weights,
+        seed=seed,
+    )
+
+    _git(path, 'init', '-q', path, cwd=None)
+    process = subprocess.Popen(
+        ['git', 'fast-import', '--quiet'],
+        cwd=path,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        stream = generator.generate(commits, branch_commits, merge_every, merge_commits)
+        for chunk in stream:
+            process.stdin.write(chunk)
+        process.stdin.close()
+    finally:
+        if process.wait() != 0:
+            raise RuntimeError('git fast-import failed in "{}"'.format(path))
+
+    if merge_every > 0:
+        _git(path, 'update-ref', '-d', 'refs/heads/{}'.format(SIDE_BRANCH_NAME))
+    if head == HEAD_MASTER or not branch_commits:
+        _git(path, 'checkout', '-q', '-f', 'master')
+    else:
+        _git(path, 'checkout', '-q', '-f', BRANCH_NAME)
+    if head == HEAD_DETACHED:
+        _git(path, 'checkout', '-q', '--detach')
+    return path
+
+
+def stage_change(path: str, message: str, lines: int = 10):
+    """Stage a change and write a pending commit message, as it would be
+    when a pre-commit hook runs.
+
+    :param str path: the path of the repository
+    :param str message: the pending commit message
+    :param int lines: the number of lines to add
+    """
+    with open(os.path.join(path, 'staged.txt'), 'a') as f:
+        f.write('A staged line\n' * lines)
+    _git(path, 'add', 'staged.txt')
+    with open(os.path.join(path, '.git', 'COMMIT_EDITMSG'), 'w') as f:
+        f.write(message)
+
+
+def generate_message(kind: str, rnd: random.Random) -> str:
+    """Return a commit message of the given kind.
+
+    :param str kind: one of MESSAGE_KINDS
+    :param random.Random rnd: the random generator to use
+    :rtype: str
+    """
+    subject = _words(rnd, 3, 6).capitalize()
+    body_lines = [_words(rnd, 4, 10) for _ in range(rnd.randint(1, 5))]
+
+    if kind == MESSAGE_LONG_SUBJECT:
+        subject = _words(rnd, 12, 16).capitalize()
+    elif kind == MESSAGE_LOWERCASE:
+        subject = subject.lower()
+    elif kind == MESSAGE_TRAILING_DOT:
+        subject += '.'
+    elif kind == MESSAGE_LONG_BODY_LINE:
+        body_lines.append(_words(rnd, 20, 30))
+
+    if kind == MESSAGE_SUBJECT_ONLY:
+        return '{}\n'.format(subject)
+    return '{}\n\n{}\n'.format(subject, '\n'.join(body_lines))
+
+
+class _HistoryGenerator:
+    """Generates the input of `git fast-import` for a synthetic history."""
+
+    def __init__(
+        self,
+        files: int,
+        files_per_commit: Tuple[int, int],
+        lines_per_file: Tuple[int, int],
+        message_weights: Dict[str, float],
+        seed: int,
+    ):
+        """Constructor.
+
+        See `create_repo()` for the parameters.
+        """
+        self.files = max(files, 1)
+        self.files_per_commit = files_per_commit
+        self.lines_per_file = lines_per_file
+        self.kinds = list(message_weights)
+        self.weights = [message_weights[x] for x in self.kinds]
+        self.random = random.Random(seed)
+        self._mark = 0
+
+    def generate(
+        self, commits: int, branch_commits: int, merge_every: int, merge_commits: int
+    ) -> Iterator[bytes]:
+        """Generate the stream, in chunks.
+
+        :param int commits: the number of commits on master
+        :param int branch_commits: the number of commits on the branch
+        :param int merge_every: the number of commits between merges, or 0
+        :param int merge_commits: the number of commits of each side branch
+        :rtype: iterator
+        """
+        chunk: List[str] = []
+        master = 0
+        count = 0
+        while count < commits:
+            if merge_every > 0 and count and count % merge_every == 0:
+                side = master
+                for _ in range(merge_commits):
+                    side = self._add_commit(chunk, SIDE_BRANCH_NAME, side)
+                master = self._add_commit(
+                    chunk, 'master', master, merge=side, message='Merge side branch\n'
+                )
+            else:
+                master = self._add_commit(chunk, 'master', master)
+            count += 1
+            if len(chunk) >= CHUNK_SIZE:
+                yield ''.join(chunk).encode('utf-8')
+                chunk = []
+
+        parent = master
+        for _ in range(branch_commits):
+            parent = self._add_commit(chunk, BRANCH_NAME, parent)
+        yield ''.join(chunk).encode('utf-8')
+
+    def _add_commit(
+        self,
+        chunk: List[str],
+        branch: str,
+        parent: int,
+        merge: int = 0,
+        message: str = None,
+    ) -> int:
+        """Add a commit to the given chunk.
+
+        :param list chunk: the chunk to add the commit to
+        :param str branch: the name of the branch of the commit
+        :param int parent: the mark of the parent commit, or 0 if there is none
+        :param int merge: the mark of the commit to merge, or 0 for no merge
+        :param str message: the commit message; generated if not given
+        :return: the mark of the new commit
+        :rtype: int
+        """
+        rnd = self.random
+        self._mark += 1
+        if message is None:
+            kind = rnd.choices(self.kinds, self.weights)[0]
+            message = generate_message(kind, rnd)
+        message_bytes = message.encode('utf-8')
+
+        chunk.append(
+            'commit refs/heads/{}\nmark :{}\ncommitter {} {} +0000\n'
+            'data {}\n{}\n'.format(
+                branch,
+                self._mark,
+                AUTHOR,
+                START_TIMESTAMP + self._mark * 60,
+                len(message_bytes),
+                message,
+            )
+        )
+        if parent:
+            chunk.append('from :{}\n'.format(parent))
+        if merge:
+            chunk.append('merge :{}\n'.format(merge))
+            return self._mark
+
+        for _ in range(rnd.randint(*self.files_per_commit)):
+            index = rnd.randrange(self.files)
+            lines = rnd.randint(*self.lines_per_file)
+            content = ''.join(
+                'Line {} of commit {}\n'.format(x, self._mark) for x in range(lines)
+            )
+            chunk.append(
+                'M 100644 inline src/{}/file-{}.txt\ndata {}\n{}\n'.format(
+                    index // FILES_PER_DIRECTORY, index, len(content), content
+                )
+            )
+        return self._mark
+
+
+def _words(rnd: random.Random, minimum: int, maximum: int) -> str:
+    """Return a random number of random words, separated by spaces."""
+    return ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(minimum, maximum)))
+
+
+def _git(path: str, *args, cwd: str = ''):
+    """Run the given Git command quietly.
+
+    :param str path: the path of the repository
+    :param args: the arguments of the command
+    :param str cwd: the directory to run the command in; defaults to `path`
+    """
+    subprocess.check_call(
+        ['git'] + list(args),
+        cwd=path if cwd == '' else cwd,
+        stdout=subprocess.DEVNULL,
+    )
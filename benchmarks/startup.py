@@ -0,0 +1,82 @@
+"""Benchmarks of the cold-start time of each mode of the CLI.
+
+Each run starts a new interpreter, so that no module is already imported,
+and measures the time it takes to import and set up everything
+the mode needs, before any check runs. This is the fixed cost
+that every Git hook pays.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from typing import List
+
+from benchmarks.core import Benchmark, prepared
+
+# The code that sets up each mode
+MODES = {
+    'daemon-client': (
+        'import totem.__main__; '
+        'from totem.daemon import run_in_daemon; '
+        'run_in_daemon([], "/nonexistent/daemon.sock")'
+    ),
+    'import': 'import totem.main',
+    'cli': 'import cli',
+    'local': 'from totem.main import LocalCheck; LocalCheck({})',
+    'pre-commit': (
+        'from totem.main import PreCommitLocalCheck; PreCommitLocalCheck({})'
+    ),
+    'pr': (
+        'from totem.main import PRCheck; '
+        'PRCheck({}, "https://github.com/owner/repo/pull/1")'
+    ),
+}
+
+SCRIPT = '''
+import json, time
+start = time.perf_counter()
+{code}
+print(json.dumps({{'duration': time.perf_counter() - start}}))
+'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_benchmarks(options) -> List[Benchmark]:
+    """Return a benchmark for each mode of the CLI.
+
+    :param argparse.Namespace options: the command line options
+    :rtype: list
+    """
+    return [
+        Benchmark(
+            'startup.{}'.format(mode),
+            lambda code=code: prepared(lambda: measure_startup(code)),
+            repeat=options.repeat * 2,
+        )
+        for mode, code in sorted(MODES.items())
+    ]
+
+
+def measure_startup(code: str) -> float:
+    """Run the given code in a new interpreter and return the time it took.
+
+    The time it takes to start the interpreter itself is not included.
+
+    :param str code: the code to run
+    :return: the duration in seconds
+    :rtype: float
+    :raise RuntimeError: if the code fails
+    """
+    process = subprocess.run(
+        [sys.executable, '-c', SCRIPT.format(code=code)],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if process.returncode != 0:
+        lines = process.stderr.decode('utf-8', 'replace').strip().splitlines()
+        error = lines[-1] if lines else 'Exit code {}'.format(process.returncode)
+        raise RuntimeError(error)
+    return json.loads(process.stdout.decode('utf-8').splitlines()[-1])['duration']
@@ -1,11 +1,17 @@
 """Command Line Interface functionality. """
 
-import os.path
+import json
 import sys
+import time
+from contextlib import ExitStack
 
 import click
-import yaml
-from totem.main import LocalCheck, PRCheck, PreCommitLocalCheck
+from totem.checks.cache import load_config
+from totem.checks.config import EXECUTION_SERIAL
+from totem.checks.results import CheckSuiteResults
+from totem.instrumentation import Recorder, recording, span
+from totem.main import LocalCheck, PRCheck, PreCommitLocalCheck, get_mode_name
+from totem.paths import get_config_path
 from totem.reporting.console import Color
 
 
@@ -14,6 +20,14 @@ def run_checks(
     config_file: str = None,
     details_url: str = None,
     arguments: list = None,
+    fail_fast: bool = False,
+    deadline: float = None,
+    profile: bool = False,
+    profile_json: str = None,
+    api_usage_json: str = None,
+    trace_memory: bool = False,
+    trace_memory_json: str = None,
+    profile_output: str = None,
 ):
     """Run all checks described in `config_file` for the PR on the given URL.
 
@@ -24,29 +38,99 @@ def run_checks(
     :param list arguments: a list of optional arguments; if the list is empty,
         all commits of the current branch will be checked; otherwise,
         only the pending commit will be checked (as in a pre-commit fashion)
+    :param bool fail_fast: if True, no more checks will run after the first
+        check that fails with an error failure level, overriding the
+        `execution.fail_fast` setting of the config file
+    :param float deadline: the maximum time in seconds for running all checks,
+        overriding the `execution.deadline` setting of the config file
+    :param bool profile: if True, a breakdown of the time spent in each stage
+        of the run is printed at the end
+    :param str profile_json: the path of a file to write the breakdown to,
+        as JSON
+    :param str api_usage_json: the path of a file to write the number
+        of requests made to the Github API to, as JSON, when checking a PR
+    :param bool trace_memory: if True, a breakdown of the memory allocated
+        by each stage of the run and the top allocation sites are printed
+        at the end
+    :param str trace_memory_json: the path of a file to write the memory
+        breakdown to, as JSON
+    :param str profile_output: the path of a file to write a profile of
+        the Python code of the checks to, as speedscope JSON if it ends
+        with `.json` and as pstats otherwise
     """
-    if not config_file:
-        if os.path.isfile('.totem.yml'):
-            config_file = '.totem.yml'
-        else:
-            package_root = os.path.split(__file__)[0]
-            config_file = os.path.join(package_root, 'contrib/config/default.yml')
-    try:
-        with open(config_file, 'r') as f:
-            try:
-                config = yaml.load(f)
-            except Exception as e:
-                print(
-                    Color.format(
-                        '[error]Error parsing config file "{}" as a YAML document: '
-                        '{}[end]'.format(config_file, e)
-                    )
+    from totem.tracing import traced_from_env
+
+    options = {
+        'config_file': config_file,
+        'details_url': details_url,
+        'arguments': arguments,
+        'fail_fast': fail_fast,
+        'deadline': deadline,
+        'api_usage_json': api_usage_json,
+        'profile_output': profile_output,
+    }
+    attributes = {'totem.mode': get_mode_name(pr_url, bool(arguments))}
+    if pr_url:
+        attributes['totem.pr.url'] = pr_url
+
+    # Spans are only kept if tracing is enabled via TOTEM_OTLP_TRACES_FILE
+    with traced_from_env(), span('totem.run', attributes), ExitStack() as stack:
+        # The reports are registered before their measurements, so that
+        # they are created after them, even when the run exits with an error
+        if trace_memory or trace_memory_json:
+            from totem.memory import MemoryTracer, tracing_memory
+
+            tracer = MemoryTracer()
+            stack.callback(report_memory, tracer, trace_memory, trace_memory_json)
+            stack.enter_context(tracing_memory(tracer))
+
+        if profile or profile_json:
+            recorder = Recorder()
+            start = time.perf_counter()
+            stack.callback(
+                lambda: report_profile(
+                    recorder, time.perf_counter() - start, profile, profile_json
                 )
-                sys.exit(1)
+            )
+            stack.enter_context(recording(recorder))
+
+        _run_checks(pr_url, **options)
+
+
+def _run_checks(
+    pr_url: str,
+    config_file: str = None,
+    details_url: str = None,
+    arguments: list = None,
+    fail_fast: bool = False,
+    deadline: float = None,
+    api_usage_json: str = None,
+    profile_output: str = None,
+):
+    """Run all checks described in `config_file` for the PR on the given URL.
+
+    See `run_checks()` for the parameters.
+    """
+    config_file = get_config_path(config_file)
+    try:
+        with open(config_file, 'rb') as f:
+            content = f.read()
     except Exception as e:
         print(Color.format('[error]Error opening config file: {}[end]'.format(e)))
         sys.exit(1)
 
+    # The parsed config is cached, based on the content of the file
+    try:
+        config = load_config(content)
+    except Exception as e:
+        print(
+            Color.format(
+                '[error]Error parsing config file "{}" as a YAML document: '
+                '{}[end]'.format(config_file, e)
+            )
+        )
+        sys.exit(1)
+
     print(
         'Running with arguments:\n'
         ' - PR URL: {pr_url}\n'
@@ -61,6 +145,27 @@ def run_checks(
             ),
         )
     )
+    execution_overrides = {}
+    if fail_fast:
+        execution_overrides['fail_fast'] = True
+    if deadline is not None:
+        execution_overrides['deadline'] = deadline
+    if profile_output:
+        from totem.profiling import FORMAT_PSTATS, get_profile_format
+
+        if get_profile_format(profile_output) == FORMAT_PSTATS:
+            # The deterministic profiler only sees the thread that enables it,
+            # and checks with a time limit might run in other threads
+            print(
+                'Running all checks serially, without timeouts or deadline, '
+                'for the pstats profile'
+            )
+            config = config.without_time_limits()
+            execution_overrides.pop('deadline', None)
+            execution_overrides['mode'] = EXECUTION_SERIAL
+    if execution_overrides:
+        config = config.with_execution_settings(**execution_overrides)
+
     if pr_url:
         print('Running in PRCheck mode')
         check = PRCheck(config_dict=config, pr_url=pr_url, details_url=details_url)
@@ -72,18 +177,162 @@ def run_checks(
             print('Running in PreCommitLocalCheck mode')
             check = PreCommitLocalCheck(config_dict=config)
 
-    results = check.run()
+    if profile_output:
+        results = run_profiled(check, profile_output)
+    else:
+        results = check.run()
+    if api_usage_json and pr_url:
+        write_json(api_usage_json, check.api_usage.as_data(), 'API usage')
     if results.errors:
         sys.exit(1)
 
 
+def run_profiled(check, path: str) -> CheckSuiteResults:
+    """Run the given check under a profiler and write the profile
+    to the given file.
+
+    :param BaseCheck check: the check to run
+    :param str path: the path of the file; see `totem.profiling`
+        for the formats
+    :return: the results of the check
+    :rtype: CheckSuiteResults
+    """
+    from totem.profiling import create_profiler
+
+    profiler = create_profiler(path)
+    with profiler:
+        results = check.run()
+    try:
+        profiler.write(path)
+    except Exception as e:
+        print(Color.format('[error]Error writing code profile: {}[end]'.format(e)))
+    else:
+        print('Code profile written to "{}"'.format(path))
+    return results
+
+
+def report_profile(
+    recorder: Recorder, total: float, show: bool = True, json_path: str = None
+):
+    """Report the time spent in each stage of a run.
+
+    :param Recorder recorder: the recorder that was active during the run
+    :param float total: the total duration of the run, in seconds
+    :param bool show: if True, the breakdown is printed
+    :param str json_path: the path of a file to write the breakdown to,
+        as JSON, if any
+    """
+    from totem.reporting.profile import ProfileReport
+
+    report = ProfileReport(recorder, total)
+    if show:
+        print(report.get_summary())
+    if json_path:
+        write_json(json_path, report.get_data(), 'profile')
+
+
+def report_memory(tracer, show: bool = True, json_path: str = None):
+    """Report the memory allocated by each stage of a run.
+
+    :param MemoryTracer tracer: the tracer that was active during the run
+    :param bool show: if True, the breakdown is printed
+    :param str json_path: the path of a file to write the breakdown to,
+        as JSON, if any
+    """
+    from totem.reporting.memory import MemoryReport
+
+    report = MemoryReport(tracer)
+    if show:
+        print(report.get_summary())
+    if json_path:
+        write_json(json_path, report.get_data(), 'memory breakdown')
+
+
+def write_json(path: str, data: dict, description: str):
+    """Write the given data to a file, as JSON, printing an error on failure.
+
+    :param str path: the path of the file
+    :param dict data: the data to write
+    :param str description: what the data is, for the error message
+    """
+    try:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+    except Exception as e:
+        print(
+            Color.format('[error]Error writing {}: {}[end]'.format(description, e))
+        )
+
+
 @click.command()
 @click.option('-p', '--pr-url', required=False, type=str)
 @click.option('-c', '--config-file', required=False, type=str)
 @click.option('--details-url', required=False, type=str)
+@click.option(
+    '--fail-fast',
+    is_flag=True,
+    default=False,
+    help='Stop running checks after the first error-level failure',
+)
+@click.option(
+    '--deadline',
+    required=False,
+    type=float,
+    help='The maximum time in seconds for running all checks',
+)
+@click.option(
+    '--profile',
+    is_flag=True,
+    default=False,
+    help='Show how long each stage of the run took',
+)
+@click.option(
+    '--profile-json',
+    required=False,
+    type=str,
+    help='Write how long each stage of the run took to this file, as JSON',
+)
+@click.option(
+    '--api-usage-json',
+    required=False,
+    type=str,
+    help='Write the requests made to the Github API to this file, as JSON',
+)
+@click.option(
+    '--trace-memory',
+    is_flag=True,
+    default=False,
+    help='Show how much memory each stage of the run allocated '
+    'and the top allocation sites',
+)
+@click.option(
+    '--trace-memory-json',
+    required=False,
+    type=str,
+    help='Write how much memory each stage of the run allocated '
+    'to this file, as JSON',
+)
+@click.option(
+    '--profile-output',
+    required=False,
+    type=str,
+    help='Write a profile of the Python code of the checks to this file: '
+    'speedscope JSON if it ends with .json, pstats otherwise',
+)
 @click.argument('args', nargs=-1)
 def main(
-    pr_url: str, config_file: str = None, details_url: str = None, args: list = None
+    pr_url: str,
+    config_file: str = None,
+    details_url: str = None,
+    fail_fast: bool = False,
+    deadline: float = None,
+    profile: bool = False,
+    profile_json: str = None,
+    api_usage_json: str = None,
+    trace_memory: bool = False,
+    trace_memory_json: str = None,
+    profile_output: str = None,
+    args: list = None,
 ):
     """Run all checks described in `config_file`.
 
@@ -99,8 +348,34 @@ def main(
     :param str config_file: the path of the configuration file,
         formatted in YAML, as found in contrib/config/sample.yml
     :param str details_url: the URL to visit for more details about the results
+    :param bool fail_fast: if True, stop running checks after the first
+        error-level failure
+    :param float deadline: the maximum time in seconds for running all checks;
+        checks that have not finished by then are reported as timed out
+    :param bool profile: if True, show how long each stage of the run took
+    :param str profile_json: the path of a file to write how long each stage
+        of the run took to, as JSON
+    :param str api_usage_json: the path of a file to write the requests made
+        to the Github API to, as JSON
+    :param bool trace_memory: if True, show how much memory each stage
+        of the run allocated and the top allocation sites
+    :param str trace_memory_json: the path of a file to write how much memory
+        each stage of the run allocated to, as JSON
+    :param str profile_output: the path of a file to write a profile of
+        the Python code of the checks to
     :param list args: necessary for pre-commit support
     """
     run_checks(
-        pr_url=pr_url, config_file=config_file, details_url=details_url, arguments=args
+        pr_url=pr_url,
+        config_file=config_file,
+        details_url=details_url,
+        arguments=args,
+        fail_fast=fail_fast,
+        deadline=deadline,
+        profile=profile,
+        profile_json=profile_json,
+        api_usage_json=api_usage_json,
+        trace_memory=trace_memory,
+        trace_memory_json=trace_memory_json,
+        profile_output=profile_output,
     )
@@ -16,7 +16,7 @@ setup(
     ),
     long_description=long_description,
     long_description_content_type="text/markdown",
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     classifiers=[
         "Programming Language :: Python :: 3.6",
         "License :: OSI Approved :: MIT License",
@@ -29,6 +29,7 @@ setup(
         'pyaml==17.12.1',
         'GitPython==2.1.11',
     ],
+    extras_require={'re2': ['google-re2']},
     py_modules=['cli'],
-    entry_points={'console_scripts': ['totem=cli:main']},
+    entry_points={'console_scripts': ['totem=totem.__main__:main']},
 )
@@ -0,0 +1,179 @@
+import json
+import os
+
+import pytest
+from totem.checks import cache
+from totem.checks.cache import ConfigSnapshot, load_config
+from totem.paths import get_cache_dir
+
+CONTENT = b'''
+settings:
+  execution:
+    mode: threads
+checks:
+  branch_name:
+    pattern: ^[a-z]+$
+  pr_title:
+    failure_level: warning
+'''
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmpdir, monkeypatch):
+    """Store all cached data in a temporary directory and start with
+    no snapshots in memory."""
+    monkeypatch.setenv('TOTEM_CACHE_DIR', str(tmpdir))
+    monkeypatch.setattr(cache, '_snapshots', cache.OrderedDict())
+    return tmpdir
+
+
+def test_get_cache_dir(monkeypatch):
+    monkeypatch.setenv('TOTEM_CACHE_DIR', '/tmp/totem-cache')
+    assert get_cache_dir() == '/tmp/totem-cache'
+
+    monkeypatch.delenv('TOTEM_CACHE_DIR')
+    monkeypatch.setenv('XDG_CACHE_HOME', '/tmp/xdg')
+    assert get_cache_dir() == '/tmp/xdg/totem'
+
+
+def test_load_config_parses_yaml_once(monkeypatch):
+    snapshot = load_config(CONTENT)
+    assert isinstance(snapshot, ConfigSnapshot)
+    assert snapshot['checks']['pr_title'] == {'failure_level': 'warning'}
+
+    def fail(content):
+        raise AssertionError('Should not parse the content again')
+
+    monkeypatch.setattr(cache, 'parse_yaml', fail)
+    assert load_config(CONTENT) is snapshot
+
+    # Loaded from disk, e.g. by another process
+    monkeypatch.setattr(cache, '_snapshots', cache.OrderedDict())
+    cached = load_config(CONTENT)
+    assert cached is not snapshot
+    assert cached == snapshot
+    assert cached.digest == snapshot.digest
+
+
+def test_create_config_is_cached_in_memory(monkeypatch):
+    config = load_config(CONTENT).create_config(include_pr=False)
+    assert list(config.check_configs) == ['branch_name']
+    assert load_config(CONTENT).create_config(include_pr=False) is config
+
+    # Config objects are created again from the cached data in a new process
+    monkeypatch.setattr(cache, '_snapshots', cache.OrderedDict())
+    cached = load_config(CONTENT).create_config(include_pr=False)
+    assert cached is not config
+    assert list(cached.check_configs) == ['branch_name']
+    assert cached.execution == {'mode': 'threads'}
+    assert cached.check_configs['branch_name'].options == {'pattern': '^[a-z]+$'}
+
+
+def test_cache_entries_are_json_per_totem_version(cache_dir, monkeypatch):
+    load_config(CONTENT)
+    (name,) = os.listdir(str(cache_dir.join('configs')))
+    entry = json.loads(cache_dir.join('configs', name).read())
+    assert list(entry['data']['checks']) == ['branch_name', 'pr_title']
+
+    def fail(content):
+        raise AssertionError('Should not parse the content again')
+
+    monkeypatch.setattr(cache, 'parse_yaml', fail)
+    cache.clear_memory_cache()
+    load_config(CONTENT)
+
+    # Entries of other versions of totem are not used
+    monkeypatch.setattr(cache, 'get_totem_key', lambda: 'version:0.0.0-other')
+    cache.clear_memory_cache()
+    with pytest.raises(AssertionError):
+        load_config(CONTENT)
+
+
+def test_totem_key_does_not_compute_the_version(monkeypatch):
+    from totem import _version
+
+    def fail():
+        raise AssertionError('Should not compute the version')
+
+    monkeypatch.setattr(_version, 'get_versions', fail)
+    cache.get_totem_key.cache_clear()
+    assert cache.get_totem_key().startswith('mtime:')
+
+    # Installed packages have a static version
+    monkeypatch.setattr(_version, 'version_json', '{"version": "1.2.3"}', raising=False)
+    cache.get_totem_key.cache_clear()
+    assert cache.get_totem_key() == 'version:1.2.3'
+    cache.get_totem_key.cache_clear()
+
+
+def test_data_that_json_cannot_represent_is_not_cached(cache_dir):
+    snapshot = load_config(b'checks:\n  1: {}\ndate: 2020-01-01\n')
+    assert snapshot['checks'] == {1: {}}
+    assert not cache_dir.join('configs').check()
+
+
+def test_old_entries_are_pruned(cache_dir, monkeypatch):
+    monkeypatch.setattr(cache, 'MAX_DISK_ENTRIES', 2)
+    directory = cache_dir.join('configs')
+    directory.ensure(dir=True)
+    directory.join('old.pickle').write('')
+    os.utime(str(directory.join('old.pickle')), (0, 0))
+    for index in range(3):
+        load_config(CONTENT + '# {}\n'.format(index).encode('utf-8'))
+
+    names = os.listdir(str(directory))
+    assert len(names) == 2
+    assert 'old.pickle' not in names
+
+
+def test_invalid_cache_entries_are_ignored(cache_dir):
+    snapshot = load_config(CONTENT)
+    for name in os.listdir(str(cache_dir.join('configs'))):
+        cache_dir.join('configs', name).write('corrupted')
+    cache._snapshots.clear()
+
+    assert load_config(CONTENT) == snapshot
+
+
+def test_different_content_has_different_digest():
+    snapshot = load_config(CONTENT)
+    other = load_config(CONTENT + b'\n# A comment\n')
+    assert snapshot.digest != other.digest
+
+
+def test_with_execution_settings():
+    snapshot = load_config(CONTENT)
+    modified = snapshot.with_execution_settings(fail_fast=True)
+    assert modified.digest != snapshot.digest
+    assert modified['settings']['execution'] == {'mode': 'threads', 'fail_fast': True}
+    assert snapshot['settings']['execution'] == {'mode': 'threads'}
+
+    config = modified.create_config()
+    assert config.execution['fail_fast'] is True
+    assert snapshot.create_config().execution == {'mode': 'threads'}
+
+
+def test_with_settings():
+    snapshot = load_config(CONTENT)
+    modified = snapshot.with_settings('pr_comment_report', enabled=False)
+    assert modified['settings']['pr_comment_report'] == {'enabled': False}
+    assert modified['settings']['execution'] == {'mode': 'threads'}
+    assert modified.digest != snapshot.with_execution_settings(enabled=False).digest
+    assert modified.create_config().pr_comment_report == {'enabled': False}
+
+
+def test_without_time_limits():
+    snapshot = load_config(CONTENT).with_execution_settings(deadline=3)
+    modified = ConfigSnapshot(dict(snapshot, checks={'pr_title': {'timeout': 2}}), 'x')
+
+    unlimited = modified.without_time_limits()
+    assert unlimited['settings']['execution'] == {'mode': 'threads'}
+    assert unlimited['checks'] == {'pr_title': {}}
+    assert modified['checks'] == {'pr_title': {'timeout': 2}}
+    assert unlimited is modified.without_time_limits()
+    assert unlimited.create_config().check_configs['pr_title'].timeout is None
+
+
+def test_invalid_yaml_raises_error():
+    with pytest.raises(Exception):
+        load_config(b'checks: [unclosed')
@@ -536,3 +536,60 @@ class TestCommitMessages:
         assert result.status is 'error'
         assert result.error_code is 'invalid_content'
         assert "Missing key: 'stats'" in result.details['message']
+
+
+class TestCommitMessagesRunMany:
+    """Tests the columnar batch API of the CommitMessagesCheck class."""
+
+    COMMITS = [
+        {'stats': {'total': 20}, 'message': 'Good commit message', 'sha': 'a'},
+        {'stats': {'total': 200}, 'message': 'Many changes no body', 'sha': 'b'},
+        {'stats': {'total': 4}, 'message': 'bad subject.', 'sha': 'c'},
+        {'stats': {'total': 4}, 'message': 'Long line\n\n{}'.format('k' * 73)},
+        {'stats': {'total': 4}, 'message': 'X' * 60, 'sha': 'e'},
+        {'stats': {'total': 500}, 'message': 'Fine\n  \n  With body  \n'},
+    ]
+
+    @staticmethod
+    def _to_columns(commits):
+        return {
+            'message': [c['message'] for c in commits],
+            'total': [c['stats']['total'] for c in commits],
+            'sha': [c.get('sha', '') for c in commits],
+            'url': [c.get('url', '') for c in commits],
+        }
+
+    def test_identical_to_run(self):
+        check = CommitMessagesCheck(CheckConfig('whatever', 'error'))
+        commits = [
+            dict(commit, sha=commit.get('sha', ''), url='')
+            for commit in self.COMMITS
+        ]
+        expected = check.run({'commits': commits})
+        result = check.run_many(self._to_columns(commits))
+
+        assert result.status == expected.status
+        assert result.error_code == expected.error_code
+        assert result.details == expected.details
+        assert len(result.details['errors']) == 5
+
+    def test_all_pass(self):
+        check = CommitMessagesCheck(CheckConfig('whatever', 'error'))
+        result = check.run_many(self._to_columns(self.COMMITS[:1]))
+        assert result.status == STATUS_PASS
+
+    def test_missing_column_fails_with_error(self):
+        check = CommitMessagesCheck(CheckConfig('whatever', 'error'))
+        result = check.run_many({'message': ['Good commit message']})
+        assert result.status == STATUS_ERROR
+        assert result.error_code == ERROR_INVALID_CONTENT
+        assert "Missing key: 'total'" in result.details['message']
+
+    def test_columns_of_different_lengths_fail_with_error(self):
+        check = CommitMessagesCheck(CheckConfig('whatever', 'error'))
+        batch = self._to_columns(self.COMMITS)
+        batch['sha'] = batch['sha'][:2]
+        result = check.run_many(batch)
+        assert result.status == STATUS_ERROR
+        assert result.error_code == ERROR_INVALID_CONTENT
+        assert "Column 'sha' has 2 values instead of 6" in result.details['message']
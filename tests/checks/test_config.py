@@ -1,5 +1,7 @@
+import pytest
 from totem.checks.checks import PR_TYPES_CHECKS
 from totem.checks.config import Config, ConfigFactory
+from totem.checks.patterns import DEFAULT_ENGINE
 
 
 class TestConfig:
@@ -40,6 +42,14 @@ class TestConfig:
             'show_successful': False,
         }
 
+    def test_default_regex_property(self):
+        config = Config({}, {})
+        assert config.regex == {'engine': 're', 'timeout': 5.0}
+
+    def test_default_execution_property(self):
+        config = Config({}, {})
+        assert config.execution == {'mode': 'serial'}
+
     def test_pr_comment_property(self):
         settings = {'pr_comment_report': {'doesnt': 'matter'}}
         config = Config(settings, {})
@@ -127,3 +137,45 @@ class TestConfigFactory:
 
         for check_name in PR_TYPES_CHECKS:
             assert check_name not in check_configs
+
+    def test_create_sets_regex_engine(self):
+        config_dict = {
+            'settings': {'regex': {'engine': 'auto', 'timeout': 2}},
+            'checks': {'branch_name': {}, 'pr_title': {}},
+        }
+        config = ConfigFactory.create(config_dict)
+
+        branch_name = config.check_configs['branch_name']
+        pr_title = config.check_configs['pr_title']
+        assert branch_name.regex_engine is not DEFAULT_ENGINE
+        assert branch_name.regex_engine is pr_title.regex_engine
+        assert branch_name.regex_engine.backend == 'auto'
+        assert branch_name.regex_engine.timeout == 2
+
+    def test_create_flags_risky_patterns(self):
+        config_dict = {
+            'checks': {
+                'branch_name': {'pattern': '^[a-z]+$'},
+                'pr_body_excludes': {'patterns': ['safe', '(a+)+$']},
+                'commit_message': {'subject': {'pattern': '^(\\w+\\s?)*$'}},
+            }
+        }
+        config = ConfigFactory.create(config_dict)
+
+        assert len(config.pattern_warnings) == 2
+        assert '"(a+)+$" of check "pr_body_excludes"' in config.pattern_warnings[0]
+        assert 'of check "commit_message"' in config.pattern_warnings[1]
+
+    def test_create_rejects_unknown_execution_mode(self):
+        config_dict = {'settings': {'execution': {'mode': 'fibers'}}, 'checks': {}}
+        with pytest.raises(ValueError):
+            ConfigFactory.create(config_dict)
+
+    def test_create_sets_check_timeout(self):
+        config_dict = {
+            'checks': {'branch_name': {'timeout': 2, 'pattern': 'x'}, 'pr_title': {}}
+        }
+        config = ConfigFactory.create(config_dict)
+        assert config.check_configs['branch_name'].timeout == 2
+        assert config.check_configs['branch_name'].options == {'pattern': 'x'}
+        assert config.check_configs['pr_title'].timeout is None
@@ -0,0 +1,90 @@
+import json
+import os
+
+import pytest
+from totem.checks.config import CheckConfig
+from totem.checks.history import (
+    CheckHistory,
+    get_config_key,
+    get_default_history_path,
+)
+
+
+class TestCheckHistory:
+    """Test the CheckHistory class."""
+
+    def test_load_missing_or_invalid_file_returns_empty_history(self, tmpdir):
+        history = CheckHistory.load(str(tmpdir.join('missing.json')))
+        assert history.checks == {}
+
+        path = tmpdir.join('invalid.json')
+        path.write('{not json')
+        assert CheckHistory.load(str(path)).checks == {}
+
+        path.write(json.dumps({'version': 0, 'checks': {'x': {}}}))
+        assert CheckHistory.load(str(path)).checks == {}
+
+    def test_save_and_load(self, tmpdir):
+        path = str(tmpdir.join('dir', 'history.json'))
+        history = CheckHistory(path)
+        history.record('branch_name', 0.5, failed=False)
+        history.record('branch_name', 1.5, failed=True)
+        assert history.save()
+
+        loaded = CheckHistory.load(path)
+        assert loaded.checks['branch_name']['runs'] == 2
+        assert loaded.checks['branch_name']['failures'] == 1
+        assert loaded.checks['branch_name']['duration'] == pytest.approx(0.8)
+
+    def test_history_of_other_configuration_is_not_loaded(self, tmpdir):
+        path = str(tmpdir.join('history.json'))
+        key = get_config_key([CheckConfig('branch_name', 'error', pattern='^a')])
+        history = CheckHistory(path, key=key)
+        history.record('branch_name', 0.5, failed=True)
+        assert history.save()
+
+        assert CheckHistory.load(path, key).checks['branch_name']['runs'] == 1
+        other_key = get_config_key([CheckConfig('branch_name', 'error', pattern='^b')])
+        assert other_key != key
+        assert CheckHistory.load(path, other_key).checks == {}
+
+    def test_save_without_path(self):
+        assert not CheckHistory().save()
+
+    def test_sort(self):
+        history = CheckHistory()
+        for _ in range(3):
+            history.record('expensive', 2.0, failed=False)
+            history.record('cheap', 0.1, failed=False)
+            history.record('failing', 0.5, failed=True)
+
+        configs = [
+            CheckConfig('expensive', 'error'),
+            CheckConfig('cheap', 'error'),
+            CheckConfig('failing', 'error'),
+            CheckConfig('unknown', 'error'),
+        ]
+        sorted_configs = history.sort(configs)
+        assert [x.check_type for x in sorted_configs] == [
+            'unknown',
+            'cheap',
+            'failing',
+            'expensive',
+        ]
+
+
+def test_default_history_path_depends_on_repository(tmpdir, monkeypatch):
+    monkeypatch.setenv('TOTEM_CACHE_DIR', str(tmpdir))
+    monkeypatch.chdir(str(tmpdir.mkdir('repo1')))
+    path = get_default_history_path()
+    assert os.path.dirname(path) == str(tmpdir.join('history'))
+
+    monkeypatch.chdir(str(tmpdir.mkdir('repo2')))
+    assert get_default_history_path() != path
+
+
+def test_config_key_does_not_depend_on_order():
+    first = CheckConfig('branch_name', 'error', pattern='^a')
+    second = CheckConfig('pr_title', 'warning')
+    assert get_config_key([first, second]) == get_config_key([second, first])
+    assert get_config_key([first]) != get_config_key([first, second])
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+from totem.checks.config import EXECUTION_PROCESSES, EXECUTION_SERIAL, EXECUTION_THREADS
+from totem.checks.content import BaseContentProvider
+from totem.checks.hooks import (
+    EVENT_CHECK_END,
+    EVENT_CHECK_START,
+    EVENT_FETCH_END,
+    EVENT_FETCH_START,
+    EVENT_REMOTE_CALL_END,
+    EVENT_REMOTE_CALL_START,
+    EVENT_SUITE_END,
+    EVENT_SUITE_START,
+    EVENTS,
+    Hooks,
+)
+from totem.checks.suite import CheckSuite
+from totem.instrumentation import STAGE_REMOTE, measured
+
+from tests.helpers import get_passing_suite
+
+
+class RemoteService:
+    @measured(STAGE_REMOTE)
+    def get_branch(self):
+        return 'feature'
+
+
+class RemoteContentProvider(BaseContentProvider):
+    def get_content(self) -> dict:
+        return {'branch': RemoteService().get_branch()}
+
+
+def get_suite(mode: str, hooks: Hooks) -> CheckSuite:
+    return get_passing_suite(RemoteContentProvider, {'mode': mode}, hooks=hooks)
+
+
+def record_all(hooks: Hooks) -> list:
+    """Register a hook for every event, which records the event
+    and its details."""
+    events = []
+    lock = threading.Lock()
+    for event in EVENTS:
+
+        def hook(event=event, **details):
+            with lock:
+                events.append((event, details))
+
+        hooks.register(event, hook)
+    return events
+
+
+@pytest.mark.parametrize('mode', [EXECUTION_SERIAL, EXECUTION_THREADS])
+def test_hooks_are_called_in_order(mode):
+    hooks = Hooks()
+    events = record_all(hooks)
+    suite = get_suite(mode, hooks)
+    suite.run()
+
+    assert [x[0] for x in events] == [
+        EVENT_SUITE_START,
+        EVENT_CHECK_START,
+        EVENT_FETCH_START,
+        EVENT_REMOTE_CALL_START,
+        EVENT_REMOTE_CALL_END,
+        EVENT_FETCH_END,
+        EVENT_CHECK_END,
+        EVENT_SUITE_END,
+    ]
+    details = dict(events)
+    assert details[EVENT_SUITE_START] == {'suite': suite}
+    assert details[EVENT_CHECK_END]['result'].success
+    assert details[EVENT_FETCH_START] == {'provider': 'RemoteContentProvider'}
+    assert details[EVENT_REMOTE_CALL_END]['name'] == 'RemoteService.get_branch'
+    assert details[EVENT_REMOTE_CALL_END]['duration'] >= 0
+    assert details[EVENT_REMOTE_CALL_END]['error'] is None
+    assert details[EVENT_SUITE_END]['results'] is suite.results
+
+
+def test_only_check_hooks_are_called_in_processes_mode():
+    hooks = Hooks()
+    events = record_all(hooks)
+    get_suite(EXECUTION_PROCESSES, hooks).run()
+    assert [x[0] for x in events] == [
+        EVENT_SUITE_START,
+        EVENT_CHECK_START,
+        EVENT_CHECK_END,
+        EVENT_SUITE_END,
+    ]
+
+
+def test_failing_hook_does_not_affect_checks(capsys):
+    def broken_hook(**details):
+        raise ValueError('Broken hook')
+
+    hooks = Hooks()
+    hooks.register(EVENT_CHECK_START, broken_hook)
+    suite = get_suite(EXECUTION_SERIAL, hooks)
+    suite.run()
+    assert len(suite.results.successful) == 1
+    assert 'Broken hook' in capsys.readouterr().err
+
+
+def test_register_and_unregister():
+    hooks = Hooks()
+    assert not hooks
+    with pytest.raises(ValueError):
+        hooks.register('unknown', print)
+
+    hooks.register(EVENT_CHECK_END, print)
+    assert hooks and not hooks.observes_measurements()
+    hooks.register(EVENT_FETCH_END, print)
+    assert hooks.observes_measurements()
+
+    hooks.unregister(EVENT_CHECK_END, print)
+    hooks.unregister(EVENT_FETCH_END, print)
+    assert not hooks
@@ -0,0 +1,68 @@
+import pytest
+from totem.checks.messages import measure_message, parse_message
+
+
+def split_message(message):
+    """Split a message the way CommitMessagesCheck used to, creating copies."""
+    lines = [line.strip() for line in message.splitlines()]
+    subject = message.rstrip('\n')
+    body_lines = []
+    if '' in lines:
+        separator_index = lines.index('')
+        subject = '\n'.join(lines[0:separator_index])
+        body_lines = lines[separator_index + 1 :]
+    return subject, body_lines
+
+
+class TestParseMessage:
+    """Test the parse_message() function and the ParsedMessage class."""
+
+    @pytest.mark.parametrize(
+        'message',
+        [
+            '',
+            'Subject',
+            'Subject\n',
+            'Subject\n\n\n',
+            'Subject\n\nBody line 1\nBody line 2\n',
+            '  Indented subject  \n   \n  Body  \n\n  More body',
+            'Multi\nline\nsubject\n\nBody',
+            '\n\nBody without subject',
+            'Windows\r\n\r\nline endings\r\n',
+            'Other\x0bbreaks\x85 \nand body',
+            'Only\nsubject\nlines\n',
+        ],
+    )
+    def test_same_as_splitting(self, message):
+        subject, body_lines = split_message(message)
+        parsed = parse_message(message)
+
+        assert parsed.subject == subject
+        assert parsed.subject_length == len(subject)
+        assert parsed.body_lines == body_lines
+        assert parsed.body_line_count == len(body_lines)
+        assert list(parsed.body_line_lengths()) == [len(x) for x in body_lines]
+        assert parsed.max_body_line_length == max(map(len, body_lines), default=0)
+
+    def test_only_measurements_are_stored(self):
+        parsed = parse_message('Subject\n\n  Body  \n')
+        assert parsed.text == 'Subject\n\n  Body  \n'
+        assert measure_message(parsed.text) == (7, 1, 4, 7)
+        assert not hasattr(parsed, '__dict__')
+
+    @pytest.mark.parametrize(
+        'message, matches',
+        [
+            ('Subject', True),
+            ('Subject.', False),
+            ('Subject\n\nBody.', True),
+            ('Subject.\n\nBody', False),
+            ('  Subject\n\nBody', True),
+            ('Two\nlines.\n\nBody', False),
+            ('subject\n', False),
+        ],
+    )
+    def test_search_subject(self, message, matches):
+        parsed = parse_message(message)
+        pattern = '^[A-Z].+(?<!\\.)$'
+        assert (parsed.search_subject(pattern) is not None) is matches
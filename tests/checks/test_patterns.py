@@ -0,0 +1,216 @@
+import re
+import signal
+import types
+
+import pytest
+from totem.checks import patterns as patterns_module
+from totem.checks.patterns import (
+    BACKEND_RE2,
+    PatternSet,
+    PatternTimeoutError,
+    RegexEngine,
+    get_backtracking_risk,
+    get_pattern_set,
+    time_budget,
+)
+
+
+class TestPatternSet:
+    """Test the PatternSet class."""
+
+    def test_search_returns_all_found_patterns(self):
+        patterns = PatternSet(['foo', 'ba[rz]', 'missing'])
+        assert patterns.search('foo and bar and baz') == {'foo', 'ba[rz]'}
+        assert patterns.search('nothing here') == set()
+
+    def test_overlapping_matches_are_found(self):
+        # All patterns match at the same position or inside each other's match
+        patterns = PatternSet(['abc', 'ab', 'bcd', 'c'])
+        assert patterns.search('xabcdx') == {'abc', 'ab', 'bcd', 'c'}
+
+    def test_flags_are_respected(self):
+        patterns = PatternSet(['^second', '^first'], re.MULTILINE)
+        assert patterns.search('first\nsecond') == {'^first', '^second'}
+
+        patterns = PatternSet(['^second'])
+        assert patterns.search('first\nsecond') == set()
+
+    def test_patterns_with_groups_are_searched_separately(self):
+        patterns = PatternSet([r'(\w)\1', 'plain', '(?i)upper'])
+        assert patterns.search('aa is PLAIN text') == {r'(\w)\1'}
+        assert patterns.search('UPpER and plain') == {'plain', '(?i)upper'}
+
+    def test_patterns_with_inline_flags_are_searched_separately(self):
+        patterns = PatternSet(['plain', '(?i)upper', '(?s)a.b'])
+        assert patterns._separate == [1, 2]
+        # The flags do not leak into the other patterns
+        assert patterns.search('PLAIN UPPER a\nb') == {'(?i)upper', '(?s)a.b'}
+
+    def test_search_indexes_includes_duplicates(self):
+        patterns = PatternSet(['foo', 'bar', 'foo'])
+        assert patterns.search_indexes('foo') == {0, 2}
+
+    def test_results_match_separate_searches(self):
+        patterns = ['a+b', 'b+c', '[0-9]{2}', 'x?y', '\\bword\\b', 'd(?=e)']
+        texts = ['aab bbc 12', 'xy sword', 'word de', 'dd', '']
+        pattern_set = PatternSet(patterns)
+        for text in texts:
+            expected = {p for p in patterns if re.search(p, text) is not None}
+            assert pattern_set.search(text) == expected
+
+    def test_get_pattern_set_is_cached(self):
+        assert get_pattern_set(('a', 'b')) is get_pattern_set(('a', 'b'))
+
+
+class TestRegexEngine:
+    """Test the RegexEngine class."""
+
+    def test_search(self):
+        engine = RegexEngine()
+        assert engine.search('^[a-z]+$', 'abc') is not None
+        assert engine.search('^[a-z]+$', 'ABC') is None
+        assert engine.search('^b', 'a\nb', re.MULTILINE) is not None
+
+    def test_compiled_patterns_are_cached(self):
+        engine = RegexEngine()
+        assert engine.compile('abc') is engine.compile('abc')
+        assert RegexEngine().compile('abc') is engine.compile('abc')
+
+    def test_compiled_patterns_are_bounded(self):
+        for index in range(patterns_module.MAX_COMPILED_PATTERNS + 10):
+            RegexEngine().compile('pattern{}'.format(index))
+        info = patterns_module._compile.cache_info()
+        assert info.currsize == patterns_module.MAX_COMPILED_PATTERNS
+
+    def test_re2_backend_falls_back_to_re(self):
+        # Lookbehinds are not supported by RE2 and the re2 module
+        # might not even be installed
+        engine = RegexEngine(backend=BACKEND_RE2)
+        assert engine.search('^[A-Z].+(?<!\\.)$', 'Subject') is not None
+        assert engine.search('^[A-Z].+(?<!\\.)$', 'Subject.') is None
+
+    def test_re2_backend_uses_re2_with_inline_flags(self, monkeypatch):
+        class Re2Error(Exception):
+            pass
+
+        compiled = []
+
+        def compile_re2(pattern, options=None):
+            # Like google-re2, which takes options instead of the flags of `re`
+            if '(?<' in pattern:
+                raise Re2Error('lookbehinds are not supported')
+            compiled.append(pattern)
+            return re.compile(pattern)
+
+        fake_re2 = types.SimpleNamespace(compile=compile_re2, error=Re2Error)
+        monkeypatch.setattr(patterns_module, 're2', fake_re2)
+        patterns_module._compile.cache_clear()
+        engine = RegexEngine(backend=BACKEND_RE2)
+
+        try:
+            assert engine.search('^b', 'a\nB', re.MULTILINE | re.IGNORECASE)
+            assert engine.search('(?<!a)b', 'cb')
+            assert engine.search('a # comment', 'a', re.VERBOSE)
+        finally:
+            patterns_module._compile.cache_clear()
+        # Only the patterns and flags RE2 supports are compiled with it
+        assert compiled == ['(?im)^b']
+
+    def test_patterns_compiled_by_re2_have_no_timer(self, monkeypatch):
+        class Re2Pattern:
+            def search(self, text, pos=0):
+                # No timer of the budget is running while RE2 evaluates
+                assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+                return None
+
+        fake_re2 = types.SimpleNamespace(
+            compile=lambda pattern: Re2Pattern(), error=Exception
+        )
+        monkeypatch.setattr(patterns_module, 're2', fake_re2)
+        patterns_module._compile.cache_clear()
+        try:
+            assert RegexEngine(backend=BACKEND_RE2).search('a+', 'aaa') is None
+        finally:
+            patterns_module._compile.cache_clear()
+
+    def test_unknown_backend_raises_error(self):
+        with pytest.raises(ValueError):
+            RegexEngine(backend='unknown')
+
+    def test_timeout_aborts_catastrophic_backtracking(self):
+        engine = RegexEngine(timeout=0.1)
+        with pytest.raises(PatternTimeoutError):
+            engine.search('(a+)+$', 'a' * 50 + 'b')
+
+        # Patterns that finish on time are not affected
+        assert engine.search('a+$', 'a' * 50 + 'b') is None
+
+    def test_budget_covers_all_evaluations_of_the_block(self, monkeypatch):
+        engine = RegexEngine(timeout=0.1)
+        timers = []
+        setitimer = signal.setitimer
+        monkeypatch.setattr(
+            signal, 'setitimer', lambda *args: timers.append(args) or setitimer(*args)
+        )
+        with engine.budget():
+            for _ in range(10):
+                assert engine.search('a+$', 'aaa') is not None
+        # One timer is armed and disarmed for the whole block
+        assert len(timers) == 2
+
+        with pytest.raises(PatternTimeoutError, match='Evaluation of the patterns'):
+            with engine.budget():
+                engine.search('(a+)+$', 'a' * 50 + 'b')
+
+    def test_time_budget_restores_running_timer(self):
+        def handler(signum, frame):
+            raise TimeoutError()
+
+        previous_handler = signal.signal(signal.SIGALRM, handler)
+        signal.setitimer(signal.ITIMER_REAL, 2)
+        try:
+            with time_budget(0.1, 'a+'):
+                pass
+            remaining, _ = signal.getitimer(signal.ITIMER_REAL)
+            assert 0 < remaining <= 2
+
+            # A timer that expires sooner than the budget interrupts the pattern
+            signal.setitimer(signal.ITIMER_REAL, 0.1)
+            with pytest.raises(TimeoutError):
+                with time_budget(5, '(a+)+$'):
+                    re.search('(a+)+$', 'a' * 50 + 'b')
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+    def test_pattern_set_uses_engine(self):
+        engine = RegexEngine(timeout=0.1)
+        patterns = PatternSet(['(x+x+)+y', 'fine'], engine=engine)
+        with pytest.raises(PatternTimeoutError):
+            patterns.search('x' * 50 + ' fine')
+
+
+class TestGetBacktrackingRisk:
+    """Test the static analysis of patterns."""
+
+    @pytest.mark.parametrize(
+        'pattern',
+        ['(a+)+$', '(a*)*b', '(\\w+\\s?)*$', '^(a|a)*$', '((ab)+c?)+', '(?:x{1,5})+'],
+    )
+    def test_risky_patterns(self, pattern):
+        assert get_backtracking_risk(pattern) is not None
+
+    @pytest.mark.parametrize(
+        'pattern',
+        [
+            '^[A-Z].+(?<!\\.)$',
+            '^[\\w\\d\\-]+$',
+            '(ab)+',
+            '(a{2})+',
+            '(a|b)*',
+            'a+b+c+',
+            '(invalid',
+        ],
+    )
+    def test_safe_patterns(self, pattern):
+        assert get_backtracking_risk(pattern) is None
@@ -0,0 +1,196 @@
+import pytest
+from totem.checks.checks import CommitMessagesCheck
+from totem.checks.config import CheckConfig
+from totem.checks.records import (
+    CommitFailure,
+    CommitInfo,
+    Message,
+    get_total_changes,
+)
+from totem.checks.results import STATUS_FAIL, STATUS_PASS, CheckResult
+
+
+class TestCommitInfo:
+    """Test the CommitInfo class."""
+
+    def test_has_no_instance_dict(self):
+        commit = CommitInfo('Message', sha='aa', additions=3, deletions=2)
+        assert not hasattr(commit, '__dict__')
+        assert commit.total == 5
+
+    def test_dict_compatibility_view(self):
+        commit = CommitInfo('Message', sha='aa', url='u', additions=3, deletions=2)
+        assert commit['message'] == 'Message'
+        assert commit['sha'] == 'aa'
+        assert commit['stats'] == {'additions': 3, 'deletions': 2, 'total': 5}
+        assert commit.as_dict() == {
+            'message': 'Message',
+            'sha': 'aa',
+            'url': 'u',
+            'stats': {'additions': 3, 'deletions': 2, 'total': 5},
+        }
+        assert commit == commit.as_dict()
+        assert commit.get('missing') is None
+        with pytest.raises(KeyError):
+            commit['missing']
+
+    def test_get_total_changes(self):
+        assert get_total_changes(CommitInfo('Message', total=7)) == 7
+        assert get_total_changes({'stats': {'total': 8}}) == 8
+
+
+class TestMessage:
+    """Test the Message class."""
+
+    def test_render(self):
+        msg = Message('code', 'Has {length} chars, max {max}', length=5, max=3)
+        assert msg.render() == 'Has 5 chars, max 3'
+        assert str(msg) == 'Has 5 chars, max 3'
+        assert msg == 'Has 5 chars, max 3'
+
+    def test_render_with_callable(self):
+        msg = Message('code', lambda items: ', '.join(items), items=['a', 'b'])
+        assert msg.render() == 'a, b'
+
+    def test_rendering_is_lazy_and_memoized(self):
+        calls = []
+
+        def template(**params):
+            calls.append(params)
+            return 'rendered'
+
+        msg = Message('code', template, x=1)
+        assert calls == []
+        assert msg.render() == 'rendered'
+        assert msg.render() == 'rendered'
+        assert calls == [{'x': 1}]
+
+    def test_as_data(self):
+        msg = Message('code', 'Has {length} chars', length=5)
+        assert msg.as_data() == {'code': 'code', 'params': {'length': 5}}
+
+    def test_hash_matches_rendered_string(self):
+        msg = Message('code', 'Has {length} chars', length=5)
+        assert hash(msg) == hash('Has 5 chars')
+        assert {msg, Message('other', 'Has 5 chars'), 'Has 5 chars'} == {msg}
+
+
+class TestCommitFailure:
+    """Test the CommitFailure class."""
+
+    def test_dict_compatibility_view(self):
+        commit = CommitInfo('Message', sha='aa', url='u')
+        failure = CommitFailure(commit, [('error_x', 'X'), ('error_y', 'Y')], 2)
+        assert failure.as_dict() == {
+            'sha': 'aa',
+            'url': 'u',
+            'message': 'Message',
+            'error_x': 'X',
+            'error_y': 'Y',
+            'commit_order': 2,
+        }
+        assert list(failure.keys()) == list(failure.as_dict().keys())
+
+    def test_messages_are_rendered_in_view(self):
+        failure = CommitFailure(
+            CommitInfo('Message'), [('error_x', Message('x', 'X={x}', x=1))]
+        )
+        assert failure.as_dict()['error_x'] == 'X=1'
+
+    def test_items_are_accessed_directly(self):
+        calls = []
+
+        def template(**params):
+            calls.append(params)
+            return 'rendered'
+
+        failure = CommitFailure(
+            CommitInfo('Message', sha='aa'),
+            [('error_x', Message('x', template, x=1)), ('error_y', 'Y')],
+            3,
+        )
+        assert failure['sha'] == 'aa'
+        assert failure['commit_order'] == 3
+        assert failure['error_y'] == 'Y'
+        assert calls == []
+        assert failure['error_x'] == 'rendered'
+        with pytest.raises(KeyError):
+            failure['error_z']
+
+    def test_commit_is_not_copied(self):
+        commit = CommitInfo('Message')
+        failure = CommitFailure(commit, [])
+        assert failure.commit is commit
+
+
+class TestCheckResult:
+    """Test the CheckResult class."""
+
+    def test_has_no_instance_dict(self):
+        result = CheckResult(CheckConfig('mytype', 'error'), STATUS_PASS)
+        assert not hasattr(result, '__dict__')
+        assert result.details == {}
+
+    def test_details_compatibility_view(self):
+        commit = CommitInfo('Message', sha='aa')
+        result = CheckResult(
+            CheckConfig('mytype', 'error'),
+            STATUS_FAIL,
+            'some_error',
+            message='Some message',
+            errors=[CommitFailure(commit, [('error_x', 'X')], 1)],
+        )
+        assert result.message == 'Some message'
+        assert result.get_detail('message') == 'Some message'
+        assert result.get_detail('missing', 3) == 3
+        assert result.details == {
+            'message': 'Some message',
+            'errors': [
+                {
+                    'sha': 'aa',
+                    'url': '',
+                    'message': 'Message',
+                    'error_x': 'X',
+                    'commit_order': 1,
+                }
+            ],
+        }
+        assert result.details is result.details
+
+    def test_message_is_rendered_on_demand(self):
+        msg = Message('some_error', 'Value is {value}', value=5)
+        result = CheckResult(
+            CheckConfig('mytype', 'error'), STATUS_FAIL, 'some_error', message=msg
+        )
+        assert result.raw_message is msg
+        assert msg._rendered is None
+        assert result.message == 'Value is 5'
+        assert result.details == {'message': 'Value is 5'}
+
+
+class TestCommitMessagesWithCommitInfo:
+    """Test that CommitMessagesCheck works with CommitInfo objects."""
+
+    def test_same_results_as_dicts(self):
+        check = CommitMessagesCheck(CheckConfig('whatever', 'error'))
+        commits = [
+            CommitInfo('Good commit message', sha='a', total=20),
+            CommitInfo('Many changes no body', sha='b', total=200),
+            CommitInfo('bad.', sha='c', total=2),
+        ]
+        result = check.run({'commits': commits})
+        expected = check.run({'commits': [commit.as_dict() for commit in commits]})
+
+        assert result.status == STATUS_FAIL
+        assert result.details == expected.details
+        assert [x['sha'] for x in result.details['errors']] == ['b', 'c']
+
+    def test_errors_are_structured(self):
+        check = CommitMessagesCheck(CheckConfig('whatever', 'error'))
+        result = check.run({'commits': [CommitInfo('bad.', sha='c', total=2)]})
+
+        failure = result.get_detail('errors')[0]
+        codes = [msg.code for _, msg in failure.errors]
+        assert codes == ['error_subject_length', 'error_subject_pattern']
+        assert failure.errors[0][1].params['length'] == 4
+        assert result.raw_message.params['count'] == 1
@@ -0,0 +1,287 @@
+import multiprocessing
+import os
+import re
+import signal
+import time
+
+import pytest
+from totem.checks.config import (
+    EXECUTION_PROCESSES,
+    EXECUTION_SERIAL,
+    EXECUTION_THREADS,
+    CheckConfig,
+    Config,
+)
+from totem.checks.content import BaseContentProvider, BaseGitContentProviderFactory
+from totem.checks.core import Check, CheckFactory
+from totem.checks.history import CheckHistory
+from totem.checks.results import STATUS_ERROR, STATUS_FAIL, STATUS_TIMEOUT
+from totem.checks.suite import CheckSuite
+
+
+class SlowCheck(Check):
+    def run(self, content):
+        time.sleep(self._config.options.get('delay', 0))
+        if content.get('fail'):
+            return self._get_failure('error_slow', 'Failed')
+        return self._get_success()
+
+
+class BrokenCheck(Check):
+    def run(self, content):
+        raise ValueError('Broken check')
+
+
+class DummyContentProvider(BaseContentProvider):
+    def get_content(self) -> dict:
+        return {'fail': self.params.get('fail', False)}
+
+
+class DummyContentProviderFactory(BaseGitContentProviderFactory):
+    def create(self, check):
+        return DummyContentProvider(fail=check.check_type == 'failing')
+
+
+def get_check_factory() -> CheckFactory:
+    factory = CheckFactory()
+    factory.register('slow', SlowCheck)
+    factory.register('failing', SlowCheck)
+    factory.register('broken', BrokenCheck)
+    return factory
+
+
+def get_suite(
+    mode: str,
+    workers: int = 4,
+    fail_fast: bool = False,
+    history: CheckHistory = None,
+    **check_types
+) -> CheckSuite:
+    check_configs = {
+        check_type: CheckConfig(check_type, 'error', **options)
+        for check_type, options in check_types.items()
+    }
+    execution = {'mode': mode, 'workers': workers, 'fail_fast': fail_fast}
+    config = Config({'execution': execution}, check_configs)
+    return CheckSuite(
+        config,
+        DummyContentProviderFactory(),
+        get_check_factory(),
+        history=history or CheckHistory(),
+    )
+
+
+@pytest.mark.parametrize(
+    'mode', [EXECUTION_SERIAL, EXECUTION_THREADS, EXECUTION_PROCESSES]
+)
+def test_results_keep_config_order(mode):
+    suite = get_suite(
+        mode,
+        slow={'delay': 0.2},
+        broken={},
+        failing={'delay': 0.1},
+        unknown={},
+    )
+    suite.run()
+    failed = suite.results.failed
+    assert [x.config.check_type for x in suite.results.successful] == ['slow']
+    assert [x.config.check_type for x in failed] == ['broken', 'failing', 'unknown']
+    assert [x.status for x in failed] == [STATUS_ERROR, STATUS_FAIL, STATUS_ERROR]
+    assert failed[0].message == 'Broken check'
+    assert failed[1].message == 'Failed'
+
+
+def test_threads_run_checks_in_parallel():
+    suite = get_suite(EXECUTION_THREADS, slow={'delay': 0.3}, failing={'delay': 0.3})
+    start = time.monotonic()
+    suite.run()
+    assert time.monotonic() - start < 0.55
+    assert len(suite.results.successful) == 1
+    assert len(suite.results.failed) == 1
+
+
+@pytest.mark.parametrize(
+    'mode', [EXECUTION_SERIAL, EXECUTION_THREADS, EXECUTION_PROCESSES]
+)
+def test_fail_fast_skips_remaining_checks(mode):
+    suite = get_suite(
+        mode,
+        workers=1,
+        fail_fast=True,
+        slow={},
+        failing={},
+        broken={},
+        unknown={},
+    )
+    suite.run()
+    assert [x.config.check_type for x in suite.results.successful] == ['slow']
+    assert [x.config.check_type for x in suite.results.failed] == ['failing']
+    assert [x.check_type for x in suite.results.skipped] == ['broken', 'unknown']
+
+
+def test_fail_fast_ignores_warnings():
+    suite = get_suite(EXECUTION_SERIAL, fail_fast=True, failing={}, slow={})
+    suite.config.check_configs['failing'].failure_level = 'warning'
+    suite.run()
+    assert len(suite.results.warnings) == 1
+    assert len(suite.results.successful) == 1
+    assert suite.results.skipped == []
+
+
+def get_history() -> CheckHistory:
+    """Return a history where `slow` and `broken` are expensive
+    and `failing` always fails."""
+    history = CheckHistory()
+    for _ in range(5):
+        history.record('slow', 1.0, failed=False)
+        history.record('broken', 2.0, failed=False)
+        history.record('failing', 0.1, failed=True)
+    return history
+
+
+def test_adaptive_order_runs_likely_failures_first():
+    suite = get_suite(
+        EXECUTION_SERIAL, fail_fast=True, history=get_history(), slow={}, failing={}
+    )
+    suite.run()
+    assert [x.config.check_type for x in suite.results.failed] == ['failing']
+    assert [x.check_type for x in suite.results.skipped] == ['slow']
+
+
+def test_adaptive_order_records_history():
+    history = get_history()
+    suite = get_suite(EXECUTION_SERIAL, fail_fast=True, history=history, new={})
+    suite.run()
+    assert history.checks['new']['runs'] == 1
+    assert history.checks['new']['failures'] == 1
+    assert history.checks['failing']['runs'] == 5
+
+
+def test_report_order():
+    suite = get_suite(
+        EXECUTION_SERIAL, history=get_history(), slow={}, broken={}, failing={}
+    )
+    suite.config.settings['execution']['order'] = 'adaptive'
+    suite.run()
+    assert [x.config.check_type for x in suite.results.failed] == ['broken', 'failing']
+
+    suite = get_suite(
+        EXECUTION_SERIAL, history=get_history(), slow={}, broken={}, failing={}
+    )
+    suite.config.settings['execution']['order'] = 'adaptive'
+    suite.config.settings['execution']['keep_report_order'] = False
+    suite.run()
+    assert [x.config.check_type for x in suite.results.failed] == ['failing', 'broken']
+
+
+class HangingCheck(Check):
+    def run(self, content):
+        time.sleep(5)
+        return self._get_success()
+
+
+def test_check_timeout():
+    factory = get_check_factory()
+    factory.register('hanging', HangingCheck)
+    hanging = CheckConfig('hanging', 'error')
+    hanging.timeout = 0.2
+    config = Config({}, {'hanging': hanging, 'slow': CheckConfig('slow', 'error')})
+    suite = CheckSuite(config, DummyContentProviderFactory(), factory)
+
+    start = time.monotonic()
+    suite.run()
+    assert time.monotonic() - start < 1
+
+    assert [x.config.check_type for x in suite.results.successful] == ['slow']
+    result = suite.results.failed[0]
+    assert result.status == STATUS_TIMEOUT
+    assert result.error_code == 'timeout'
+    assert result.message == 'Check did not finish after 0.2 seconds'
+
+
+def test_alarm_after_check_has_finished(monkeypatch):
+    setitimer = signal.setitimer
+
+    def late_setitimer(which, seconds, *args):
+        # The alarm goes off just when the timer is being disarmed
+        if seconds == 0:
+            os.kill(os.getpid(), signal.SIGALRM)
+        return setitimer(which, seconds, *args)
+
+    monkeypatch.setattr(signal, 'setitimer', late_setitimer)
+    slow = CheckConfig('slow', 'error')
+    slow.timeout = 5
+    config = Config({}, {'slow': slow})
+    suite = CheckSuite(config, DummyContentProviderFactory(), get_check_factory())
+    previous_handler = signal.getsignal(signal.SIGALRM)
+
+    suite.run()
+    assert [x.config.check_type for x in suite.results.successful] == ['slow']
+    assert signal.getsignal(signal.SIGALRM) == previous_handler
+
+
+def test_timeout_only_terminates_own_workers():
+    factory = get_check_factory()
+    factory.register('hanging', HangingCheck)
+    hanging = CheckConfig('hanging', 'error')
+    hanging.timeout = 0.2
+    execution = {'mode': EXECUTION_PROCESSES, 'workers': 1}
+    config = Config({'execution': execution}, {'hanging': hanging})
+    suite = CheckSuite(config, DummyContentProviderFactory(), factory)
+
+    other = multiprocessing.Process(target=time.sleep, args=(5,))
+    other.start()
+    try:
+        suite.run()
+        assert suite.results.failed[0].status == STATUS_TIMEOUT
+        assert other.is_alive()
+    finally:
+        other.terminate()
+        other.join()
+
+
+class BacktrackingCheck(Check):
+    def run(self, content):
+        # Catastrophic backtracking holds the GIL for a very long time
+        re.search('(a+)+$', 'a' * 50 + 'b')
+        return self._get_success()
+
+
+def test_deadline_interrupts_cpu_bound_check():
+    factory = get_check_factory()
+    factory.register('backtracking', BacktrackingCheck)
+    check_configs = {
+        'backtracking': CheckConfig('backtracking', 'error'),
+        'slow': CheckConfig('slow', 'error'),
+    }
+    config = Config({'execution': {'deadline': 0.3}}, check_configs)
+    suite = CheckSuite(config, DummyContentProviderFactory(), factory)
+
+    start = time.monotonic()
+    suite.run()
+    assert time.monotonic() - start < 2
+
+    result = suite.results.failed[0]
+    assert result.status == STATUS_TIMEOUT
+    assert result.message == 'Check did not finish after 0.3 seconds'
+    assert [x.check_type for x in suite.results.skipped] == ['slow']
+
+
+@pytest.mark.parametrize('mode', [EXECUTION_SERIAL, EXECUTION_THREADS])
+def test_deadline(mode):
+    suite = get_suite(
+        mode,
+        workers=1,
+        slow={'delay': 0.1},
+        failing={'delay': 2},
+        broken={},
+    )
+    suite.config.settings['execution']['deadline'] = 0.3
+
+    start = time.monotonic()
+    suite.run()
+    assert time.monotonic() - start < 1
+
+    assert [x.config.check_type for x in suite.results.successful] == ['slow']
+    assert [x.status for x in suite.results.failed] == [STATUS_TIMEOUT]
+    assert [x.check_type for x in suite.results.skipped] == ['broken']
@@ -0,0 +1,40 @@
+"""Contains checks and content providers that are shared by the tests."""
+
+from totem.checks.config import CheckConfig, Config
+from totem.checks.content import BaseGitContentProviderFactory
+from totem.checks.core import Check, CheckFactory
+from totem.checks.suite import CheckSuite
+
+
+class PassingCheck(Check):
+    def run(self, content):
+        return self._get_success()
+
+
+class SingleProviderFactory(BaseGitContentProviderFactory):
+    """Creates a content provider of the same class for every check."""
+
+    def __init__(self, provider_class: type):
+        super().__init__()
+        self.provider_class = provider_class
+
+    def create(self, check):
+        return self.provider_class()
+
+
+def get_passing_suite(
+    provider_class: type, execution: dict = None, **kwargs
+) -> CheckSuite:
+    """Return a suite with a single check that always passes,
+    with content provided by the given class.
+
+    :param type provider_class: a BaseContentProvider subclass
+    :param dict execution: the execution settings of the suite
+    :return: the new suite; any keyword arguments are passed to it
+    :rtype: CheckSuite
+    """
+    factory = CheckFactory()
+    factory.register('passing', PassingCheck)
+    settings = {'execution': execution} if execution else {}
+    config = Config(settings, {'passing': CheckConfig('passing', 'error')})
+    return CheckSuite(config, SingleProviderFactory(provider_class), factory, **kwargs)
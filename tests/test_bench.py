@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+
+import totem.main
+from totem.bench import (
+    format_summary,
+    get_statistics,
+    run_cold,
+    run_iteration,
+    run_warm,
+    summarize,
+)
+from totem.checks.content import BaseContentProvider
+from totem.instrumentation import CALL_SUBPROCESS, STAGE_CONFIG, STAGE_FETCH
+from totem.main import BaseCheck
+
+from tests.helpers import SingleProviderFactory
+
+CONFIG = b"""
+checks:
+  branch_name:
+    pattern: ^[a-z]+$
+    failure_level: error
+"""
+
+
+class BranchContentProvider(BaseContentProvider):
+    def get_content(self) -> dict:
+        return {'branch': 'feature'}
+
+
+class FakeLocalCheck(BaseCheck):
+    """Runs like LocalCheck, without a Git repository."""
+
+    def __init__(self, config_dict: dict):
+        super().__init__()
+        self._config_dict = config_dict
+        self._content_provider_factory = SingleProviderFactory(BranchContentProvider)
+
+    def run(self):
+        suite = self._create_suite(self._create_config(include_pr=False))
+        suite.run()
+        print('The output of the checks')
+        return suite.results
+
+
+def test_get_statistics():
+    statistics = get_statistics([float(x) for x in range(10, 0, -1)])
+    assert statistics == {'min': 1.0, 'p50': 5.0, 'p90': 9.0, 'max': 10.0}
+    assert get_statistics([])['max'] == 0.0
+
+
+def test_summarize_and_format():
+    iterations = [
+        {
+            'total': 0.02,
+            'timings': [[STAGE_FETCH, 'Provider', [0.001, 0.002]]],
+            'calls': [[CALL_SUBPROCESS, 'git diff', 2]],
+        },
+        {
+            'total': 0.01,
+            'timings': [
+                [STAGE_FETCH, 'Provider', [0.001]],
+                [STAGE_CONFIG, 'load', [0.0005]],
+            ],
+            'calls': [],
+        },
+    ]
+    summary = summarize(iterations)
+    assert summary['iterations'] == 2
+    assert summary['total']['max'] == 0.02
+    assert [x[:2] for x in summary['stages']] == [
+        [STAGE_CONFIG, 'load'],
+        [STAGE_FETCH, 'Provider'],
+    ]
+    assert summary['stages'][1][2]['max'] == 0.003
+    assert summary['calls'] == {'subprocess': 1, 'http': 0}
+
+    output = format_summary('warm: LocalCheck', summary)
+    assert 'warm: LocalCheck (2 iterations)' in output
+    assert 'fetch Provider' in output
+    assert 'Subprocesses per run: 1 (git diff: 1)' in output
+
+
+def test_run_iteration(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(totem.main, 'LocalCheck', FakeLocalCheck)
+    monkeypatch.setenv('TOTEM_CACHE_DIR', str(tmp_path / 'cache'))
+    config_file = tmp_path / 'config.yml'
+    config_file.write_bytes(CONFIG)
+
+    iteration = run_iteration(str(config_file))
+    assert iteration['errors'] == 0
+    assert iteration['total'] > 0
+    stages = {(stage, name) for stage, name, _ in iteration['timings']}
+    assert stages >= {
+        ('config', 'load'),
+        ('config', 'create'),
+        ('fetch', 'BranchContentProvider'),
+        ('check', 'branch_name'),
+    }
+    # The output of the checks is discarded
+    assert capsys.readouterr().out == ''
+
+    assert len(run_warm(str(config_file), iterations=3)) == 3
+
+
+def test_cold_runs_use_an_empty_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('TOTEM_CACHE_DIR', str(tmp_path))
+    cache_dirs = []
+
+    def run(command, **kwargs):
+        cache_dir = kwargs['env']['TOTEM_CACHE_DIR']
+        assert os.listdir(cache_dir) == []
+        cache_dirs.append(cache_dir)
+        output = json.dumps({'timings': [], 'calls': [], 'errors': 0})
+        return subprocess.CompletedProcess(command, 0, output.encode('utf-8'), b'')
+
+    monkeypatch.setattr(subprocess, 'run', run)
+    assert len(run_cold(['--child'], 2)) == 2
+    assert len(set(cache_dirs)) == 2
+    assert str(tmp_path) not in cache_dirs
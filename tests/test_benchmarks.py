@@ -0,0 +1,281 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+from benchmarks.checks import generate_body, generate_commits, generate_patterns
+from benchmarks.core import (
+    Benchmark,
+    create_document,
+    find_missing,
+    find_regressions,
+    prepared,
+    run_benchmarks,
+)
+from benchmarks.fake_github import FakeGithubServer
+from benchmarks.repos import (
+    BRANCH_NAME,
+    HEAD_DETACHED,
+    HEAD_MASTER,
+    MESSAGE_LOWERCASE,
+    SIDE_BRANCH_NAME,
+    create_repo,
+)
+
+
+def get_json(url: str, method: str = 'GET', data: dict = None):
+    """Return the status, the headers and the decoded body of the response."""
+    body = json.dumps(data).encode('utf-8') if data is not None else None
+    try:
+        response = urlopen(Request(url, data=body, method=method))
+    except HTTPError as e:
+        response = e
+    with response:
+        content = response.read()
+        return (
+            response.status,
+            response.headers,
+            json.loads(content.decode('utf-8')) if content else None,
+        )
+
+
+def test_benchmark_uses_returned_duration():
+    benchmark = Benchmark('name', lambda: prepared(lambda: 0.5), repeat=3)
+    stats = benchmark.run()
+    assert stats['runs'] == 3
+    assert stats['median'] == stats['min'] == 0.5
+
+
+def test_benchmark_throughput_and_memory():
+    benchmark = Benchmark(
+        'name',
+        lambda: prepared(lambda: [bytearray(1000) for _ in range(100)] and 0.5),
+        repeat=1,
+        items=1000,
+        trace_memory=True,
+    )
+    stats = benchmark.run()
+    assert stats['throughput'] == 2000
+    assert stats['peak_memory'] >= 100 * 1000
+
+
+def test_find_regressions():
+    baseline = create_document(
+        {
+            'a': {'median': 1.0},
+            'b': {'median': 1.0},
+            'c': {'median': 1.0, 'peak_memory': 100},
+        }
+    )
+    results = {
+        'a': {'median': 1.2},
+        'b': {'median': 1.5},
+        'c': {'median': 1.0, 'peak_memory': 200},
+        'new': {'median': 9.0},
+    }
+    regressions = find_regressions(results, baseline, threshold=0.25)
+    assert [(x['name'], x['metric']) for x in regressions] == [
+        ('b', 'median'),
+        ('c', 'peak_memory'),
+    ]
+    assert regressions[0]['change'] == pytest.approx(0.5)
+
+
+def test_failed_benchmarks_are_reported_and_missing():
+    def fail():
+        raise ValueError('broken')
+
+    benchmarks = [
+        Benchmark('a', lambda: prepared(lambda: None), repeat=1, warmup=0),
+        Benchmark('b', lambda: prepared(fail), repeat=1, warmup=0),
+    ]
+    errors = {}
+    output = io.StringIO()
+    results = run_benchmarks(benchmarks, output=output, errors=errors)
+    assert list(results) == ['a']
+    assert errors == {'b': 'broken'}
+    assert 'b ... error: broken' in output.getvalue()
+
+    baseline = create_document({'a': {}, 'b': {}, 'c.other': {}})
+    assert find_missing(results, baseline) == ['b', 'c.other']
+    assert find_missing(results, baseline, ['a', 'b']) == ['b']
+
+
+def test_synthetic_content_is_deterministic():
+    first, second = generate_commits(50), generate_commits(50)
+    assert [x.message for x in first] == [x.message for x in second]
+    assert len(generate_body(10000)) >= 10000
+    assert generate_body(1000) == generate_body(1000)
+    assert len(set(generate_patterns(100))) == 100
+
+
+def test_fake_github_pull_request_and_pagination():
+    with FakeGithubServer(commits=45) as server:
+        status, _, pull = get_json('{}/repos/owner/repo/pulls/1'.format(server.url))
+        assert status == 200
+        assert pull['head']['ref'] == 'feature'
+
+        url = '{}/repos/owner/repo/pulls/1/commits'.format(server.url)
+        _, headers, first_page = get_json(url)
+        assert len(first_page) == 30
+        assert 'rel="next"' in headers['Link']
+
+        next_url = headers['Link'].split(';')[0].strip('<>')
+        _, headers, second_page = get_json(next_url)
+        assert len(second_page) == 15
+        assert headers['Link'] is None
+
+        _, _, commit = get_json(first_page[0]['url'])
+        assert commit['stats']['total'] == 12
+
+
+def test_fake_github_comments():
+    with FakeGithubServer() as server:
+        url = '{}/repos/owner/repo/issues/1/comments'.format(server.url)
+        status, _, comment = get_json(url, 'POST', {'body': 'Hello'})
+        assert status == 201
+        assert get_json(url)[2] == [comment]
+
+        status, _, _ = get_json(comment['url'], 'DELETE')
+        assert status == 204
+        assert get_json(url)[2] == []
+
+
+def test_fake_github_page_size():
+    with FakeGithubServer(commits=250, page_size=50) as server:
+        url = '{}/repos/owner/repo/pulls/1/commits'.format(server.url)
+        _, headers, page = get_json(url)
+        assert len(page) == 50
+        assert 'page=5&per_page=50>; rel="last"' in headers['Link']
+
+        # The page size is capped, like on Github
+        _, _, page = get_json(url + '?per_page=500')
+        assert len(page) == 100
+
+
+def test_fake_github_rate_limit():
+    with FakeGithubServer(rate_limit=2) as server:
+        url = '{}/repos/owner/repo'.format(server.url)
+        status, headers, _ = get_json(url)
+        assert status == 200
+        assert headers['X-RateLimit-Limit'] == '2'
+        assert headers['X-RateLimit-Remaining'] == '1'
+
+        assert get_json(url)[0] == 200
+        status, headers, data = get_json(url)
+        assert status == 403
+        assert headers['X-RateLimit-Remaining'] == '0'
+        assert 'rate limit exceeded' in data['message']
+
+        # Checking the rate limit is always allowed
+        status, _, data = get_json('{}/rate_limit'.format(server.url))
+        assert status == 200
+        assert data['resources']['core']['remaining'] == 0
+
+
+def test_fake_github_error_injection():
+    with FakeGithubServer() as server:
+        server.inject_error(
+            502, path='/pulls/1$', method='GET', times=2, headers={'Retry-After': '1'}
+        )
+        url = '{}/repos/owner/repo/pulls/1'.format(server.url)
+        status, headers, _ = get_json(url)
+        assert status == 502
+        assert headers['Retry-After'] == '1'
+        assert get_json(url)[0] == 502
+        assert get_json(url)[0] == 200
+
+        # Other paths are not affected
+        assert get_json('{}/repos/owner/repo'.format(server.url))[0] == 200
+        assert server.requests == [
+            ('GET', '/repos/owner/repo/pulls/1'),
+            ('GET', '/repos/owner/repo/pulls/1'),
+            ('GET', '/repos/owner/repo/pulls/1'),
+            ('GET', '/repos/owner/repo'),
+        ]
+
+
+def test_fake_github_error_probability_and_latency():
+    with FakeGithubServer(latency=0.05, seed=1) as server:
+        server.inject_error(500, probability=0.5)
+        url = '{}/repos/owner/repo'.format(server.url)
+        start = time.perf_counter()
+        statuses = [get_json(url)[0] for _ in range(10)]
+        assert time.perf_counter() - start >= 10 * 0.05
+        assert set(statuses) == {200, 500}
+
+
+requires_git = pytest.mark.skipif(
+    shutil.which('git') is None, reason='Git is not installed'
+)
+
+
+@pytest.fixture()
+def repo_dir():
+    directory = tempfile.mkdtemp(prefix='totem-')
+    yield directory
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def git(directory: str, *args) -> str:
+    output = subprocess.check_output(['git'] + list(args), cwd=directory)
+    return output.decode('utf-8').strip()
+
+
+@requires_git
+def test_create_repo(repo_dir):
+    create_repo(repo_dir, commits=20, branch_commits=2)
+    assert git(repo_dir, 'rev-list', '--count', 'HEAD') == '22'
+    assert git(repo_dir, 'rev-parse', '--abbrev-ref', 'HEAD') == BRANCH_NAME
+    assert git(repo_dir, 'status', '--porcelain') == ''
+
+
+@requires_git
+def test_create_repo_with_merges_and_detached_head(repo_dir):
+    create_repo(
+        repo_dir, commits=30, merge_every=10, merge_commits=3, head=HEAD_DETACHED
+    )
+    assert git(repo_dir, 'rev-list', '--first-parent', '--count', 'master') == '30'
+    assert git(repo_dir, 'rev-list', '--merges', '--count', 'master') == '2'
+    assert git(repo_dir, 'rev-list', '--count', 'master') == str(30 + 2 * 3)
+    assert git(repo_dir, 'rev-parse', '--abbrev-ref', 'HEAD') == 'HEAD'
+    assert git(repo_dir, 'branch', '--list', SIDE_BRANCH_NAME) == ''
+
+
+@requires_git
+def test_create_repo_diff_sizes_and_messages(repo_dir):
+    create_repo(
+        repo_dir,
+        commits=5,
+        branch_commits=0,
+        files_per_commit=(3, 3),
+        lines_per_file=(50, 50),
+        message_weights={MESSAGE_LOWERCASE: 1},
+        head=HEAD_MASTER,
+    )
+    stat = git(repo_dir, 'show', '--shortstat', '--format=%s', 'HEAD').splitlines()
+    assert stat[0][0].islower()
+    assert '150 insertions(+)' in stat[-1]
+    assert git(repo_dir, 'rev-parse', '--abbrev-ref', 'HEAD') == 'master'
+
+
+@requires_git
+def test_create_repo_is_deterministic(repo_dir):
+    create_repo(os.path.join(repo_dir, 'a'), commits=10, merge_every=4)
+    create_repo(os.path.join(repo_dir, 'b'), commits=10, merge_every=4)
+    assert git(os.path.join(repo_dir, 'a'), 'rev-parse', 'HEAD') == git(
+        os.path.join(repo_dir, 'b'), 'rev-parse', 'HEAD'
+    )
+
+
+def test_create_repo_invalid_parameters(repo_dir):
+    with pytest.raises(ValueError):
+        create_repo(repo_dir, commits=1, head='nowhere')
+    with pytest.raises(ValueError):
+        create_repo(repo_dir, commits=1, message_weights={'unknown': 1})
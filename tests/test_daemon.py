@@ -0,0 +1,144 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+from totem.daemon import (
+    DaemonServer,
+    can_run_in_daemon,
+    run_in_daemon,
+    send_request,
+)
+
+
+def fake_runner(argv):
+    """Print everything the daemon forwarded, instead of running the CLI."""
+    print('argv={}'.format(argv))
+    print('cwd={}'.format(os.getcwd()))
+    print('index={}'.format(os.environ.get('GIT_INDEX_FILE')))
+    print('stdin={}'.format(sys.stdin.read()))
+    print('an error', file=sys.stderr)
+    return 3
+
+
+@pytest.fixture()
+def socket_path():
+    """Return a short socket path, since Unix socket paths have a small limit."""
+    directory = tempfile.mkdtemp(prefix='totem-', dir='/tmp')
+    yield os.path.join(directory, 'daemon.sock')
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture()
+def stdin_pipe(monkeypatch):
+    """Replace the standard input with a pipe and return its write end."""
+    read_fd, write_fd = os.pipe()
+    stdin = os.fdopen(read_fd)
+    monkeypatch.setattr(sys, 'stdin', stdin)
+    yield write_fd
+    stdin.close()
+    try:
+        os.close(write_fd)
+    except OSError:
+        pass
+
+
+@pytest.fixture()
+def server(socket_path):
+    """Start a daemon in a thread and stop it after the test."""
+    server = DaemonServer(socket_path, runner=fake_runner, idle_timeout=10)
+    server.start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    send_request({'command': 'stop'}, socket_path)
+    thread.join(5)
+
+
+def test_can_run_in_daemon():
+    assert can_run_in_daemon([])
+    assert can_run_in_daemon(['-c', 'config.yml', 'file.py'])
+    assert not can_run_in_daemon(['-p', 'https://github.com/a/b/pull/1'])
+    assert not can_run_in_daemon(['--pr-url=https://github.com/a/b/pull/1'])
+
+
+def test_run_in_daemon_without_daemon(socket_path):
+    assert run_in_daemon(['arg'], socket_path) is None
+
+
+def test_run_in_daemon(server, socket_path, stdin_pipe, tmpdir, monkeypatch, capsys):
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setenv('GIT_INDEX_FILE', '/tmp/index')
+    os.write(stdin_pipe, b'input')
+    os.close(stdin_pipe)
+
+    exit_code = run_in_daemon(['-c', 'config.yml'], socket_path)
+
+    assert exit_code == 3
+    out, err = capsys.readouterr()
+    assert out.splitlines() == [
+        "argv=['-c', 'config.yml']",
+        'cwd={}'.format(os.path.realpath(str(tmpdir))),
+        'index=/tmp/index',
+        'stdin=input',
+    ]
+    assert err == 'an error\n'
+
+    # The state of the client does not leak into the daemon
+    assert os.environ.get('GIT_INDEX_FILE') == '/tmp/index'
+    monkeypatch.delenv('GIT_INDEX_FILE')
+    run_in_daemon([], socket_path)
+    assert 'index=None' in capsys.readouterr()[0]
+
+
+def test_stdin_is_read_until_eof(server, socket_path, stdin_pipe, capsys):
+    def write_late():
+        time.sleep(0.1)
+        os.write(stdin_pipe, b'refs/heads/main')
+        os.close(stdin_pipe)
+
+    thread = threading.Thread(target=write_late)
+    thread.start()
+    run_in_daemon([], socket_path)
+    thread.join()
+    assert 'stdin=refs/heads/main' in capsys.readouterr()[0]
+
+
+def test_stdin_is_only_read_if_needed(socket_path, stdin_pipe, capsys):
+    server = DaemonServer(socket_path, runner=lambda argv: 0, idle_timeout=10)
+    server.start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # The pipe is never closed, but the invocation does not read it
+        assert run_in_daemon([], socket_path) == 0
+    finally:
+        send_request({'command': 'stop'}, socket_path)
+        thread.join(5)
+
+    # The standard input is still available if the daemon does not handle
+    # the invocation, which then runs in-process
+    os.write(stdin_pipe, b'refs/heads/main')
+    os.close(stdin_pipe)
+    assert run_in_daemon([], socket_path) is None
+    assert sys.stdin.read() == 'refs/heads/main'
+
+
+def test_pr_checks_are_not_handled(server, socket_path):
+    response = send_request({'argv': ['-p', 'url']}, socket_path)
+    assert 'error' in response
+    assert run_in_daemon(['-p', 'url'], socket_path) is None
+
+
+def test_only_one_daemon_per_socket(server, socket_path):
+    assert 'pid' in send_request({'command': 'ping'}, socket_path)
+    with pytest.raises(RuntimeError):
+        DaemonServer(socket_path).start()
+
+
+def test_stop(server, socket_path):
+    send_request({'command': 'stop'}, socket_path)
+    assert send_request({'command': 'ping'}, socket_path) is None
@@ -0,0 +1,83 @@
+from totem.github.usage import GithubAPIUsage, get_endpoint
+
+
+class FakeResponse:
+    def __init__(self, status=200, **headers):
+        self.status = status
+        self.headers = {
+            'X-RateLimit-{}'.format(key.capitalize()): str(value)
+            for key, value in headers.items()
+        }
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+def test_get_endpoint():
+    assert get_endpoint('/repos/owner/repo') == '/repos/{owner}/{repo}'
+    assert (
+        get_endpoint('/repos/owner/repo/pulls/12/commits')
+        == '/repos/{owner}/{repo}/pulls/{number}/commits'
+    )
+    assert (
+        get_endpoint('/repos/owner/repo/issues/comments/345')
+        == '/repos/{owner}/{repo}/issues/comments/{id}'
+    )
+    assert (
+        get_endpoint('/repos/owner/repo/commits/1a2b3c4d5e6f')
+        == '/repos/{owner}/{repo}/commits/{sha}'
+    )
+    assert get_endpoint('/api/v3/rate_limit', '/api/v3') == '/rate_limit'
+
+
+def test_usage_counts_requests_and_rate_limit():
+    usage = GithubAPIUsage('https://api.github.com')
+    host = 'api.github.com'
+    usage.observe(
+        host,
+        'GET',
+        '/repos/owner/repo/pulls/1',
+        FakeResponse(limit=5000, remaining=4990, reset=100),
+    )
+    usage.observe(
+        host,
+        'GET',
+        '/repos/owner/repo/pulls/2',
+        FakeResponse(limit=5000, remaining=4989, reset=100),
+    )
+    # Conditional requests served from the cache do not use the rate limit
+    usage.observe(
+        host,
+        'GET',
+        '/repos/owner/repo/pulls/1',
+        FakeResponse(304, limit=5000, remaining=4989),
+    )
+    # Other hosts are ignored
+    usage.observe('example.com', 'GET', '/other', FakeResponse())
+
+    assert usage.as_data() == {
+        'total': 3,
+        'requests': {'GET /repos/{owner}/{repo}/pulls/{number}': 3},
+        'rate_limit': {
+            'limit': 5000,
+            'remaining_before': 4991,
+            'remaining_after': 4989,
+            'reset': 100,
+        },
+    }
+
+
+def test_usage_without_rate_limit_headers():
+    usage = GithubAPIUsage('https://github.example.com/api/v3/')
+    usage.observe(
+        'github.example.com',
+        'POST',
+        '/api/v3/repos/o/r/issues/3/comments',
+        FakeResponse(201),
+    )
+
+    data = usage.as_data()
+    assert data['requests'] == {
+        'POST /repos/{owner}/{repo}/issues/{number}/comments': 1
+    }
+    assert data['rate_limit']['remaining_before'] is None
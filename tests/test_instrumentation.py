@@ -0,0 +1,172 @@
+import http.server
+import subprocess
+import sys
+import threading
+from urllib.request import urlopen
+
+from totem.checks.content import BaseContentProvider
+from totem.instrumentation import (
+    CALL_HTTP,
+    CALL_SUBPROCESS,
+    STAGE_CHECK,
+    STAGE_CONFIG,
+    STAGE_FETCH,
+    STAGE_REMOTE,
+    Recorder,
+    _describe_command,
+    is_recording,
+    measure,
+    measured,
+    observing_responses,
+    recording,
+)
+from totem.reporting.profile import ProfileReport
+
+from tests.helpers import get_passing_suite
+
+
+class SubprocessContentProvider(BaseContentProvider):
+    def get_content(self) -> dict:
+        subprocess.check_call([sys.executable, '-c', 'pass'])
+        return {}
+
+
+def test_measure_is_noop_when_not_recording():
+    assert not is_recording()
+    assert measure(STAGE_CHECK, 'a') is measure(STAGE_CHECK, 'b')
+    with measure(STAGE_CHECK, 'a'):
+        pass
+
+
+def test_recording_keeps_timings():
+    with recording(Recorder(count_calls=False)) as recorder:
+        assert is_recording()
+        with measure(STAGE_CHECK, 'a'):
+            pass
+        with measure(STAGE_CHECK, 'a'):
+            pass
+    assert not is_recording()
+    assert list(recorder.timings) == [(STAGE_CHECK, 'a')]
+    assert len(recorder.timings[STAGE_CHECK, 'a']) == 2
+
+
+def test_recording_counts_subprocesses_and_http_requests():
+    popen_init = subprocess.Popen.__init__
+    server = http.server.HTTPServer(
+        ('127.0.0.1', 0), http.server.SimpleHTTPRequestHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with recording() as recorder:
+            subprocess.check_call([sys.executable, '-c', 'pass'])
+            urlopen('http://127.0.0.1:{}/?q=1'.format(server.server_port)).read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert recorder.get_call_count(CALL_SUBPROCESS) == 1
+    assert recorder.calls[CALL_HTTP, 'GET /'] == 1
+    # The wrapped functions are restored
+    assert subprocess.Popen.__init__ is popen_init
+
+
+def test_observing_responses():
+    responses = []
+
+    def observer(host, method, path, response):
+        responses.append((host, method, path, response.status))
+
+    server = http.server.HTTPServer(
+        ('127.0.0.1', 0), http.server.SimpleHTTPRequestHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = 'http://127.0.0.1:{}/?q=1'.format(server.server_port)
+    try:
+        with observing_responses(observer):
+            urlopen(url).read()
+        urlopen(url).read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert responses == [('127.0.0.1', 'GET', '/', 200)]
+
+
+def test_failing_response_observer_does_not_affect_request(capsys):
+    def observer(host, method, path, response):
+        raise ValueError('bad header')
+
+    server = http.server.HTTPServer(
+        ('127.0.0.1', 0), http.server.SimpleHTTPRequestHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with observing_responses(observer):
+            response = urlopen('http://127.0.0.1:{}/'.format(server.server_port))
+            assert response.status == 200
+            response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'failed: bad header' in capsys.readouterr().err
+
+
+def test_describe_command():
+    assert _describe_command(['/usr/bin/git', 'diff', '--cached']) == 'git diff'
+    assert _describe_command(['git', '--version']) == 'git'
+    assert _describe_command('git log -n 1') == 'git log'
+
+
+def test_suite_records_fetch_and_check_stages():
+    suite = get_passing_suite(SubprocessContentProvider)
+    with recording() as recorder:
+        suite.run()
+
+    assert suite.results.successful
+    assert (STAGE_FETCH, 'SubprocessContentProvider') in recorder.timings
+    assert (STAGE_CHECK, 'passing') in recorder.timings
+    assert recorder.get_call_count(CALL_SUBPROCESS) == 1
+
+
+class Service:
+    @measured(STAGE_REMOTE)
+    def get_item(self, number):
+        return number * 2
+
+
+def test_measured_decorator():
+    service = Service()
+    assert service.get_item(1) == 2
+    with recording(Recorder(count_calls=False)) as recorder:
+        assert service.get_item(2) == 4
+    assert len(recorder.timings[STAGE_REMOTE, 'Service.get_item']) == 1
+    assert Service.get_item.__name__ == 'get_item'
+
+
+def test_profile_report():
+    recorder = Recorder()
+    recorder.record(STAGE_CHECK, 'branch_name', 0.25)
+    recorder.record(STAGE_CONFIG, 'load', 0.125)
+    recorder.record(STAGE_CONFIG, 'load', 0.125)
+    recorder.count(CALL_SUBPROCESS, 'git log')
+    report = ProfileReport(recorder, total=1.0)
+
+    data = report.get_data()
+    assert data['total'] == 1.0
+    assert data['stages'] == [
+        {'stage': STAGE_CONFIG, 'name': 'load', 'calls': 2, 'duration': 0.25},
+        {'stage': STAGE_CHECK, 'name': 'branch_name', 'calls': 1, 'duration': 0.25},
+    ]
+    assert data['calls'] == [
+        {'kind': CALL_SUBPROCESS, 'description': 'git log', 'count': 1}
+    ]
+
+    summary = report.get_summary()
+    assert 'total: 1000.0 ms' in summary
+    assert 'branch_name' in summary and '25.0%' in summary
+    assert 'Subprocesses: 1 (git log: 1)' in summary
+    assert 'HTTP requests: 0' in summary
@@ -0,0 +1,81 @@
+import tracemalloc
+
+from totem.checks.content import BaseContentProvider
+from totem.instrumentation import STAGE_CHECK, STAGE_FETCH, measure
+from totem.memory import MemoryTracer, tracing_memory
+from totem.reporting.memory import MemoryReport, format_size
+
+from tests.helpers import get_passing_suite
+
+SIZE = 1024 * 1024
+
+
+class LargeContentProvider(BaseContentProvider):
+    def get_content(self) -> dict:
+        # A temporary allocation that is freed before returning
+        temporary = bytearray(SIZE)
+        del temporary
+        return {'commits': [bytearray(SIZE)]}
+
+
+def test_tracing_memory_attributes_stages():
+    suite = get_passing_suite(LargeContentProvider)
+    with tracing_memory() as tracer:
+        suite.run()
+
+    assert not tracemalloc.is_tracing()
+    assert suite.results.successful
+    fetch = tracer.stages[STAGE_FETCH, 'LargeContentProvider']
+    assert fetch['calls'] == 1
+    assert fetch['peak'] >= SIZE
+    assert SIZE <= fetch['retained'] < 2 * SIZE
+    assert tracer.stages[STAGE_CHECK, 'passing']['calls'] == 1
+    assert tracer.peak >= SIZE
+    assert tracer.top_allocations
+    assert tracer.top_allocations[0]['size'] >= SIZE
+
+
+def test_nested_measurements():
+    with tracing_memory(MemoryTracer(top=1)) as tracer:
+        with measure(STAGE_CHECK, 'outer'):
+            with measure(STAGE_FETCH, 'inner'):
+                data = bytearray(SIZE)
+            del data
+
+    assert tracer.stages[STAGE_FETCH, 'inner']['retained'] >= SIZE
+    assert tracer.stages[STAGE_CHECK, 'outer']['peak'] >= SIZE
+    assert tracer.stages[STAGE_CHECK, 'outer']['retained'] < SIZE
+    assert len(tracer.top_allocations) == 1
+
+
+def test_memory_report():
+    tracer = MemoryTracer()
+    tracer.peak = 3 * SIZE
+    tracer.current = 2048
+    tracer.stages = {
+        (STAGE_CHECK, 'branch_name'): {'calls': 1, 'peak': 10, 'retained': 0},
+        (STAGE_FETCH, 'GitCommitsContentProvider'): {
+            'calls': 1,
+            'peak': 2 * SIZE,
+            'retained': SIZE,
+        },
+    }
+    tracer.snapshot_size = 2 * SIZE
+    tracer.top_allocations = [
+        {'file': 'totem/checks/content.py', 'line': 10, 'size': SIZE, 'count': 3}
+    ]
+    report = MemoryReport(tracer)
+
+    data = report.get_data()
+    assert [x['stage'] for x in data['stages']] == [STAGE_FETCH, STAGE_CHECK]
+    summary = report.get_summary()
+    assert 'peak: 3.0 MiB, at the end: 2.0 KiB' in summary
+    assert 'GitCommitsContentProvider' in summary
+    assert 'totem/checks/content.py:10' in summary
+
+
+def test_format_size():
+    assert format_size(12) == '12 B'
+    assert format_size(1536) == '1.5 KiB'
+    assert format_size(5 * SIZE) == '5.0 MiB'
+    assert format_size(2048 * SIZE) == '2.0 GiB'
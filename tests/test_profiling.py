@@ -0,0 +1,62 @@
+import json
+import pstats
+import threading
+import time
+
+from totem.profiling import (
+    FORMAT_PSTATS,
+    FORMAT_SPEEDSCOPE,
+    DeterministicProfiler,
+    SamplingProfiler,
+    create_profiler,
+    get_profile_format,
+)
+
+
+def busy_function(duration):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+def test_get_profile_format():
+    assert get_profile_format('profile.speedscope.json') == FORMAT_SPEEDSCOPE
+    assert get_profile_format('PROFILE.JSON') == FORMAT_SPEEDSCOPE
+    assert get_profile_format('profile.prof') == FORMAT_PSTATS
+    assert isinstance(create_profiler('profile.json'), SamplingProfiler)
+    assert isinstance(create_profiler('profile.pstats'), DeterministicProfiler)
+
+
+def test_deterministic_profiler(tmp_path):
+    path = str(tmp_path / 'profile.prof')
+    with DeterministicProfiler() as profiler:
+        busy_function(0.01)
+    profiler.write(path)
+
+    stats = pstats.Stats(path)
+    assert any(name == 'busy_function' for _, _, name in stats.stats)
+
+
+def test_sampling_profiler_samples_all_threads(tmp_path):
+    path = str(tmp_path / 'profile.json')
+    with SamplingProfiler() as profiler:
+        thread = threading.Thread(target=busy_function, args=(0.05,), name='worker')
+        thread.start()
+        busy_function(0.05)
+        thread.join()
+    profiler.write(path)
+
+    with open(path) as f:
+        data = json.load(f)
+    frames = data['shared']['frames']
+    profiles = {x['name']: x for x in data['profiles']}
+    assert {'MainThread', 'worker'} <= set(profiles)
+    for profile in profiles.values():
+        assert profile['type'] == 'sampled'
+        assert len(profile['samples']) == len(profile['weights'])
+        assert profile['endValue'] == sum(profile['weights'])
+
+    worker = profiles['worker']
+    names = {frames[index]['name'] for stack in worker['samples'] for index in stack}
+    assert 'busy_function' in names
+    assert 'totem-profiler' not in profiles
@@ -0,0 +1,93 @@
+"""Make sure that each mode of the CLI only imports what it needs,
+so that startup stays fast, e.g. when running as a Git hook.
+
+Each mode runs in a new interpreter, in order to start with no modules loaded.
+The time budgets are generous and can be adjusted for slow environments
+via the TOTEM_STARTUP_BUDGET_FACTOR environment variable.
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Top-level packages that are expensive to import
+HEAVY_MODULES = {'git', 'github', 'requests', 'urllib3', 'pyaml', 'yaml'}
+
+# For each mode: the code that sets it up, the heavy modules it is allowed
+# to import, and the maximum time in seconds the setup can take
+MODES = {
+    'daemon-client': (
+        'import totem.__main__; '
+        'from totem.daemon import run_in_daemon; '
+        'run_in_daemon([], "/nonexistent/daemon.sock")',
+        set(),
+        0.15,
+    ),
+    'import': ('import totem.main', set(), 0.3),
+    'local': ('from totem.main import LocalCheck; LocalCheck({})', {'git'}, 0.6),
+    'pre-commit': (
+        'from totem.main import PreCommitLocalCheck; PreCommitLocalCheck({})',
+        {'git'},
+        0.6,
+    ),
+    'pr': (
+        'from totem.main import PRCheck; '
+        'PRCheck({}, "https://github.com/owner/repo/pull/1")',
+        {'github', 'requests', 'urllib3'},
+        1.0,
+    ),
+}
+
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+{code}
+duration = time.perf_counter() - start
+print(json.dumps({{'duration': duration, 'modules': sorted(sys.modules)}}))
+'''
+
+
+def run_mode(code: str) -> dict:
+    """Run the given code in a new interpreter and return the time it took
+    and all modules that were imported."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCRIPT.format(code=code)], cwd=root
+    )
+    return json.loads(output.decode('utf-8').splitlines()[-1])
+
+
+@pytest.mark.parametrize('mode', sorted(MODES))
+def test_startup_budget(mode):
+    code, allowed, budget = MODES[mode]
+    for module in allowed:
+        if importlib.util.find_spec(module) is None:
+            pytest.skip('Module "{}" is not installed'.format(module))
+
+    data = run_mode(code)
+    imported = {x.split('.')[0] for x in data['modules']}
+    assert imported & HEAVY_MODULES <= allowed
+
+    factor = float(os.environ.get('TOTEM_STARTUP_BUDGET_FACTOR', 1))
+    assert data['duration'] < budget * factor
+
+
+def test_version_is_resolved_lazily():
+    data = run_mode('import totem.main')
+    assert 'totem._version' not in data['modules']
+    assert 'subprocess' not in data['modules']
+
+    data = run_mode('import totem; assert totem.__version__')
+    assert 'totem._version' in data['modules']
+
+
+def test_cli_imports_only_what_it_needs():
+    pytest.importorskip('click')
+    data = run_mode('import cli')
+    assert not {x.split('.')[0] for x in data['modules']} & HEAVY_MODULES
+    for module in ('totem.bench', 'totem.profiling', 'totem.tracing'):
+        assert module not in data['modules']
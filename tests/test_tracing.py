@@ -0,0 +1,131 @@
+import http.server
+import json
+import subprocess
+import sys
+import threading
+from urllib.request import urlopen
+
+import pytest
+from totem.checks.config import EXECUTION_SERIAL, EXECUTION_THREADS
+from totem.checks.content import BaseContentProvider
+from totem.instrumentation import (
+    SPAN_KIND_CLIENT,
+    Tracer,
+    get_current_span,
+    is_tracing,
+    span,
+    tracing,
+)
+from totem.tracing import TRACES_FILE_ENV, OTLPJSONFileExporter, traced_from_env
+
+from tests.helpers import get_passing_suite
+
+
+class CommitsContentProvider(BaseContentProvider):
+    def get_content(self) -> dict:
+        subprocess.check_call([sys.executable, '-c', 'pass'])
+        return {'commits': ['a', 'b']}
+
+
+def get_spans_by_name(tracer: Tracer) -> dict:
+    return {x.name: x for x in tracer.spans}
+
+
+def test_span_is_noop_when_not_tracing():
+    assert not is_tracing()
+    with span('totem.run'):
+        assert get_current_span() is None
+
+
+@pytest.mark.parametrize('mode', [EXECUTION_SERIAL, EXECUTION_THREADS])
+def test_suite_spans_are_nested(mode):
+    suite = get_passing_suite(CommitsContentProvider, {'mode': mode})
+    with tracing() as tracer:
+        with span('totem.run'):
+            suite.run()
+    assert get_current_span() is None
+
+    spans = get_spans_by_name(tracer)
+    process = spans[sys.executable.rsplit('/', 1)[-1]]
+    fetch = spans['fetch CommitsContentProvider']
+    check = spans['totem.check']
+    suite_span = spans['totem.suite']
+    assert process.kind == SPAN_KIND_CLIENT
+    assert process.attributes['process.exit_code'] == 0
+    assert process.parent_id == fetch.span_id
+    assert fetch.parent_id == check.span_id
+    assert fetch.attributes['totem.commits.count'] == 2
+    assert spans['check passing'].parent_id == check.span_id
+    assert check.parent_id == suite_span.span_id
+    assert check.attributes['totem.check.type'] == 'passing'
+    assert check.attributes['totem.check.status'] == 'pass'
+    assert suite_span.attributes['totem.execution.mode'] == mode
+    assert suite_span.parent_id == spans['totem.run'].span_id
+    assert len({x.trace_id for x in tracer.spans}) == 1
+    assert all(x.end_time >= x.start_time for x in tracer.spans)
+
+
+def test_http_request_span():
+    server = http.server.HTTPServer(
+        ('127.0.0.1', 0), http.server.SimpleHTTPRequestHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with tracing() as tracer:
+            url = 'http://127.0.0.1:{}/missing?q=1'.format(server.server_port)
+            with pytest.raises(Exception):
+                urlopen(url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    request = get_spans_by_name(tracer)['HTTP GET']
+    assert request.attributes['url.path'] == '/missing'
+    assert request.attributes['http.response.status_code'] == 404
+
+
+def test_span_records_errors():
+    with tracing() as tracer:
+        with pytest.raises(ValueError):
+            with span('failing'):
+                raise ValueError('Broken')
+    assert tracer.spans[0].error == 'ValueError: Broken'
+
+
+def test_otlp_json_encoding():
+    with tracing() as tracer:
+        with span('parent', {'totem.pr.number': 12, 'totem.cached': True}):
+            with span('child'):
+                pass
+    data = OTLPJSONFileExporter.encode(tracer.spans)
+    spans = data['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert [x['name'] for x in spans] == ['parent', 'child']
+    assert spans[1]['parentSpanId'] == spans[0]['spanId']
+    assert 'parentSpanId' not in spans[0]
+    assert len(spans[0]['traceId']) == 32 and len(spans[0]['spanId']) == 16
+    assert int(spans[0]['endTimeUnixNano']) >= int(spans[0]['startTimeUnixNano'])
+    assert spans[0]['attributes'] == [
+        {'key': 'totem.pr.number', 'value': {'intValue': '12'}},
+        {'key': 'totem.cached', 'value': {'boolValue': True}},
+    ]
+
+
+def test_traced_from_env(tmp_path, monkeypatch):
+    with traced_from_env() as tracer:
+        assert tracer is None
+
+    path = tmp_path / 'traces' / 'totem.jsonl'
+    monkeypatch.setenv(TRACES_FILE_ENV, str(path))
+    for _ in range(2):
+        with traced_from_env() as tracer:
+            with span('totem.run'):
+                pass
+    assert not is_tracing()
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    resource = json.loads(lines[0])['resourceSpans'][0]
+    assert {'key': 'service.name', 'value': {'stringValue': 'totem'}} in resource[
+        'resource'
+    ]['attributes']
@@ -1,5 +1,25 @@
+import sys
 
-from totem._version import get_versions
+# The version is resolved on first access, because for source and editable
+# installs, versioneer runs `git` subprocesses to compute it, which would
+# slow down every invocation (e.g. of a Git hook). Installed packages
+# have a static version file, so accessing it is cheap anyway.
 
-__version__ = get_versions()['version']
-del get_versions
+
+def _get_version() -> str:
+    from totem._version import get_versions
+
+    return get_versions()['version']
+
+
+def __getattr__(name: str):
+    if name == '__version__':
+        version = _get_version()
+        globals()['__version__'] = version
+        return version
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+# Module-level __getattr__ is only supported in Python 3.7+
+if sys.version_info < (3, 7):
+    __version__ = _get_version()
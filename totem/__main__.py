@@ -0,0 +1,40 @@
+"""The entry point of the `totem` command.
+
+Dispatches `totem daemon` to the daemon and `totem bench` to the benchmark,
+and forwards local invocations to a running daemon, before loading
+the full CLI. This module is imported on every invocation, so it should
+stay as light as possible.
+"""
+
+import os
+import sys
+
+
+def main():
+    """Run the `totem` command."""
+    argv = sys.argv[1:]
+    if argv[:1] == ['daemon']:
+        from totem.daemon import daemon_main
+
+        sys.exit(daemon_main(argv[1:]))
+    if argv[:1] == ['bench']:
+        from totem.bench import bench_main
+
+        sys.exit(bench_main(argv[1:]))
+
+    # Setting TOTEM_NO_DAEMON makes sure that the invocation runs in-process
+    if not os.environ.get('TOTEM_NO_DAEMON'):
+        from totem.daemon import can_run_in_daemon, run_in_daemon
+
+        if can_run_in_daemon(argv):
+            exit_code = run_in_daemon(argv)
+            if exit_code is not None:
+                sys.exit(exit_code)
+
+    import cli
+
+    cli.main(prog_name='totem')
+
+
+if __name__ == '__main__':
+    main()
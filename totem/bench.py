@@ -0,0 +1,381 @@
+"""Contains the `totem bench` subcommand, which shows where the time
+of a run goes, on the user's own repository or PR.
+
+It runs the configured suite repeatedly, the same way the CLI does,
+and reports the distribution of the latency of each stage (see
+`totem.instrumentation`), along with the number of subprocesses
+and HTTP requests of each run.
+
+There are two variants:
+ - warm: all iterations run in the same process, after an untimed one,
+   so that imports, parsed configurations and repository handles
+   are reused, as in the daemon
+ - cold: each iteration runs in a new process, as a new invocation
+   of a Git hook does, with an empty cache directory, so that the config
+   file is parsed from scratch; its total time includes the startup
+   of the interpreter
+
+Measurements are taken in the process that runs the suite, so the stages
+of checks that run in the `processes` execution mode are not included.
+
+PR comments are never created while benchmarking, unless requested.
+"""
+
+import contextlib
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from totem.instrumentation import (
+    CALL_HTTP,
+    CALL_SUBPROCESS,
+    STAGES,
+    Recorder,
+    recording,
+)
+
+VARIANT_WARM = 'warm'
+VARIANT_COLD = 'cold'
+VARIANTS = (VARIANT_WARM, VARIANT_COLD)
+
+DEFAULT_ITERATIONS = 10
+
+# The percentiles shown for each measurement, along with the maximum
+PERCENTILES = (50, 90)
+
+
+def bench_main(argv: List[str]) -> int:
+    """Handle the `totem bench` subcommand.
+
+    :param list argv: the arguments after `bench`
+    :return: the exit code
+    :rtype: int
+    """
+    import argparse
+
+    from totem.main import get_mode_name
+
+    parser = argparse.ArgumentParser(
+        prog='totem bench',
+        description='Run the configured checks repeatedly and show '
+        'how long each stage takes.',
+    )
+    parser.add_argument('-c', '--config-file', help='the path of the config file')
+    parser.add_argument('-p', '--pr-url', help='benchmark the PR on this URL')
+    parser.add_argument(
+        '--pre-commit',
+        action='store_true',
+        help='benchmark the pre-commit mode, on the staged changes',
+    )
+    parser.add_argument(
+        '-n',
+        '--iterations',
+        type=int,
+        default=DEFAULT_ITERATIONS,
+        help='the number of runs of each variant (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--variant',
+        choices=VARIANTS + ('both',),
+        default='both',
+        help='run all iterations in the same process (warm), each in a new '
+        'process (cold), or both (default)',
+    )
+    parser.add_argument(
+        '--comment',
+        action='store_true',
+        help='allow creating PR comments, if the config enables them',
+    )
+    parser.add_argument(
+        '--json', metavar='PATH', help='also write all measurements as JSON'
+    )
+    # Runs a single iteration and prints its measurements, for the cold variant
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        try:
+            iteration = run_iteration(
+                args.config_file, args.pr_url, args.pre_commit, args.comment
+            )
+        except Exception as e:
+            print('error: {}'.format(e), file=sys.stderr)
+            return 1
+        print(json.dumps(iteration))
+        return 0
+
+    if args.iterations < 1:
+        parser.error('the number of iterations needs to be positive')
+    variants = VARIANTS if args.variant == 'both' else (args.variant,)
+    mode = get_mode_name(args.pr_url, args.pre_commit)
+
+    document: Dict[str, dict] = {'mode': mode, 'variants': {}}
+    for variant in variants:
+        try:
+            if variant == VARIANT_WARM:
+                iterations = run_warm(
+                    args.config_file,
+                    args.pr_url,
+                    args.pre_commit,
+                    args.iterations,
+                    args.comment,
+                )
+            else:
+                iterations = run_cold(_get_child_argv(args), args.iterations)
+        except Exception as e:
+            print('error: {}'.format(e), file=sys.stderr)
+            return 1
+        summary = summarize(iterations)
+        document['variants'][variant] = {
+            'summary': summary,
+            'iterations': iterations,
+        }
+        print(format_summary('{}: {}'.format(variant, mode), summary))
+
+    if args.json:
+        content = json.dumps(document, indent=2)
+        if args.json == '-':
+            print(content)
+        else:
+            with open(args.json, 'w') as f:
+                f.write(content)
+    return 0
+
+
+def run_iteration(
+    config_file: str = None,
+    pr_url: str = None,
+    pre_commit: bool = False,
+    comment: bool = False,
+) -> dict:
+    """Run the checks once, in this process, and return its measurements.
+
+    The output of the checks is discarded.
+
+    :param str config_file: the path of the config file; found as in the CLI
+        if not given
+    :param str pr_url: the URL of the PR to check, if any
+    :param bool pre_commit: True for the pre-commit mode
+    :param bool comment: if False, PR comments are disabled
+    :return: the measurements, as returned by `Recorder.as_data()`,
+        along with the `total` duration and the number of `errors`
+    :rtype: dict
+    :raise Exception: if the checks cannot run at all
+    """
+    import totem.main
+    from totem.checks.cache import load_config
+    from totem.paths import get_config_path
+
+    recorder = Recorder()
+    start = time.perf_counter()
+    with recording(recorder), contextlib.redirect_stdout(io.StringIO()):
+        with open(get_config_path(config_file), 'rb') as f:
+            config = load_config(f.read())
+        if pr_url and not comment:
+            config = config.with_settings('pr_comment_report', enabled=False)
+
+        cls = getattr(totem.main, totem.main.get_mode_name(pr_url, pre_commit))
+        if pr_url:
+            check = cls(config_dict=config, pr_url=pr_url)
+        else:
+            check = cls(config_dict=config)
+        results = check.run()
+
+    data = recorder.as_data()
+    data['total'] = time.perf_counter() - start
+    data['errors'] = len(results.errors)
+    return data
+
+
+def run_warm(
+    config_file: str = None,
+    pr_url: str = None,
+    pre_commit: bool = False,
+    iterations: int = DEFAULT_ITERATIONS,
+    comment: bool = False,
+) -> List[dict]:
+    """Run the checks repeatedly in this process, after an untimed run.
+
+    See `run_iteration()` for the parameters.
+
+    :param int iterations: the number of timed runs
+    :return: the measurements of each timed run
+    :rtype: list
+    """
+    from totem.checks.content import clear_content_caches
+
+    run_iteration(config_file, pr_url, pre_commit, comment)
+    results = []
+    for _ in range(iterations):
+        clear_content_caches()
+        results.append(run_iteration(config_file, pr_url, pre_commit, comment))
+    clear_content_caches()
+    return results
+
+
+def run_cold(child_argv: List[str], iterations: int) -> List[dict]:
+    """Run the checks repeatedly, each time in a new process.
+
+    Each process gets a new, empty cache directory, so that nothing cached
+    by previous runs is reused. The `total` duration of each run is the time
+    until its process exits.
+
+    :param list child_argv: the arguments of `totem bench` for each process
+    :param int iterations: the number of runs
+    :return: the measurements of each run
+    :rtype: list
+    :raise RuntimeError: if a run fails
+    """
+    command = [sys.executable, '-m', 'totem', 'bench'] + child_argv
+    results = []
+    for _ in range(iterations):
+        with tempfile.TemporaryDirectory(prefix='totem-bench-') as cache_dir:
+            env = dict(os.environ, TOTEM_CACHE_DIR=cache_dir)
+            start = time.perf_counter()
+            process = subprocess.run(
+                command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env
+            )
+            duration = time.perf_counter() - start
+        if process.returncode != 0:
+            lines = process.stderr.decode('utf-8', 'replace').strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else 'the run failed')
+        data = json.loads(process.stdout.decode('utf-8').strip().splitlines()[-1])
+        data['total'] = duration
+        results.append(data)
+    return results
+
+
+def summarize(iterations: List[dict]) -> dict:
+    """Return the distribution of the measurements of the given runs.
+
+    Multiple measurements of the same stage and name in a run
+    (e.g. the same content provider used by several checks) are added up.
+
+    :param list iterations: the measurements of each run,
+        as returned by `run_iteration()`
+    :return: a dictionary like
+        {
+          'iterations': <number of runs>,
+          'total': <statistics>,
+          'stages': [[<stage>, <name>, <statistics>], ...],
+          'calls': {<kind>: <average per run>, ...},
+          'call_details': [[<kind>, <description>, <average per run>], ...],
+        }
+        where the statistics are a dict with `min`, `p50`, `p90`
+        and `max` durations in seconds
+    :rtype: dict
+    """
+    durations: Dict[tuple, List[float]] = {}
+    calls: Dict[tuple, int] = {}
+    for iteration in iterations:
+        for stage, name, values in iteration['timings']:
+            durations.setdefault((stage, name), []).append(sum(values))
+        for kind, description, count in iteration['calls']:
+            calls[(kind, description)] = calls.get((kind, description), 0) + count
+
+    count = len(iterations) or 1
+    stage_order = {stage: index for index, stage in enumerate(STAGES)}
+    keys = sorted(durations, key=lambda x: stage_order.get(x[0], len(STAGES)))
+    return {
+        'iterations': len(iterations),
+        'total': get_statistics([x['total'] for x in iterations]),
+        'stages': [
+            [stage, name, get_statistics(durations[stage, name])]
+            for stage, name in keys
+        ],
+        'calls': {
+            kind: sum(v for (k, _), v in calls.items() if k == kind) / count
+            for kind in (CALL_SUBPROCESS, CALL_HTTP)
+        },
+        'call_details': [
+            [kind, description, value / count]
+            for (kind, description), value in sorted(
+                calls.items(), key=lambda x: (x[0][0], -x[1], x[0][1])
+            )
+        ],
+    }
+
+
+def get_statistics(durations: List[float]) -> dict:
+    """Return the distribution of the given durations.
+
+    :param list durations: the durations in seconds
+    :return: the `min`, the percentiles (e.g. `p50`) and the `max`
+    :rtype: dict
+    """
+    values = sorted(durations) or [0.0]
+    statistics = {'min': values[0]}
+    for percentile in PERCENTILES:
+        # The nearest-rank method
+        index = max(math.ceil(percentile / 100 * len(values)) - 1, 0)
+        statistics['p{}'.format(percentile)] = values[index]
+    statistics['max'] = values[-1]
+    return statistics
+
+
+def format_summary(title: str, summary: dict) -> str:
+    """Return a human-readable table of the given summary.
+
+    :param str title: the title of the table
+    :param dict summary: the summary, as returned by `summarize()`
+    :rtype: str
+    """
+    columns = ['p{}'.format(x) for x in PERCENTILES] + ['max']
+    lines = [
+        '{} ({} iterations)'.format(title, summary['iterations']),
+        '  {:<40}{}'.format('', ''.join('{:>11}'.format(x) for x in columns)),
+    ]
+    rows = [('total', summary['total'])] + [
+        ('{} {}'.format(stage, name), statistics)
+        for stage, name, statistics in summary['stages']
+    ]
+    for label, statistics in rows:
+        lines.append(
+            '  {:<40}{}'.format(
+                label[:39],
+                ''.join(
+                    '{:>11}'.format('{:.2f} ms'.format(statistics[x] * 1000))
+                    for x in columns
+                ),
+            )
+        )
+
+    labels = ((CALL_SUBPROCESS, 'Subprocesses'), (CALL_HTTP, 'HTTP requests'))
+    for kind, label in labels:
+        details = [
+            '{}: {:g}'.format(description, value)
+            for k, description, value in summary['call_details']
+            if k == kind
+        ]
+        lines.append(
+            '  {} per run: {:g}{}'.format(
+                label,
+                summary['calls'][kind],
+                ' ({})'.format(', '.join(details)) if details else '',
+            )
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def _get_child_argv(args) -> List[str]:
+    """Return the arguments of `totem bench` for a run of the cold variant.
+
+    :param argparse.Namespace args: the parsed arguments of the command
+    :rtype: list
+    """
+    argv = ['--child']
+    if args.config_file:
+        argv += ['--config-file', args.config_file]
+    if args.pr_url:
+        argv += ['--pr-url', args.pr_url]
+    if args.pre_commit:
+        argv.append('--pre-commit')
+    if args.comment:
+        argv.append('--comment')
+    return argv
@@ -0,0 +1,362 @@
+"""Contains functionality for caching data locally, between runs.
+
+When totem runs as a Git hook, the same configuration file is parsed on every
+invocation, even though it rarely changes. The parsed configuration is cached
+on disk as JSON, keyed by a hash of the content of the file and the version
+of totem (see `get_totem_key()`). Any change to the file results in a new key,
+so the cache never needs to be invalidated explicitly; the least recently used
+entries are removed when there are too many.
+
+Only plain data is stored, since the cache directory might be shared
+(see `get_cache_dir()`). The Config objects are created from it in each
+process and kept in memory, along with the parsed configuration, so that
+long-running processes (e.g. the daemon) create them only once.
+
+The cache is only an optimization; if it cannot be read or written
+for any reason, everything is computed from scratch.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Union
+
+from totem.checks.config import Config, ConfigFactory
+from totem.instrumentation import STAGE_CONFIG, measure, set_attributes
+from totem.paths import get_cache_dir
+
+# Needs to change every time the structure of the cached entries changes;
+# the version of totem (see `get_totem_key()`) is also part of the key of each entry
+CONFIG_CACHE_VERSION = 2
+
+CONFIG_CACHE_DIRNAME = 'configs'
+
+# The maximum number of entries to keep on disk
+MAX_DISK_ENTRIES = 64
+
+# The maximum number of snapshots to keep in memory, for long-running
+# processes (e.g. the daemon) that load many different config files
+MAX_MEMORY_SNAPSHOTS = 32
+
+_snapshots: 'OrderedDict[str, ConfigSnapshot]' = OrderedDict()
+
+
+def clear_memory_cache():
+    """Forget all snapshots kept in memory, along with their Config objects,
+    so that they are loaded again, e.g. for measuring a run from scratch.
+    """
+    _snapshots.clear()
+
+
+@lru_cache(maxsize=None)
+def get_totem_key() -> str:
+    """Return a string that identifies the installed version of totem,
+    for keying the cache entries.
+
+    Installed packages have a static version file, whose version is used.
+    For source and editable installs, the version is computed by running
+    `git`, which is too slow to do on every run (e.g. of a Git hook),
+    so the modification times of the modules that create the cached data
+    are used instead.
+
+    :rtype: str
+    """
+    from totem import _version
+
+    version_json = getattr(_version, 'version_json', None)
+    if version_json is not None:
+        return 'version:{}'.format(json.loads(version_json)['version'])
+
+    from totem.checks import config
+
+    return 'mtime:{}:{}'.format(
+        os.stat(__file__).st_mtime_ns, os.stat(config.__file__).st_mtime_ns
+    )
+
+
+def parse_yaml(content: Union[bytes, str]):
+    """Parse the given YAML document safely.
+
+    Uses the C implementation of the loader, if available,
+    which is much faster than the pure-Python one.
+
+    :param content: the YAML document
+    :return: the parsed document
+    :raise yaml.YAMLError: if the document is not valid
+    """
+    import yaml
+
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(content, Loader=loader)
+
+
+def load_config(content: bytes) -> 'ConfigSnapshot':
+    """Load the configuration of the given content of a config file.
+
+    If the same content has been loaded before, the parsed configuration
+    is retrieved from the cache, otherwise it is parsed as YAML and cached.
+    Snapshots are also kept in memory, so that a long-running process
+    reuses the same objects, along with the Config objects created from them.
+
+    :param bytes content: the content of the config file
+    :return: the parsed configuration
+    :rtype: ConfigSnapshot
+    :raise yaml.YAMLError: if the content is not a valid YAML document
+    """
+    with measure(STAGE_CONFIG, 'load'):
+        digest = hashlib.sha256(content).hexdigest()
+        snapshot = _recall(digest)
+        if snapshot is not None:
+            set_attributes({'totem.cache': 'memory'})
+            return snapshot
+
+        data = _read_entry(digest)
+        if data is not None:
+            set_attributes({'totem.cache': 'disk'})
+            snapshot = ConfigSnapshot(data, digest)
+        else:
+            set_attributes({'totem.cache': 'miss'})
+            snapshot = ConfigSnapshot(parse_yaml(content), digest)
+            snapshot.save()
+
+        _remember(snapshot)
+        return snapshot
+
+
+class ConfigSnapshot(dict):
+    """The parsed content of a config file, identified by a digest
+    of the content.
+
+    It can be used anywhere the configuration dictionary is expected.
+    It also creates the Config objects of the configuration and keeps them,
+    so that they are only created once per process for every version
+    of the file.
+
+    It should be treated as immutable; use `with_settings()`
+    to create a modified version.
+    """
+
+    def __init__(self, data: dict, digest: str):
+        """Constructor.
+
+        :param dict data: the parsed content of the config file
+        :param str digest: a unique digest of the content
+        """
+        super().__init__(data or {})
+        self.digest = digest
+        # The created Config objects, with the value of `include_pr`
+        # they were created with as the key
+        self._configs: Dict[bool, Config] = {}
+
+    def create_config(self, include_pr: bool = True) -> Config:
+        """Return the Config object of this configuration,
+        creating it only if it is not already cached.
+
+        :param bool include_pr: if False, all checks that can only
+            be applied on PRs will not be included in the config
+        :return: the full configuration of all checks
+        :rtype: Config
+        :raise ValueError: if the configuration is invalid
+        """
+        config = self._configs.get(include_pr)
+        set_attributes({'totem.cache': 'hit' if config is not None else 'miss'})
+        if config is None:
+            config = ConfigFactory.create(dict(self), include_pr=include_pr)
+            self._configs[include_pr] = config
+        return config
+
+    def with_execution_settings(self, **options) -> 'ConfigSnapshot':
+        """Return a new snapshot where the given options override
+        the `execution` settings of this configuration.
+
+        :return: the new configuration
+        :rtype: ConfigSnapshot
+        """
+        return self.with_settings('execution', **options)
+
+    def with_settings(self, section: str, **options) -> 'ConfigSnapshot':
+        """Return a new snapshot where the given options override
+        the settings of the given section of this configuration.
+
+        :param str section: the name of the section of the settings,
+            e.g. 'execution' or 'pr_comment_report'
+        :return: the new configuration
+        :rtype: ConfigSnapshot
+        """
+        settings = dict(self.get('settings') or {})
+        settings[section] = dict(settings.get(section) or {}, **options)
+        data = dict(self, settings=settings)
+
+        overrides = json.dumps(options, sort_keys=True, default=str)
+        if section != 'execution':
+            overrides = '{}:{}'.format(section, overrides)
+        return self._derive(data, overrides)
+
+    def without_time_limits(self) -> 'ConfigSnapshot':
+        """Return a new snapshot of this configuration without the
+        `deadline` of the execution settings and the `timeout` of every check,
+        e.g. for profiling every check until it finishes.
+
+        :return: the new configuration
+        :rtype: ConfigSnapshot
+        """
+        data = dict(self)
+        settings = dict(self.get('settings') or {})
+        if settings.get('execution'):
+            settings['execution'] = dict(settings['execution'])
+            settings['execution'].pop('deadline', None)
+            data['settings'] = settings
+        if self.get('checks'):
+            data['checks'] = {
+                check_type: {
+                    key: value
+                    for key, value in (options or {}).items()
+                    if key != 'timeout'
+                }
+                for check_type, options in self['checks'].items()
+            }
+        return self._derive(data, 'without_time_limits')
+
+    def _derive(self, data: dict, overrides: str) -> 'ConfigSnapshot':
+        """Return the snapshot of the given data, derived from this one.
+
+        :param dict data: the modified configuration
+        :param str overrides: a unique description of the modifications
+        :rtype: ConfigSnapshot
+        """
+        digest = hashlib.sha256(
+            '{}:{}'.format(self.digest, overrides).encode('utf-8')
+        ).hexdigest()
+        # Derived snapshots are cheap to create, so they are only kept in memory
+        snapshot = _recall(digest)
+        if snapshot is None:
+            snapshot = ConfigSnapshot(data, digest)
+            _remember(snapshot)
+        return snapshot
+
+    def save(self) -> bool:
+        """Store the parsed configuration in the cache on disk,
+        removing the least recently used entries if there are too many.
+
+        :return: True if the configuration was stored, False otherwise,
+            e.g. if it contains values that JSON cannot represent exactly
+        :rtype: bool
+        """
+        data = dict(self)
+        try:
+            # The order of the keys is kept, e.g. the order of the checks
+            content = json.dumps({'version': CONFIG_CACHE_VERSION, 'data': data})
+            # e.g. keys that are not strings would be converted to strings
+            if json.loads(content)['data'] != data:
+                return False
+        except (TypeError, ValueError):
+            return False
+
+        path = _get_entry_path(self.digest)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            # e.g. a read-only file system
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return False
+        _prune_entries(os.path.dirname(path), MAX_DISK_ENTRIES)
+        return True
+
+
+def _recall(digest: str) -> Union['ConfigSnapshot', None]:
+    """Return the snapshot of the given digest, if it is kept in memory.
+
+    :param str digest: the digest of a configuration
+    :rtype: ConfigSnapshot
+    """
+    snapshot = _snapshots.get(digest)
+    if snapshot is not None:
+        _snapshots.move_to_end(digest)
+    return snapshot
+
+
+def _remember(snapshot: 'ConfigSnapshot'):
+    """Keep the given snapshot in memory, forgetting the least recently used
+    snapshot if there are too many.
+
+    :param ConfigSnapshot snapshot: the snapshot to keep
+    """
+    _snapshots[snapshot.digest] = snapshot
+    if len(_snapshots) > MAX_MEMORY_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+
+
+def _get_entry_path(digest: str) -> str:
+    """Return the path of the cache file of the given digest,
+    for the current version of totem.
+
+    :param str digest: the digest of a configuration
+    :rtype: str
+    """
+    key = hashlib.sha256(
+        '{}:{}:{}'.format(CONFIG_CACHE_VERSION, get_totem_key(), digest).encode(
+            'utf-8'
+        )
+    ).hexdigest()
+    return os.path.join(get_cache_dir(), CONFIG_CACHE_DIRNAME, '{}.json'.format(key))
+
+
+def _read_entry(digest: str) -> Union[dict, None]:
+    """Return the cached parsed configuration of the given digest.
+
+    :param str digest: the digest of a configuration
+    :return: the parsed configuration, or None if there is no valid entry
+    :rtype: dict
+    """
+    path = _get_entry_path(digest)
+    try:
+        with open(path, 'r') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (
+        not isinstance(entry, dict)
+        or entry.get('version') != CONFIG_CACHE_VERSION
+        or not isinstance(entry.get('data'), dict)
+    ):
+        return None
+    try:
+        # Marks the entry as recently used, for pruning
+        os.utime(path)
+    except OSError:
+        pass
+    return entry['data']
+
+
+def _prune_entries(directory: str, max_entries: int):
+    """Remove the least recently used files of the given directory,
+    if there are more than the given number, including files of older versions.
+
+    :param str directory: the directory of the cache entries
+    :param int max_entries: the number of files to keep
+    """
+    try:
+        paths = [os.path.join(directory, x) for x in os.listdir(directory)]
+        if len(paths) <= max_entries:
+            return
+        used = {}
+        for path in paths:
+            try:
+                used[path] = os.path.getmtime(path)
+            except OSError:
+                pass
+        for path in sorted(used, key=used.get)[: len(used) - max_entries]:
+            os.remove(path)
+    except OSError:
+        # e.g. removed by another process at the same time
+        pass
@@ -1,7 +1,15 @@
 import re
-from typing import List, Set, Union
+from typing import Dict, List, NamedTuple, Optional, Set, Union
 
 from totem.checks.core import Check
+from totem.checks.messages import measure_message, search_subject
+from totem.checks.patterns import get_pattern_set
+from totem.checks.records import (
+    CommitFailure,
+    CommitInfo,
+    Message,
+    get_total_changes,
+)
 from totem.checks.results import (
     ERROR_FORBIDDEN_PR_BODY_TEXT,
     ERROR_INVALID_BRANCH_NAME,
@@ -31,6 +39,14 @@ PR_TYPES_CHECKS = (
 )
 
 
+class _QuotedList(list):
+    """A message parameter that is formatted as a comma-separated list
+    of quoted items, e.g. '"a", "b"', only when the message is rendered."""
+
+    def __format__(self, format_spec: str) -> str:
+        return ', '.join(['"{}"'.format(x) for x in self])
+
+
 class BranchNameCheck(Check):
     """Checks whether or not a branch name follows a certain format."""
 
@@ -63,13 +79,15 @@ class BranchNameCheck(Check):
                 message='Branch name regex pattern not defined or empty',
             )
 
-        success = re.search(pattern, branch_name) is not None
+        success = self.regex_engine.search(pattern, branch_name) is not None
         if not success:
-            msg = (
-                'Branch name "{}" does not match pattern: "{}". '
-                'Explanation: {}'.format(
-                    branch_name, pattern, self._from_config('pattern_descr')
-                )
+            msg = Message(
+                ERROR_INVALID_BRANCH_NAME,
+                'Branch name "{branch}" does not match pattern: "{pattern}". '
+                'Explanation: {descr}',
+                branch=branch_name,
+                pattern=pattern,
+                descr=self._from_config('pattern_descr'),
             )
             return self._get_failure(ERROR_INVALID_BRANCH_NAME, message=msg)
 
@@ -109,10 +127,15 @@ class PRTitleCheck(Check):
                 message='PR title regex pattern not defined or empty',
             )
 
-        success = re.search(pattern, title) is not None
+        success = self.regex_engine.search(pattern, title) is not None
         if not success:
-            msg = 'PR title "{}" does not match pattern: "{}". Explanation: {}'.format(
-                title, pattern, self._from_config('pattern_descr')
+            msg = Message(
+                ERROR_INVALID_PR_TITLE,
+                'PR title "{title}" does not match pattern: "{pattern}". '
+                'Explanation: {descr}',
+                title=title,
+                pattern=pattern,
+                descr=self._from_config('pattern_descr'),
             )
             return self._get_failure(ERROR_INVALID_PR_TITLE, message=msg)
 
@@ -153,7 +176,11 @@ class PRBodyChecklistCheck(Check):
         if matches:
             return self._get_failure(
                 ERROR_UNFINISHED_CHECKLIST,
-                message='Found {} unfinished checklist items'.format(len(matches)),
+                message=Message(
+                    ERROR_UNFINISHED_CHECKLIST,
+                    'Found {count} unfinished checklist items',
+                    count=len(matches),
+                ),
             )
 
         return self._get_success()
@@ -166,7 +193,8 @@ class PRBodyIncludesCheck(Check):
     be present inside a pull request body.
 
     This check tests again multiple regex patterns. It always checks them all
-    and the result it returns includes all the ones that failed.
+    and the result it returns includes all the ones that failed. All patterns
+    are searched for in a single pass over the body (see PatternSet).
     """
 
     def run(self, content: dict) -> CheckResult:
@@ -180,17 +208,20 @@ class PRBodyIncludesCheck(Check):
         body = content.get('body')
 
         patterns = self._from_config('patterns', [])
-        failed_items = []
-        for pattern in patterns:
-            success = re.search(pattern, body, re.MULTILINE) is not None
-            if not success:
-                failed_items.append(pattern)
+        found = get_pattern_set(
+            tuple(patterns), re.MULTILINE, self.regex_engine
+        ).search_indexes(body)
+        failed_items = [
+            pattern for index, pattern in enumerate(patterns) if index not in found
+        ]
 
         if failed_items:
             return self._get_failure(
                 ERROR_MISSING_PR_BODY_TEXT,
-                message='Required strings in PR body are missing: {}'.format(
-                    ', '.join(['"{}"'.format(x) for x in failed_items])
+                message=Message(
+                    ERROR_MISSING_PR_BODY_TEXT,
+                    'Required strings in PR body are missing: {patterns}',
+                    patterns=_QuotedList(failed_items),
                 ),
             )
 
@@ -204,7 +235,8 @@ class PRBodyExcludesCheck(Check):
     be present inside a pull request body.
 
     This check tests again multiple regex patterns. It always checks them all
-    and the result it returns includes all the ones that failed.
+    and the result it returns includes all the ones that failed. All patterns
+    are searched for in a single pass over the body (see PatternSet).
     """
 
     def run(self, content: dict) -> CheckResult:
@@ -218,23 +250,38 @@ class PRBodyExcludesCheck(Check):
         body = content.get('body')
 
         patterns = self._from_config('patterns', [])
-        failed_items = []
-        for pattern in patterns:
-            success = re.search(pattern, body, re.MULTILINE) is None
-            if not success:
-                failed_items.append(pattern)
+        found = get_pattern_set(
+            tuple(patterns), re.MULTILINE, self.regex_engine
+        ).search_indexes(body)
+        failed_items = [
+            pattern for index, pattern in enumerate(patterns) if index in found
+        ]
 
         if failed_items:
             return self._get_failure(
                 ERROR_FORBIDDEN_PR_BODY_TEXT,
-                message='Forbidden strings found in PR body: {}'.format(
-                    ', '.join(['"{}"'.format(x) for x in failed_items])
+                message=Message(
+                    ERROR_FORBIDDEN_PR_BODY_TEXT,
+                    'Forbidden strings found in PR body: {patterns}',
+                    patterns=_QuotedList(failed_items),
                 ),
             )
 
         return self._get_success()
 
 
+class _CommitRules(NamedTuple):
+    """The configuration of CommitMessagesCheck, resolved once per run."""
+
+    min_length: Optional[int]
+    max_length: Optional[int]
+    pattern: Optional[str]
+    pattern_descr: str
+    max_line_length: Optional[int]
+    min_changes: Optional[int]
+    min_body_lines: Optional[int]
+
+
 class CommitMessagesCheck(Check):
     """Makes sure that all commit messages of a PR are properly formatted."""
 
@@ -263,157 +310,392 @@ class CommitMessagesCheck(Check):
         :rtype: CheckResult
         """
         commits = content.get('commits', [])
+        rules = self._get_rules()
 
         # Catch exceptions due to invalid format of the content
         # In the future, we could alternatively validate the content via Schema
+        # A single time budget covers the patterns of all commits
         try:
             failed_items = []
-            for index, commit in enumerate(commits):
-                errors = self._check_message(commit)
-                if errors:
-                    errors['commit_order'] = index + 1
-                    failed_items.append(errors)
+            with self.regex_engine.budget():
+                for index, commit in enumerate(commits):
+                    failure = self._check_message(commit, rules)
+                    if failure:
+                        failure.commit_order = index + 1
+                        failed_items.append(failure)
 
         except KeyError as e:
-            return self._get_error(
-                ERROR_INVALID_CONTENT,
-                message='Content for commit checks has invalid structure: '
-                'Missing key: {}'.format(e),
-            )
+            return self._get_invalid_content_error(e)
 
-        if failed_items:
-            # Find the IDs of all errors that occurred in the failed commit messages
-            # Do that by combining all keys from each error and removing the
-            # default keys that appear in each message, and removing duplicates
-            # by using a set
-            keys: Set[str] = set()
-            for error in failed_items:
-                keys.update(error.keys())
-            for default in CommitMessagesCheck.DEFAULT_KEYS:
-                keys.remove(default)
-            return self._get_failure(
-                ERROR_INVALID_COMMIT_MESSAGE_FORMAT,
-                message='Found {} commit message(s) that do not follow '
-                'the expected format (errors: {})'.format(
-                    len(failed_items), ', '.join(['"{}"'.format(k) for k in keys])
-                ),
-                errors=failed_items,
-            )
+        return self._get_commits_result(failed_items)
 
-        return self._get_success()
+    def run_many(self, batch: dict) -> CheckResult:
+        """Check a columnar batch of commit messages.
+
+        Equivalent to `run()`, but instead of a dictionary per commit,
+        it accepts a list (column) per commit attribute. All columns
+        must have the same length:
+        {
+          'message': [<message>, ...],
+          'total': [<total_changes>, ...],
+          'sha': [<sha>, ...],
+          'url': [<url>, ...],
+        }
+
+        This is meant for checking a very large number of commits, e.g. when
+        auditing the whole history of a repository. The configuration is read
+        only once and each message is measured in a single pass, without
+        creating any objects for the commits that pass. The subject pattern
+        is compiled once (and cached by the regex engine) and evaluated only
+        once for each distinct message.
+
+        The 'total' column is only required if the `smart_require` option
+        is enabled. The 'sha' and 'url' columns are optional and default
+        to empty strings.
 
-    def _check_message(self, commit: dict) -> Union[dict, None]:
+        :param dict batch: a dictionary with a list of values for each attribute
+        :return: the result of the check that was performed, identical
+            to the result `run()` would return for the same commits
+        :rtype: CheckResult
+        """
+        rules = self._get_rules()
+        try:
+            messages = batch['message']
+            totals = batch['total'] if rules.min_changes is not None else None
+        except KeyError as e:
+            return self._get_invalid_content_error(e)
+
+        count = len(messages)
+        shas = batch.get('sha') or [''] * count
+        urls = batch.get('url') or [''] * count
+        columns = {'total': totals, 'sha': shas, 'url': urls}
+        for name, column in columns.items():
+            if column is not None and len(column) != count:
+                return self._get_error(
+                    ERROR_INVALID_CONTENT,
+                    message='Content for commit checks has invalid structure: '
+                    'Column {!r} has {} values instead of {}'.format(
+                        name, len(column), count
+                    ),
+                )
+
+        max_length = rules.max_length
+        min_length = rules.min_length
+        pattern = rules.pattern
+        max_line_length = rules.max_line_length
+        min_changes = rules.min_changes
+        min_body_lines = rules.min_body_lines
+        engine = self.regex_engine
+
+        # The result of the subject pattern for each distinct message
+        matches: Dict[str, bool] = {}
+        # The messages of the errors, shared by the commits with the same error
+        error_messages: Dict[tuple, Message] = {}
+        failed_items = []
+        with engine.budget():
+            for index, message in enumerate(messages):
+                (
+                    subject_length,
+                    body_line_count,
+                    max_body_line_length,
+                    subject_end,
+                ) = measure_message(message)
+
+                if pattern:
+                    pattern_ok = matches.get(message)
+                    if pattern_ok is None:
+                        pattern_ok = matches[message] = (
+                            search_subject(message, subject_end, pattern, engine)
+                            is not None
+                        )
+                else:
+                    pattern_ok = True
+                actual_changes = totals[index] if totals is not None else None
+                conditions = (
+                    subject_length <= max_length if max_length else True,
+                    subject_length >= min_length if min_length else True,
+                    pattern_ok,
+                    max_line_length is None
+                    or max_body_line_length <= max_line_length,
+                    actual_changes is None
+                    or not (
+                        actual_changes > min_changes
+                        and body_line_count < min_body_lines
+                    ),
+                )
+                if all(conditions):
+                    continue
+
+                commit = CommitInfo(
+                    message, sha=shas[index], url=urls[index], total=actual_changes
+                )
+                failure = self._get_failure_record(
+                    rules,
+                    commit=commit,
+                    subject_length=subject_length,
+                    conditions=conditions,
+                    actual_changes=actual_changes,
+                    body_line_count=body_line_count,
+                    messages=error_messages,
+                )
+                failure.commit_order = index + 1
+                failed_items.append(failure)
+
+        return self._get_commits_result(failed_items)
+
+    def _check_message(
+        self, commit: Union[CommitInfo, dict], rules: _CommitRules = None
+    ) -> Union[CommitFailure, None]:
         """Check the given commit message against the rules defined in the config
         and return the results.
 
-        :param dict commit: a dictionary containing information about a commit,
-            formatted as: {'message': <message>, 'sha': <sha>, 'url': <url>}
-        :return: a dictionary with all errors found or None if no error was found,
-            formatted as:
+        :param commit: information about a commit, as a CommitInfo object
+            or a dictionary formatted as:
+            {'message': <message>, 'sha': <sha>, 'url': <url>, 'stats': {...}}
+        :param _CommitRules rules: the rules to check against; if not given,
+            they are read from the config
+        :return: a record with all errors found or None if no error was found;
+            its dictionary form is formatted as:
             {
-              'subject_length': <msg>,
-              'subject_pattern': <msg>,
-              'body_length': <msg>,
               'sha': <sha>,
               'url': <url>,
+              'message': <message>,
+              'error_subject_length': <msg>,
+              'error_subject_pattern': <msg>,
+              'error_body_length': <msg>,
+              'error_smart_body_size': <msg>,
+              'commit_order': <order>,
             }
-        :rtype: dict
+        :rtype: CommitFailure
         """
+        if rules is None:
+            rules = self._get_rules()
+
         message = commit['message']
-        lines = [line.strip() for line in message.splitlines()]
-
-        # Find the subject and the body of the commit message
-        # The subject is the part of the message until a newline is found
-        # or the string ends (if no newline exists)
-        # The body is the rest. If there is no newline in the message,
-        # then the body is considered to be empty
-        subject = message.rstrip('\n')
-        body_lines: List[str] = []
-        if '' in lines:
-            separator_index = lines.index('')
-            subject = '\n'.join(lines[0:separator_index])
-            # Get all body lines (start right after the empty line)
-            index = separator_index + 1
-            body_lines = lines[index:]
+        (
+            subject_length,
+            body_line_count,
+            max_body_line_length,
+            subject_end,
+        ) = measure_message(message)
 
         # Check subject
-        subject_config = self._from_config('subject')
-        max_length = subject_config.get('max_length', None)
-        min_length = subject_config.get('min_length', None)
-        subject_pattern = subject_config.get('pattern')
-
-        subject_max_length_ok = len(subject) <= max_length if max_length else True
-        subject_min_length_ok = len(subject) >= min_length if min_length else True
+        max_length = rules.max_length
+        min_length = rules.min_length
+        subject_max_length_ok = subject_length <= max_length if max_length else True
+        subject_min_length_ok = subject_length >= min_length if min_length else True
         subject_pattern_ok = (
-            re.search(subject_pattern, subject) is not None if subject_pattern else True
+            search_subject(message, subject_end, rules.pattern, self.regex_engine)
+            is not None
+            if rules.pattern
+            else True
         )
 
         # Check body line length
-        body_config = self._from_config('body')
-        max_line_length = body_config.get('max_line_length', None)
+        max_line_length = rules.max_line_length
         if max_line_length is None:
             body_length_ok = True
         else:
-            body_length_ok = all([len(x) <= max_line_length for x in body_lines])
+            body_length_ok = max_body_line_length <= max_line_length
 
         # Smart check body: if there are a lot of changes on a commit
         # there should be a body, not just a subject
         body_size_ok = True
-        min_changes = body_config.get('smart_require', {}).get('min_changes')
         actual_changes = None
-        min_body_lines = None
-        if min_changes is not None:
-            actual_changes = commit['stats']['total']
-            min_body_lines = body_config['smart_require'].get('min_body_lines', 1)
-            if actual_changes > min_changes and len(body_lines) < min_body_lines:
+        if rules.min_changes is not None:
+            actual_changes = get_total_changes(commit)
+            if (
+                actual_changes > rules.min_changes
+                and body_line_count < rules.min_body_lines
+            ):
                 body_size_ok = False
 
-        all_conditions = [
+        all_conditions = (
             subject_max_length_ok,
             subject_min_length_ok,
             subject_pattern_ok,
             body_length_ok,
             body_size_ok,
-        ]
+        )
         if all(all_conditions):
             return None
 
-        errors = {
-            'sha': commit['sha'],
-            'url': commit['url'],
-            'message': commit['message'],
-        }
+        if not isinstance(commit, CommitInfo):
+            # The failure refers to these keys, so they need to exist
+            for key in ('sha', 'url'):
+                if key not in commit:
+                    raise KeyError(key)
+
+        return self._get_failure_record(
+            rules,
+            commit=commit,
+            subject_length=subject_length,
+            conditions=all_conditions,
+            actual_changes=actual_changes,
+            body_line_count=body_line_count,
+        )
+
+    def _get_rules(self) -> _CommitRules:
+        """Read all options of this check from the config.
+
+        :return: the rules to check commits against
+        :rtype: _CommitRules
+        """
+        subject_config = self._from_config('subject')
+        body_config = self._from_config('body')
+        min_changes = body_config.get('smart_require', {}).get('min_changes')
+        min_body_lines = None
+        if min_changes is not None:
+            min_body_lines = body_config['smart_require'].get('min_body_lines', 1)
 
+        return _CommitRules(
+            min_length=subject_config.get('min_length', None),
+            max_length=subject_config.get('max_length', None),
+            pattern=subject_config.get('pattern'),
+            pattern_descr=subject_config.get('pattern_descr', 'None'),
+            max_line_length=body_config.get('max_line_length', None),
+            min_changes=min_changes,
+            min_body_lines=min_body_lines,
+        )
+
+    @staticmethod
+    def _get_failure_record(
+        rules: _CommitRules,
+        commit: Union[CommitInfo, dict],
+        subject_length: int,
+        conditions: tuple,
+        actual_changes: Optional[int],
+        body_line_count: int,
+        messages: Dict[tuple, Message] = None,
+    ) -> CommitFailure:
+        """Return a record with all errors of a commit that failed.
+
+        :param _CommitRules rules: the rules the commit was checked against
+        :param commit: the commit that failed
+        :param int subject_length: the length of the subject of the message
+        :param tuple conditions: the outcome of each rule, as a tuple like
+            (subject_max_length_ok, subject_min_length_ok, subject_pattern_ok,
+            body_length_ok, body_size_ok)
+        :param int actual_changes: the total number of changes of the commit
+        :param int body_line_count: the number of lines of the body of the message
+        :param dict messages: the messages created for previous commits of the
+            same batch, which are reused for the same errors, since messages
+            are immutable; new messages are added to it
+        :return: the errors, formatted as described in `_check_message()`
+        :rtype: CommitFailure
+        """
+        (
+            subject_max_length_ok,
+            subject_min_length_ok,
+            subject_pattern_ok,
+            body_length_ok,
+            body_size_ok,
+        ) = conditions
+        if messages is None:
+            messages = {}
+        errors = []
+
+        # The messages are only rendered if they are shown
         if not subject_max_length_ok or not subject_min_length_ok:
-            msg = 'Subject has {} characters but should be between {} and {}'.format(
-                len(subject), min_length, max_length
-            )
-            errors['error_subject_length'] = msg
+            key: tuple = ('error_subject_length', subject_length)
+            msg = messages.get(key)
+            if msg is None:
+                msg = messages[key] = Message(
+                    'error_subject_length',
+                    'Subject has {length} characters but should be between '
+                    '{min_length} and {max_length}',
+                    length=subject_length,
+                    min_length=rules.min_length,
+                    max_length=rules.max_length,
+                )
+            errors.append(('error_subject_length', msg))
 
         if not subject_pattern_ok:
-            msg = 'Subject does not follow pattern: "{}". Explanation: {}'.format(
-                subject_pattern, subject_config.get('pattern_descr', 'None')
-            )
-            errors['error_subject_pattern'] = msg
+            key = ('error_subject_pattern',)
+            msg = messages.get(key)
+            if msg is None:
+                msg = messages[key] = Message(
+                    'error_subject_pattern',
+                    'Subject does not follow pattern: "{pattern}". '
+                    'Explanation: {descr}',
+                    pattern=rules.pattern,
+                    descr=rules.pattern_descr,
+                )
+            errors.append(('error_subject_pattern', msg))
 
         if not body_length_ok:
-            msg = 'One or more lines of the body are longer than {} characters'.format(
-                max_line_length
-            )
-            errors['error_body_length'] = msg
+            key = ('error_body_length',)
+            msg = messages.get(key)
+            if msg is None:
+                msg = messages[key] = Message(
+                    'error_body_length',
+                    'One or more lines of the body are longer than '
+                    '{max_line_length} characters',
+                    max_line_length=rules.max_line_length,
+                )
+            errors.append(('error_body_length', msg))
 
         if not body_size_ok:
-            msg = (
-                'There are more than {} changes in total on this commit '
-                '({} to be exact), so the '
-                'commit message body should be at least {} lines long, '
-                'but it is {} instead'.format(
-                    min_changes, actual_changes, min_body_lines, len(body_lines)
+            key = ('error_smart_body_size', actual_changes, body_line_count)
+            msg = messages.get(key)
+            if msg is None:
+                msg = messages[key] = Message(
+                    'error_smart_body_size',
+                    'There are more than {min_changes} changes in total on this '
+                    'commit ({changes} to be exact), so the '
+                    'commit message body should be at least {min_body_lines} '
+                    'lines long, but it is {body_lines} instead',
+                    min_changes=rules.min_changes,
+                    changes=actual_changes,
+                    min_body_lines=rules.min_body_lines,
+                    body_lines=body_line_count,
                 )
+            errors.append(('error_smart_body_size', msg))
+
+        return CommitFailure(commit, errors)
+
+    def _get_commits_result(self, failed_items: List[CommitFailure]) -> CheckResult:
+        """Return the result of the check, based on the given failed commits.
+
+        :param list failed_items: a list with the errors of each failed commit
+        :return: a successful result if no commit failed, a failed one otherwise
+        :rtype: CheckResult
+        """
+        if failed_items:
+            # Find the IDs of all errors that occurred in the failed commit messages
+            # Do that by combining all keys from each error and removing the
+            # default keys that appear in each message, and removing duplicates
+            # by using a set
+            keys: Set[str] = set()
+            for error in failed_items:
+                keys.update(error.keys())
+            for default in CommitMessagesCheck.DEFAULT_KEYS:
+                keys.remove(default)
+            return self._get_failure(
+                ERROR_INVALID_COMMIT_MESSAGE_FORMAT,
+                message=Message(
+                    ERROR_INVALID_COMMIT_MESSAGE_FORMAT,
+                    'Found {count} commit message(s) that do not follow '
+                    'the expected format (errors: {error_ids})',
+                    count=len(failed_items),
+                    error_ids=_QuotedList(keys),
+                ),
+                errors=failed_items,
             )
-            errors['error_smart_body_size'] = msg
 
-        return errors
+        return self._get_success()
+
+    def _get_invalid_content_error(self, e: KeyError) -> CheckResult:
+        """Return an erroneous result for content with a missing key.
+
+        :param KeyError e: the exception raised when looking for the key
+        :rtype: CheckResult
+        """
+        return self._get_error(
+            ERROR_INVALID_CONTENT,
+            message='Content for commit checks has invalid structure: '
+            'Missing key: {}'.format(e),
+        )
 
     def _default_config(self, name: str) -> dict:
         if name == 'subject':
@@ -1,6 +1,25 @@
+from typing import List, Union
+
+from totem.checks.patterns import (
+    BACKEND_RE,
+    DEFAULT_ENGINE,
+    DEFAULT_TIMEOUT,
+    RegexEngine,
+    get_backtracking_risk,
+)
+
 FAILURE_LEVEL_WARNING = 'warning'
 FAILURE_LEVEL_ERROR = 'error'
 
+EXECUTION_SERIAL = 'serial'  # All checks run one by one
+EXECUTION_THREADS = 'threads'  # Checks run in parallel in a pool of threads
+EXECUTION_PROCESSES = 'processes'  # Checks run in parallel in a pool of processes
+EXECUTION_MODES = (EXECUTION_SERIAL, EXECUTION_THREADS, EXECUTION_PROCESSES)
+
+ORDER_CONFIG = 'config'  # Checks run in the order they are configured
+ORDER_ADAPTIVE = 'adaptive'  # Cheap checks that are likely to fail run first
+ORDERS = (ORDER_CONFIG, ORDER_ADAPTIVE)
+
 
 class CheckConfig:
     """Represents the configuration of a single check.
@@ -32,6 +51,12 @@ class CheckConfig:
         self.failure_level = failure_level
         self.options = options
 
+        # The maximum time in seconds the check can take, or None if unlimited
+        self.timeout: Union[float, None] = None
+
+        # The engine to evaluate the regex patterns of the check with
+        self.regex_engine: RegexEngine = DEFAULT_ENGINE
+
 
 class Config:
     """Represents the whole configuration of the library.
@@ -40,7 +65,9 @@ class Config:
     other parts of the behaviour of this tool.
     """
 
-    def __init__(self, settings: dict, check_configs: dict):
+    def __init__(
+        self, settings: dict, check_configs: dict, pattern_warnings: List[str] = None
+    ):
         """Constructor.
 
         :param dict settings: a dictionary with all generic settings,
@@ -48,9 +75,12 @@ class Config:
         :param dict check_configs: a dictionary with the configuration for
             the checks, with the check type as the key and a CheckConfig object
             as the value
+        :param list pattern_warnings: a list of messages about regex patterns
+            of the checks that might cause catastrophic backtracking
         """
         self._settings = settings
         self._check_configs = check_configs
+        self.pattern_warnings = pattern_warnings or []
 
     @property
     def settings(self) -> dict:
@@ -136,6 +166,42 @@ class Config:
             },
         )
 
+    @property
+    def execution(self) -> dict:
+        """The configuration of how the checks are executed.
+
+        The `mode` option can be one of EXECUTION_MODES. The `workers`
+        option defines the maximum number of checks that can run in parallel
+        (if not defined, it depends on the number of processors).
+        If the `fail_fast` option is True, no more checks are started
+        after the first check that fails with an error failure level.
+        The `order` option can be one of ORDERS; it defaults to ORDER_ADAPTIVE
+        in fail-fast mode and ORDER_CONFIG otherwise. In adaptive order,
+        the statistics of each run are recorded in `history_file`.
+        If `keep_report_order` is True (default), the results are reported
+        in the order the checks are configured, no matter the order they ran.
+        The `deadline` option defines the maximum time in seconds for running
+        all checks; checks that have not finished by then time out and checks
+        that have not started are skipped.
+
+        :return: a dictionary with the existing config options, or the fallback
+            default options if none defined
+        :rtype: dict
+        """
+        return self.settings.get('execution', {'mode': EXECUTION_SERIAL})
+
+    @property
+    def regex(self) -> dict:
+        """The configuration of the engine that evaluates regex patterns.
+
+        :return: a dictionary with the existing config options, or the fallback
+            default options if none defined
+        :rtype: dict
+        """
+        return self.settings.get(
+            'regex', {'engine': BACKEND_RE, 'timeout': DEFAULT_TIMEOUT}
+        )
+
 
 class ConfigFactory:
     """Responsible for creating the Config object that represents the
@@ -166,12 +232,38 @@ class ConfigFactory:
                 if key not in PR_TYPES_CHECKS
             }
 
+        execution = settings.get('execution', {})
+        mode = execution.get('mode', EXECUTION_SERIAL)
+        if mode not in EXECUTION_MODES:
+            raise ValueError(
+                'Unknown execution mode: "{}". Must be one of: {}'.format(
+                    mode, ', '.join(EXECUTION_MODES)
+                )
+            )
+        order = execution.get('order', ORDER_CONFIG)
+        if order not in ORDERS:
+            raise ValueError(
+                'Unknown execution order: "{}". Must be one of: {}'.format(
+                    order, ', '.join(ORDERS)
+                )
+            )
+
+        # All checks share the same regex engine
+        regex_settings = settings.get('regex', {})
+        engine = RegexEngine(
+            backend=regex_settings.get('engine', BACKEND_RE),
+            timeout=regex_settings.get('timeout', DEFAULT_TIMEOUT),
+        )
+
         check_configs = {}
+        pattern_warnings = []
         for check_type, config_dict in checks.items():
             config = ConfigFactory._create_check_config(check_type, config_dict)
+            config.regex_engine = engine
             check_configs[check_type] = config
+            pattern_warnings.extend(ConfigFactory._get_pattern_warnings(config))
 
-        return Config(settings, check_configs)
+        return Config(settings, check_configs, pattern_warnings)
 
     @staticmethod
     def _create_check_config(check_type: str, config_dict: dict) -> CheckConfig:
@@ -185,5 +277,51 @@ class ConfigFactory:
         """
         config = dict(config_dict)
         failure_level = config.pop('failure_level', FAILURE_LEVEL_ERROR)
+        timeout = config.pop('timeout', None)
+
+        check_config = CheckConfig(
+            check_type=check_type, failure_level=failure_level, **config
+        )
+        check_config.timeout = timeout
+        return check_config
 
-        return CheckConfig(check_type=check_type, failure_level=failure_level, **config)
+    @staticmethod
+    def _get_pattern_warnings(config: CheckConfig) -> List[str]:
+        """Return a warning for each regex pattern of the given check config
+        that might cause catastrophic backtracking.
+
+        Looks for patterns in all options named `pattern` (a string)
+        or `patterns` (a list of strings), at any depth.
+
+        :param CheckConfig config: the config to look into
+        :return: a list of warning messages
+        :rtype: list
+        """
+        warnings = []
+        pending = [config.options]
+        while pending:
+            options = pending.pop()
+            for key, value in options.items():
+                if isinstance(value, dict):
+                    pending.append(value)
+                    continue
+
+                if key == 'pattern':
+                    patterns = [value]
+                elif key == 'patterns' and isinstance(value, list):
+                    patterns = value
+                else:
+                    continue
+
+                for pattern in patterns:
+                    if not isinstance(pattern, str):
+                        continue
+                    risk = get_backtracking_risk(pattern)
+                    if risk:
+                        warnings.append(
+                            'Pattern "{}" of check "{}" might cause catastrophic '
+                            'backtracking ({})'.format(
+                                pattern, config.check_type, risk
+                            )
+                        )
+        return warnings
@@ -68,6 +68,21 @@ class BaseContentProvider:
         return False
 
 
+def clear_content_caches():
+    """Clear the cached content of all content providers.
+
+    The content is cached per provider object, so it would otherwise
+    be kept in memory for the lifetime of the process, e.g. of the daemon.
+    """
+    classes = [BaseContentProvider]
+    while classes:
+        cls = classes.pop()
+        classes.extend(cls.__subclasses__())
+        for attribute in vars(cls).values():
+            if hasattr(attribute, 'cache_clear'):
+                attribute.cache_clear()
+
+
 class BaseGitContentProviderFactory:
     """A base class for classes that want to create content providers.
 
@@ -1,6 +1,8 @@
 from typing import Type, Union
 
 from totem.checks.config import CheckConfig
+from totem.checks.patterns import RegexEngine
+from totem.checks.records import Message
 from totem.checks.results import STATUS_ERROR, STATUS_FAIL, STATUS_PASS, CheckResult
 
 
@@ -39,6 +41,11 @@ class Check:
     def check_type(self) -> str:
         return self._config.check_type
 
+    @property
+    def regex_engine(self) -> RegexEngine:
+        """The engine to use for evaluating the regex patterns of the check."""
+        return self._config.regex_engine
+
     def _from_config(self, name: str, default=None):
         """Return a parameter from the configuration options dictionary.
 
@@ -65,15 +72,21 @@ class Check:
         """
         return CheckResult(self._config, STATUS_PASS, **details)
 
-    def _get_failure(self, error_code: str, message: str, **details) -> CheckResult:
+    def _get_failure(
+        self, error_code: str, message: Union[Message, str], **details
+    ) -> CheckResult:
         """Return a failed result.
 
-        This means that the check was executed and failed."""
+        This means that the check was executed and failed.
+        The message can be a Message object, so that it is only rendered
+        if it is actually shown."""
         return CheckResult(
             self._config, STATUS_FAIL, error_code=error_code, message=message, **details
         )
 
-    def _get_error(self, error_code: str, message: str, **details) -> CheckResult:
+    def _get_error(
+        self, error_code: str, message: Union[Message, str], **details
+    ) -> CheckResult:
         """Return an erroneous result.
 
         This means that the check could not execute due to an error.
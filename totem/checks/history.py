@@ -0,0 +1,198 @@
+"""Contains functionality for recording how each check performed in past runs.
+
+The history is used for running the checks in an adaptive order, so that
+the checks that are cheap and most likely to fail run first. This way,
+in fail-fast mode, a blocking failure is found as soon as possible.
+
+The durations and failures of the checks depend on the repository and on
+how the checks are configured, so by default each repository (i.e. working
+directory) has its own history file, and the history is only kept while
+the configuration of the checks stays the same, as identified by its key
+(see `get_config_key()`).
+
+The history is stored locally, as a JSON file, with the following format:
+    {
+      'version': 2,
+      'key': <key_of_the_configuration_of_the_checks>,
+      'checks': {
+        <check_type>: {
+          'runs': <number_of_runs>,
+          'failures': <number_of_failed_runs>,
+          'duration': <average_duration_in_seconds>,
+        },
+        ...
+      }
+    }
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Union
+
+from totem.checks.config import CheckConfig
+from totem.paths import get_cache_dir
+
+HISTORY_VERSION = 2
+HISTORY_DIRNAME = 'history'
+
+# The weight of the newest duration in the moving average of each check,
+# so that the history adapts when the cost of a check changes
+DURATION_WEIGHT = 0.3
+
+
+def get_default_history_path() -> str:
+    """Return the path of the default history file of the repository
+    in the current working directory.
+
+    :rtype: str
+    """
+    repo_key = hashlib.sha256(os.path.realpath(os.getcwd()).encode('utf-8'))
+    return os.path.join(
+        get_cache_dir(), HISTORY_DIRNAME, '{}.json'.format(repo_key.hexdigest())
+    )
+
+
+def get_config_key(configs: List[CheckConfig]) -> str:
+    """Return a key that identifies the given configurations of checks,
+    so that the history of other configurations is not used for them.
+
+    :param list configs: a list of CheckConfig objects
+    :rtype: str
+    """
+    data = [
+        [x.check_type, x.failure_level, x.timeout, x.options]
+        for x in sorted(configs, key=lambda x: x.check_type)
+    ]
+    content = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class CheckHistory:
+    """Keeps statistics about past executions of each check type.
+
+    >>> history = CheckHistory.load('/path/to/history.json', key)
+    >>> configs = history.sort(configs)
+    >>> history.record('branch_name', duration=0.01, failed=False)
+    >>> history.save()
+    """
+
+    def __init__(
+        self, path: str = None, checks: Dict[str, dict] = None, key: str = None
+    ):
+        """Constructor.
+
+        :param str path: the path of the JSON file to save the history to;
+            if None, the history is only kept in memory
+        :param dict checks: the statistics of each check type, as described
+            in the module documentation
+        :param str key: the key of the configuration of the checks,
+            as returned by `get_config_key()`
+        """
+        self.path = path
+        self.checks: Dict[str, dict] = checks or {}
+        self.key = key
+
+    @staticmethod
+    def load(path: str, key: str = None) -> 'CheckHistory':
+        """Load the history from the given file.
+
+        The history is only an optimization, so if the file does not exist,
+        cannot be parsed or belongs to a different configuration of the checks,
+        an empty history is returned.
+
+        :param str path: the path of the JSON file
+        :param str key: the key of the configuration of the checks,
+            as returned by `get_config_key()`
+        :rtype: CheckHistory
+        """
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return CheckHistory(path, key=key)
+
+        if (
+            not isinstance(data, dict)
+            or data.get('version') != HISTORY_VERSION
+            or data.get('key') != key
+        ):
+            return CheckHistory(path, key=key)
+        checks = data.get('checks')
+        return CheckHistory(path, checks if isinstance(checks, dict) else {}, key)
+
+    def save(self) -> bool:
+        """Save the history to its file, creating the directory if necessary.
+
+        :return: True if the history was saved, False otherwise
+        :rtype: bool
+        """
+        if not self.path:
+            return False
+
+        data = {'version': HISTORY_VERSION, 'key': self.key, 'checks': self.checks}
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # Write to a temporary file first, so that concurrent runs
+            # never read a half-written file
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            return False
+        return True
+
+    def record(self, check_type: str, duration: Union[float, None], failed: bool):
+        """Record a single execution of a check.
+
+        :param str check_type: the type of the check that was executed
+        :param float duration: the time in seconds the check took,
+            or None if it is not known
+        :param bool failed: True if the check did not pass
+        """
+        stats = self.checks.setdefault(
+            check_type, {'runs': 0, 'failures': 0, 'duration': None}
+        )
+        stats['runs'] += 1
+        if failed:
+            stats['failures'] += 1
+        if duration is not None:
+            previous = stats.get('duration')
+            if previous is None:
+                stats['duration'] = duration
+            else:
+                stats['duration'] = (
+                    DURATION_WEIGHT * duration + (1 - DURATION_WEIGHT) * previous
+                )
+
+    def get_priority(self, check_type: str) -> float:
+        """Return the priority of the given check type; the lower the number,
+        the sooner the check should run.
+
+        The priority is the expected cost of the check divided by its
+        probability to fail. The probability is smoothed, so that a check
+        that has never failed still has a chance to run early if it is cheap.
+        Checks without any history get the highest priority (0), so that
+        their statistics are recorded as soon as possible.
+
+        :param str check_type: the type of the check
+        :rtype: float
+        """
+        stats = self.checks.get(check_type)
+        if not stats or not stats.get('duration'):
+            return 0.0
+        failure_rate = (stats.get('failures', 0) + 1) / (stats.get('runs', 0) + 2)
+        return stats['duration'] / failure_rate
+
+    def sort(self, configs: List[CheckConfig]) -> List[CheckConfig]:
+        """Return the given configurations in the order their checks should run.
+
+        The order is stable, i.e. checks with the same priority keep
+        their original order.
+
+        :param list configs: a list of CheckConfig objects
+        :return: a new list with the same configurations
+        :rtype: list
+        """
+        return sorted(configs, key=lambda x: self.get_priority(x.check_type))
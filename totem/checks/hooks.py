@@ -0,0 +1,151 @@
+"""Contains the hooks that allow clients to observe the execution of a suite,
+e.g. for feeding their own metrics or profilers.
+
+Hooks are registered on `BaseCheck.hooks`, for one of the events below:
+>>> check = LocalCheck(config_dict)
+>>> check.hooks.register(EVENT_CHECK_END, on_check_end)
+
+Each hook is called with keyword arguments that depend on the event,
+so it should also accept `**kwargs`, for arguments added in the future:
+
+ - EVENT_SUITE_START: `suite`
+ - EVENT_SUITE_END: `suite`, `results`
+ - EVENT_CHECK_START: `config`
+ - EVENT_CHECK_END: `config`, `result`
+ - EVENT_FETCH_START: `provider` (the name of the content provider class)
+ - EVENT_FETCH_END: `provider`, `duration`, `error`
+ - EVENT_REMOTE_CALL_START: `name` (e.g. 'GithubService.get_pr')
+ - EVENT_REMOTE_CALL_END: `name`, `duration`, `error`
+
+Durations are in seconds and `error` is the exception that was raised,
+or None. Check events are called in the thread that runs the suite;
+all other events are called in the thread that runs the check, so they
+are not called for checks that run in the `processes` execution mode.
+
+A hook that raises an exception never affects the checks; a warning
+is printed instead. When no hooks are registered, the overhead is
+a single check per event.
+"""
+
+import sys
+from typing import Callable, Dict, List
+
+from totem.instrumentation import STAGE_FETCH, STAGE_REMOTE
+
+EVENT_SUITE_START = 'suite_start'
+EVENT_SUITE_END = 'suite_end'
+EVENT_CHECK_START = 'check_start'
+EVENT_CHECK_END = 'check_end'
+EVENT_FETCH_START = 'fetch_start'
+EVENT_FETCH_END = 'fetch_end'
+EVENT_REMOTE_CALL_START = 'remote_call_start'
+EVENT_REMOTE_CALL_END = 'remote_call_end'
+EVENTS = (
+    EVENT_SUITE_START,
+    EVENT_SUITE_END,
+    EVENT_CHECK_START,
+    EVENT_CHECK_END,
+    EVENT_FETCH_START,
+    EVENT_FETCH_END,
+    EVENT_REMOTE_CALL_START,
+    EVENT_REMOTE_CALL_END,
+)
+
+# The events that are emitted from measurements (see `totem.instrumentation`),
+# for each measured stage, as (start event, end event, argument name)
+_MEASURED_EVENTS = {
+    STAGE_FETCH: (EVENT_FETCH_START, EVENT_FETCH_END, 'provider'),
+    STAGE_REMOTE: (EVENT_REMOTE_CALL_START, EVENT_REMOTE_CALL_END, 'name'),
+}
+
+
+class Hooks:
+    """Keeps the hooks that are registered for each event and calls them."""
+
+    def __init__(self):
+        self._hooks: Dict[str, List[Callable]] = {}
+
+    def __bool__(self) -> bool:
+        """Return True if any hooks are registered."""
+        return bool(self._hooks)
+
+    def register(self, event: str, hook: Callable):
+        """Register the given hook for the given event.
+
+        :param str event: one of EVENTS
+        :param callable hook: the function to call on the event
+        :raise ValueError: if the event is unknown
+        """
+        if event not in EVENTS:
+            raise ValueError(
+                'Unknown hook event: "{}". Must be one of: {}'.format(
+                    event, ', '.join(EVENTS)
+                )
+            )
+        self._hooks.setdefault(event, []).append(hook)
+
+    def unregister(self, event: str, hook: Callable):
+        """Remove the given hook from the given event, if registered.
+
+        :param str event: one of EVENTS
+        :param callable hook: the function that was registered
+        """
+        hooks = self._hooks.get(event, [])
+        if hook in hooks:
+            hooks.remove(hook)
+        if not hooks:
+            self._hooks.pop(event, None)
+
+    def emit(self, event: str, **details):
+        """Call all hooks of the given event with the given details.
+
+        :param str event: one of EVENTS
+        """
+        for hook in self._hooks.get(event, ()):
+            try:
+                hook(**details)
+            except Exception as e:
+                print(
+                    'Warning: hook {!r} failed on "{}": {}'.format(hook, event, e),
+                    file=sys.stderr,
+                )
+
+    def observes_measurements(self) -> bool:
+        """Return True if any hooks are registered for events that are
+        emitted from measurements, i.e. fetches and remote calls.
+
+        :rtype: bool
+        """
+        return any(
+            event in self._hooks
+            for start, end, _ in _MEASURED_EVENTS.values()
+            for event in (start, end)
+        )
+
+    def measurement_started(self, stage: str, name: str):
+        """Emit the start event of the given measurement, if it has one.
+
+        Called by `totem.instrumentation` while the hooks are listening.
+
+        :param str stage: the measured stage
+        :param str name: what is measured in the stage
+        """
+        events = _MEASURED_EVENTS.get(stage)
+        if events is not None:
+            self.emit(events[0], **{events[2]: name})
+
+    def measurement_ended(
+        self, stage: str, name: str, duration: float, error: Exception = None
+    ):
+        """Emit the end event of the given measurement, if it has one.
+
+        Called by `totem.instrumentation` while the hooks are listening.
+
+        :param str stage: the measured stage
+        :param str name: what is measured in the stage
+        :param float duration: the duration of the measurement in seconds
+        :param Exception error: the exception raised in the measurement, if any
+        """
+        events = _MEASURED_EVENTS.get(stage)
+        if events is not None:
+            self.emit(events[1], duration=duration, error=error, **{events[2]: name})
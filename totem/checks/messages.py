@@ -0,0 +1,186 @@
+"""Contains functionality for parsing commit messages.
+
+A commit message consists of a subject and an optional body, separated
+by the first empty line. The checks mostly need the length of the subject,
+the number of body lines and the length of the longest body line, so these
+are measured when the message is parsed, with `str.splitlines()` and
+`str.strip()`, and only the numbers are kept. The subject and the body lines
+are only created again if explicitly requested. If the subject is a prefix
+of the message, regex patterns are evaluated on the message itself,
+without creating a new string for the subject.
+
+All checks that examine commit messages should parse them with
+`parse_message()`, or measure them with `measure_message()` if they do not
+need anything else, e.g. when checking a large batch of commits.
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+from totem.checks.patterns import DEFAULT_ENGINE, RegexEngine
+
+
+def measure_message(message: str) -> Tuple[int, int, int, Optional[int]]:
+    """Measure the parts of the given commit message, in one pass.
+
+    The subject is the part of the message until the first empty line
+    (ignoring whitespace). If there is no such line, the whole message
+    without any trailing newlines is considered to be the subject,
+    and the body is considered to be empty. Each line is stripped
+    from leading and trailing whitespace.
+
+    >>> measure_message('Subject\\n\\nFirst line\\nSecond\\n')
+    (7, 2, 10, 7)
+
+    :param str message: the full commit message
+    :return: the length of the subject, the number of body lines,
+        the length of the longest body line (0 if there is no body)
+        and the offset where the subject ends in the message, if the subject
+        is a prefix of the message (None otherwise)
+    :rtype: tuple
+    """
+    lines = message.splitlines()
+    stripped = list(map(str.strip, lines))
+    if '' not in stripped:
+        subject_end = len(message.rstrip('\n'))
+        return subject_end, 0, 0, subject_end
+
+    separator = stripped.index('')
+    body = stripped[separator + 1 :]
+    max_line_length = max(map(len, body)) if body else 0
+    if separator == 1 and message.startswith(stripped[0]):
+        # A single subject line without leading whitespace
+        subject_end = len(stripped[0])
+        return subject_end, len(body), max_line_length, subject_end
+    # The subject lines are joined with a newline between them
+    subject_length = sum(map(len, stripped[:separator])) + max(separator - 1, 0)
+    return subject_length, len(body), max_line_length, None
+
+
+def get_subject(message: str) -> str:
+    """Return the subject of the given commit message,
+    as described in `measure_message()`.
+
+    :param str message: the full commit message
+    :rtype: str
+    """
+    subject, _ = _split(message)
+    return subject
+
+
+class ParsedMessage:
+    """A view of a commit message, with the measurements of its subject
+    and body, as described in `measure_message()`.
+
+    Only the original message and the measurements are stored.
+    """
+
+    __slots__ = (
+        'text',
+        'subject_length',
+        'body_line_count',
+        'max_body_line_length',
+        '_subject_end',
+    )
+
+    def __init__(self, text: str):
+        """Constructor.
+
+        Parses the given message. Use `parse_message()` instead
+        of instantiating this class directly.
+
+        :param str text: the full commit message
+        """
+        self.text = text
+        (
+            self.subject_length,
+            self.body_line_count,
+            self.max_body_line_length,
+            self._subject_end,
+        ) = measure_message(text)
+
+    @property
+    def subject(self) -> str:
+        """The subject of the message.
+
+        Creates a new string every time it is accessed.
+        """
+        if self._subject_end is not None:
+            return self.text[: self._subject_end]
+        return get_subject(self.text)
+
+    @property
+    def body_lines(self) -> List[str]:
+        """A list with all lines of the body.
+
+        Creates new strings every time it is accessed.
+        """
+        _, body_lines = _split(self.text)
+        return body_lines
+
+    def body_line_lengths(self) -> Iterator[int]:
+        """Return an iterator over the length of each body line.
+
+        :rtype: iterator
+        """
+        return map(len, self.body_lines)
+
+    def search_subject(self, pattern: str, engine: RegexEngine = None):
+        """Search for the given regex pattern in the subject.
+
+        If the subject is a prefix of the message, the pattern is evaluated
+        directly on the message, without creating a new string for the subject.
+
+        :param str pattern: the pattern to look for
+        :param RegexEngine engine: the engine to evaluate the pattern with;
+            if not given, DEFAULT_ENGINE is used
+        :return: a match object or None if no match was found
+        """
+        return search_subject(self.text, self._subject_end, pattern, engine)
+
+
+def search_subject(
+    message: str,
+    subject_end: Optional[int],
+    pattern: str,
+    engine: RegexEngine = None,
+):
+    """Search for the given regex pattern in the subject of the given message.
+
+    :param str message: the full commit message
+    :param int subject_end: the offset where the subject ends in the message,
+        as returned by `measure_message()`, or None if the subject
+        is not a prefix of the message
+    :param str pattern: the pattern to look for
+    :param RegexEngine engine: the engine to evaluate the pattern with;
+        if not given, DEFAULT_ENGINE is used
+    :return: a match object or None if no match was found
+    """
+    engine = engine or DEFAULT_ENGINE
+    if subject_end is not None:
+        return engine.search(pattern, message, endpos=subject_end)
+    return engine.search(pattern, get_subject(message))
+
+
+def parse_message(message: str) -> ParsedMessage:
+    """Parse the given commit message into a subject and body lines.
+
+    :param str message: the full commit message
+    :return: a view of the message
+    :rtype: ParsedMessage
+    """
+    return ParsedMessage(message)
+
+
+def _split(message: str) -> Tuple[str, List[str]]:
+    """Split the given commit message into its subject and stripped body lines.
+
+    :param str message: the full commit message
+    :return: the subject and the list of body lines
+    :rtype: tuple
+    """
+    stripped = [line.strip() for line in message.splitlines()]
+    try:
+        separator = stripped.index('')
+    except ValueError:
+        return message.rstrip('\n'), []
+    return '\n'.join(stripped[:separator]), stripped[separator + 1 :]
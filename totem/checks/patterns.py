@@ -0,0 +1,532 @@
+"""Contains functionality for matching many regex patterns against
+the same (potentially large) piece of text.
+
+Checks like PRBodyIncludesCheck and PRBodyExcludesCheck need to know which
+of their configured patterns appear in a PR body. Searching for each pattern
+separately means scanning the whole body once per pattern, which becomes
+expensive for big bodies (e.g. pasted logs) and long lists of patterns.
+
+It also contains RegexEngine, through which all user-supplied patterns
+are evaluated. By default it uses Python's `re` module, which is
+a backtracking engine; a badly written pattern (e.g. "(a+)+$") can take
+exponential time on certain inputs. To guard against that, RegexEngine can:
+ - use the linear-time RE2 engine, if the optional `re2` module is installed
+   (falling back to `re` for patterns RE2 does not support)
+ - enforce a time budget on the pattern evaluations of a check
+Patterns that are prone to catastrophic backtracking can also be detected
+statically, via `get_backtracking_risk()`.
+"""
+
+import re
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+try:
+    import re2
+except ImportError:  # pragma: no cover
+    re2 = None
+
+try:
+    from re import _parser as sre_parse  # type: ignore
+except ImportError:  # pragma: no cover
+    import sre_parse  # type: ignore
+
+BACKEND_RE = 're'
+BACKEND_RE2 = 're2'
+BACKEND_AUTO = 'auto'
+
+# The default maximum time (in seconds) the pattern evaluations may take
+DEFAULT_TIMEOUT = 5.0
+
+# The maximum number of compiled patterns to keep, e.g. for the alternations
+# of all subsets of patterns that `PatternSet.search_indexes()` builds
+MAX_COMPILED_PATTERNS = 512
+
+# The flags of `re` that RE2 also supports, along with their inline form,
+# since RE2 does not accept the flags of `re`
+_RE2_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+
+class PatternTimeoutError(Exception):
+    """Raised when the evaluation of a pattern exceeds its time budget."""
+
+    def __init__(self, pattern: Optional[str], timeout: float):
+        """Constructor.
+
+        :param str pattern: the pattern that was evaluated, or None if
+            the time budget covered the evaluations of many patterns
+        :param float timeout: the time budget in seconds
+        """
+        if pattern is None:
+            message = (
+                'Evaluation of the patterns took longer than {} seconds and was '
+                'aborted. A pattern might be prone to catastrophic '
+                'backtracking'.format(timeout)
+            )
+        else:
+            message = (
+                'Evaluation of pattern "{}" took longer than {} seconds and was '
+                'aborted. The pattern might be prone to catastrophic '
+                'backtracking'.format(pattern, timeout)
+            )
+        super().__init__(message)
+        self.pattern = pattern
+        self.timeout = timeout
+
+
+class RegexEngine:
+    """Compiles and evaluates user-supplied regex patterns.
+
+    Supports the following backends:
+     - 're': Python's built-in module (the default)
+     - 're2': the linear-time RE2 engine, provided by the optional `re2`
+       module; if it is not installed or does not support a specific pattern
+       (e.g. one with backreferences or lookarounds) or flag (e.g. re.VERBOSE),
+       `re` is used instead
+     - 'auto': 're2' if the `re2` module is installed, 're' otherwise
+
+    If a timeout is defined, evaluations that take longer than that raise
+    a PatternTimeoutError. Inside a `budget()` block (e.g. around a whole
+    check), a single timer covers all evaluations of the block together;
+    otherwise, each evaluation gets its own timer. The timer relies on SIGALRM,
+    so it is only enforced on platforms that support it and when evaluating
+    in the main thread; anywhere else, patterns are evaluated without a time
+    budget. Patterns compiled by RE2 run in linear time, so they never get
+    a timer of their own.
+    """
+
+    def __init__(self, backend: str = BACKEND_RE, timeout: float = DEFAULT_TIMEOUT):
+        """Constructor.
+
+        :param str backend: the backend to use, one of BACKEND_RE,
+            BACKEND_RE2, BACKEND_AUTO
+        :param float timeout: the maximum time in seconds that a single
+            evaluation can take; if None or 0, no time budget is enforced
+        """
+        if backend not in (BACKEND_RE, BACKEND_RE2, BACKEND_AUTO):
+            raise ValueError('Unknown regex engine backend: "{}"'.format(backend))
+        self.backend = backend
+        self.timeout = timeout
+        # True while the evaluations are covered by the timer of `budget()`
+        self._budgeted = False
+
+    @property
+    def uses_re2(self) -> bool:
+        """True if RE2 will be attempted for compiling patterns."""
+        return self.backend in (BACKEND_RE2, BACKEND_AUTO) and re2 is not None
+
+    def compile(self, pattern: str, flags: int = 0):
+        """Compile the given pattern with the proper backend.
+
+        The least recently used compiled patterns are cached.
+
+        :param str pattern: the pattern to compile
+        :param int flags: the flags to use, e.g. re.MULTILINE
+        :return: a compiled pattern, either from `re` or `re2`
+        """
+        return _compile(pattern, flags, self.uses_re2)
+
+    @contextmanager
+    def budget(self):
+        """Enforce the time budget on all evaluations inside the block
+        together, with a single timer, instead of one timer per evaluation.
+
+        :raise PatternTimeoutError: if the block exceeded the time budget
+        """
+        if self._budgeted or not _can_use_timer(self.timeout):
+            yield
+            return
+
+        self._budgeted = True
+        try:
+            with time_budget(self.timeout):
+                yield
+        finally:
+            self._budgeted = False
+
+    def search(
+        self,
+        pattern: str,
+        text: str,
+        flags: int = 0,
+        pos: int = 0,
+        endpos: int = None,
+    ):
+        """Scan through the given text looking for the first location
+        where the pattern matches, like `re.search()`.
+
+        :param str pattern: the pattern to look for
+        :param str text: the text to search in
+        :param int flags: the flags to use, e.g. re.MULTILINE
+        :param int pos: the index in the text where the search should start
+        :param int endpos: if given, the text is searched as if it was
+            only `endpos` characters long
+        :return: a match object or None if no match was found
+        :raise PatternTimeoutError: if the search exceeded the time budget
+        """
+        compiled = _compile(pattern, flags, self.uses_re2)
+        if self.timeout and not self._budgeted and type(compiled) is _RE_PATTERN:
+            with time_budget(self.timeout, pattern):
+                if endpos is None:
+                    return compiled.search(text, pos)
+                return compiled.search(text, pos, endpos)
+        if endpos is None:
+            return compiled.search(text, pos)
+        return compiled.search(text, pos, endpos)
+
+
+_RE_PATTERN = type(re.compile(''))
+
+
+@lru_cache(maxsize=MAX_COMPILED_PATTERNS)
+def _compile(pattern: str, flags: int, use_re2: bool):
+    """Compile the given pattern with RE2 if requested and supported,
+    or with `re` otherwise.
+
+    :param str pattern: the pattern to compile
+    :param int flags: the flags to use, e.g. re.MULTILINE
+    :param bool use_re2: True if RE2 should be attempted
+    :return: a compiled pattern, either from `re` or `re2`
+    """
+    re2_pattern = _get_re2_pattern(pattern, flags) if use_re2 else None
+    if re2_pattern is not None:
+        try:
+            return re2.compile(re2_pattern)
+        except re2.error:
+            # Unsupported by RE2, fall back to `re`
+            pass
+    return re.compile(pattern, flags)
+
+
+def _get_re2_pattern(pattern: str, flags: int) -> Optional[str]:
+    """Return the given pattern with the given flags turned into inline flags,
+    for compiling it with RE2.
+
+    >>> _get_re2_pattern('^a', re.MULTILINE | re.IGNORECASE)
+    '(?im)^a'
+
+    :param str pattern: the pattern to compile
+    :param int flags: the flags of `re` to use
+    :return: the pattern for RE2, or None if RE2 does not support some
+        of the flags (e.g. re.VERBOSE)
+    :rtype: str
+    """
+    # Unicode matching is the default for str patterns in both engines
+    flags &= ~re.UNICODE
+    inline = ''
+    for flag, letter in _RE2_INLINE_FLAGS:
+        if flags & flag:
+            inline += letter
+            flags &= ~flag
+    if flags:
+        return None
+    return '(?{}){}'.format(inline, pattern) if inline else pattern
+
+
+def get_backtracking_risk(pattern: str) -> Optional[str]:
+    """Statically analyze the given pattern and return a description
+    of the reason it might cause catastrophic backtracking.
+
+    This is a heuristic that detects the most common problematic constructs:
+     - nested quantifiers, e.g. "(a+)+" or "(\\w+\\s?)*"
+     - repeated alternations with identical alternatives, e.g. "(a|a)*"
+
+    :param str pattern: the pattern to analyze
+    :return: a description of the risk, or None if no risk was found
+        or if the pattern is invalid
+    :rtype: str
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+    return _find_risk(parsed, inside_repeat=False)
+
+
+def _find_risk(subpattern, inside_repeat: bool) -> Optional[str]:
+    """Recursively look for risky constructs inside the given parsed pattern.
+
+    :param subpattern: a list of (opcode, argument) items, as produced
+        by the regex parser
+    :param bool inside_repeat: True if the items are inside a quantifier
+        with no upper bound
+    :return: a description of the risk or None
+    :rtype: str
+    """
+    repeats = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+    for op, av in subpattern:
+        children: List[Any] = []
+        child_inside_repeat = inside_repeat
+        if op in repeats:
+            min_count, max_count, item = av
+            unbounded = max_count == sre_parse.MAXREPEAT
+            if inside_repeat and max_count > 1 and min_count != max_count:
+                return 'nested quantifiers'
+            child_inside_repeat = inside_repeat or unbounded
+            children = [item]
+        elif op == sre_parse.SUBPATTERN:
+            children = [av[-1]]
+        elif op == sre_parse.BRANCH:
+            alternatives = av[1]
+            if inside_repeat:
+                seen = [str(list(alternative)) for alternative in alternatives]
+                if len(set(seen)) != len(seen):
+                    return 'repeated alternation with identical alternatives'
+            children = alternatives
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            children = [av[1]]
+        elif op == sre_parse.GROUPREF_EXISTS:
+            children = [x for x in av[1:] if x is not None]
+
+        # Possessive quantifiers and atomic groups never backtrack,
+        # so they are not descended into
+
+        for child in children:
+            risk = _find_risk(child, child_inside_repeat)
+            if risk:
+                return risk
+    return None
+
+
+def _can_use_timer(timeout: Optional[float]) -> bool:
+    """Return True if a time budget with the given timeout can be enforced
+    here, i.e. it is enabled, the platform supports SIGALRM and the current
+    thread is the main thread.
+
+    :param float timeout: the time budget in seconds; None or 0 if disabled
+    :rtype: bool
+    """
+    return (
+        bool(timeout)
+        and hasattr(signal, 'setitimer')
+        and threading.current_thread() is threading.main_thread()
+    )
+
+
+@contextmanager
+def time_budget(timeout: Optional[float], pattern: str = None):
+    """Raise a PatternTimeoutError if the enclosed code takes longer than
+    the given time.
+
+    Uses SIGALRM, which interrupts the regex engine while it is running.
+    If the platform does not support it or the current thread is not the main
+    thread, the enclosed code runs without a time budget.
+
+    :param float timeout: the time budget in seconds; None or 0 to disable
+    :param str pattern: the pattern being evaluated, used in the error message;
+        None if the code evaluates many patterns
+    """
+    if not _can_use_timer(timeout):
+        yield
+        return
+
+    previous_delay, _ = signal.getitimer(signal.ITIMER_REAL)
+    if previous_delay and previous_delay <= timeout:
+        # A timer that expires sooner is already running, e.g. the timeout
+        # of the check, so it interrupts the evaluation on its own
+        yield
+        return
+
+    def handler(signum, frame):
+        raise PatternTimeoutError(pattern, timeout)
+
+    previous_handler = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+        if previous_delay:
+            # Restore the timer that was already running, for the time it had left
+            elapsed = time.monotonic() - start
+            signal.setitimer(signal.ITIMER_REAL, max(previous_delay - elapsed, 1e-6))
+
+
+DEFAULT_ENGINE = RegexEngine()
+
+
+class PatternSet:
+    """Finds which of a list of regex patterns appear in a text,
+    without searching the whole text once per pattern.
+
+    All patterns are combined into a single alternation, with each pattern
+    inside its own named group, and the text is searched from left to right.
+    Every time a match is found, the name of the group that matched shows
+    which pattern was found. An alternation only reports one pattern per
+    match, so the search then resumes from the start of that match with
+    an alternation of the patterns that have not been found yet, so that
+    patterns which match at the same position (or overlap with the one that
+    was just found) are not missed.
+
+    The start of each search never moves backwards, so for k patterns
+    there are at most k + 1 searches, and a text that contains none of the
+    patterns is searched only once. Each search still tries all remaining
+    patterns at every position, like any alternation, and each set of
+    remaining patterns is a new alternation that needs to be compiled.
+
+    Patterns that cannot be safely combined (e.g. because they contain
+    their own groups, which could be referenced by number) are searched
+    for separately.
+
+    >>> patterns = PatternSet(['foo', 'ba[rz]'])
+    >>> patterns.search('the bar is closed')
+    {'ba[rz]'}
+    """
+
+    def __init__(
+        self, patterns: Sequence[str], flags: int = 0, engine: RegexEngine = None
+    ):
+        """Constructor.
+
+        :param list patterns: the regex patterns to look for
+        :param int flags: the flags to use for all patterns, e.g. re.MULTILINE
+        :param RegexEngine engine: the engine to evaluate the patterns with;
+            if not given, DEFAULT_ENGINE is used
+        """
+        self.patterns: Tuple[str, ...] = tuple(patterns)
+        self.flags = flags
+        self.engine = engine or DEFAULT_ENGINE
+
+        # Split the patterns into those that can be combined in one
+        # alternation and those that need to be searched separately
+        self._combinable: List[int] = []
+        self._separate: List[int] = []
+        for index, pattern in enumerate(self.patterns):
+            if PatternSet._is_combinable(pattern, flags):
+                self._combinable.append(index)
+            else:
+                self._separate.append(index)
+
+    def search(self, text: str) -> Set[str]:
+        """Return all patterns that match somewhere in the given text.
+
+        :param str text: the text to search in
+        :return: a set with all patterns that were found
+        :rtype: set
+        """
+        found = self.search_indexes(text)
+        return {self.patterns[index] for index in found}
+
+    def search_indexes(self, text: str) -> Set[int]:
+        """Return the indexes of all patterns that match somewhere
+        in the given text.
+
+        Useful when the same pattern appears more than once in the list.
+        See the class documentation for how the text is searched.
+
+        :param str text: the text to search in
+        :return: a set with the indexes (in `self.patterns`) of all
+            patterns that were found
+        :rtype: set
+        """
+        found: Set[int] = set()
+        remaining = tuple(self._combinable)
+        position = 0
+        while remaining:
+            alternation = _build_alternation(
+                tuple(self.patterns[i] for i in remaining)
+            )
+            match = self.engine.search(alternation, text, self.flags, position)
+            if match is None:
+                break
+
+            # The name of the group that matched shows which of the remaining
+            # patterns was found; the same text may also match duplicates of it
+            matched_index = remaining[int(_get_group_name(match)[2:])]
+            matched_pattern = self.patterns[matched_index]
+            found.update(i for i in remaining if self.patterns[i] == matched_pattern)
+            remaining = tuple(i for i in remaining if i not in found)
+            position = match.start()
+
+        for index in self._separate:
+            match = self.engine.search(self.patterns[index], text, self.flags)
+            if match is not None:
+                found.add(index)
+
+        return found
+
+    @staticmethod
+    def _is_combinable(pattern: str, flags: int) -> bool:
+        """Return True if the given pattern can be safely added as an alternative
+        inside a bigger regex, False otherwise.
+
+        :param str pattern: the pattern to examine
+        :param int flags: the flags that will be used for compiling
+        :rtype: bool
+        """
+        try:
+            compiled = re.compile(pattern, flags)
+        except re.error:
+            # Let it fail on its own, the same way it would if it wasn't combined
+            return False
+
+        # Wrapping the pattern in a new group would change the numbers
+        # of its own groups, breaking any backreferences to them
+        if compiled.groups:
+            return False
+
+        # Inline global flags, e.g. "(?i)", apply to the whole expression,
+        # so they would also affect the other patterns (or are rejected
+        # if not at the start of the expression, in newer Python versions)
+        if compiled.flags != re.compile('', flags).flags:
+            return False
+        try:
+            re.compile('(?:{})|x'.format(pattern), flags)
+        except re.error:
+            return False
+
+        return True
+
+
+@lru_cache(maxsize=256)
+def _build_alternation(patterns: Tuple[str, ...]) -> str:
+    """Combine the given patterns into one alternation,
+    putting each one in a named group.
+
+    The name of each group is `_p<index>`, where index is the position
+    of the pattern in the given tuple.
+
+    :param tuple patterns: the patterns to combine
+    :return: the combined pattern
+    :rtype: str
+    """
+    return '|'.join(
+        '(?P<_p{}>{})'.format(index, pattern) for index, pattern in enumerate(patterns)
+    )
+
+
+def _get_group_name(match) -> str:
+    """Return the name of the group that matched in an alternation
+    built by `_build_alternation()`.
+
+    :param match: a match object, either from `re` or `re2`
+    :rtype: str
+    """
+    name = getattr(match, 'lastgroup', None)
+    if name is not None:
+        return name
+    # Not all backends track the last group that matched
+    return next(k for k, v in match.groupdict().items() if v is not None)
+
+
+@lru_cache(maxsize=64)
+def get_pattern_set(
+    patterns: Tuple[str, ...], flags: int = 0, engine: RegexEngine = None
+) -> PatternSet:
+    """Return a PatternSet for the given patterns.
+
+    The object is cached, so that checks that use the same patterns
+    do not need to analyze them again.
+
+    :param tuple patterns: the regex patterns to look for
+    :param int flags: the flags to use for all patterns
+    :param RegexEngine engine: the engine to evaluate the patterns with
+    :rtype: PatternSet
+    """
+    return PatternSet(patterns, flags, engine)
@@ -0,0 +1,289 @@
+"""Contains compact record types for the content and the results of checks.
+
+When checking a large number of commits (e.g. when auditing the whole history
+of a repository), creating a dictionary for each commit and each failure
+costs a lot of memory. The classes here use `__slots__` instead, and provide
+a dictionary form only as a compatibility view, created on demand.
+"""
+
+from typing import Any, Callable, Iterator, List, Tuple, Union
+
+
+class Message:
+    """A human-readable message, stored as a code and the parameters
+    that are necessary for creating it.
+
+    The actual string is only created when the message is rendered
+    (e.g. by a reporter) and it is then memoized. This way, messages of results
+    that are never shown (e.g. hidden warnings) cost almost nothing.
+
+    >>> msg = Message('too_long', 'Has {length} characters', length=60)
+    >>> msg.render()
+    'Has 60 characters'
+    """
+
+    __slots__ = ('code', 'template', 'params', '_rendered')
+
+    def __init__(self, code: str, template: Union[str, Callable], **params):
+        """Constructor.
+
+        :param str code: an identifier of the type of the message
+        :param template: either a string that will be formatted with the
+            parameters via `str.format()`, or a callable that accepts the
+            parameters as keyword arguments and returns the string
+        """
+        self.code = code
+        self.template = template
+        self.params = params
+        self._rendered: Union[str, None] = None
+
+    def render(self) -> str:
+        """Return the human-readable form of the message.
+
+        :rtype: str
+        """
+        if self._rendered is None:
+            if callable(self.template):
+                self._rendered = self.template(**self.params)
+            else:
+                self._rendered = self.template.format(**self.params)
+        return self._rendered
+
+    def as_data(self) -> dict:
+        """Return the structured form of the message.
+
+        :return: a dictionary like {'code': <code>, 'params': {...}}
+        :rtype: dict
+        """
+        return {'code': self.code, 'params': dict(self.params)}
+
+    def __str__(self) -> str:
+        return self.render()
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Message):
+            return self.render() == other.render()
+        if isinstance(other, str):
+            return self.render() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # Equal messages have the same rendered string
+        return hash(self.render())
+
+    def __repr__(self) -> str:
+        return 'Message(code={!r}, params={!r})'.format(self.code, self.params)
+
+
+def render_message(message: Union[Message, str, None]) -> Union[str, None]:
+    """Return the given message as a string.
+
+    :param message: a Message object, a string or None
+    :return: the rendered message, or the given value if it is not a Message
+    """
+    if isinstance(message, Message):
+        return message.render()
+    return message
+
+
+class CommitInfo:
+    """Information about a single commit, as provided by content providers.
+
+    For compatibility, it can also be accessed like the dictionary
+    that content providers used to return:
+        {
+          'message': <message>,
+          'sha': <sha>,
+          'url': <url>,
+          'stats': {
+            'additions': <total_additions>,
+            'deletions': <total_deletions>,
+            'total': <total_lines>,
+          },
+        }
+    """
+
+    __slots__ = ('message', 'sha', 'url', 'additions', 'deletions', 'total')
+
+    KEYS = ('message', 'sha', 'url', 'stats')
+
+    def __init__(
+        self,
+        message: str,
+        sha: str = '',
+        url: str = '',
+        additions: int = 0,
+        deletions: int = 0,
+        total: int = None,
+    ):
+        """Constructor.
+
+        :param str message: the full commit message
+        :param str sha: the SHA of the commit
+        :param str url: the URL to visit for seeing the commit
+        :param int additions: the number of added lines
+        :param int deletions: the number of deleted lines
+        :param int total: the total number of changed lines; if not given,
+            it is the sum of additions and deletions
+        """
+        self.message = message
+        self.sha = sha
+        self.url = url
+        self.additions = additions
+        self.deletions = deletions
+        self.total = additions + deletions if total is None else total
+
+    @property
+    def stats(self) -> dict:
+        """The statistics of the commit, in a new dictionary."""
+        return {
+            'additions': self.additions,
+            'deletions': self.deletions,
+            'total': self.total,
+        }
+
+    def as_dict(self) -> dict:
+        """Return the commit information as a new dictionary.
+
+        :rtype: dict
+        """
+        return {key: self[key] for key in CommitInfo.KEYS}
+
+    def keys(self) -> Tuple[str, ...]:
+        return CommitInfo.KEYS
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getitem__(self, key: str):
+        if key == 'stats':
+            return self.stats
+        if key in ('message', 'sha', 'url'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in CommitInfo.KEYS
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CommitInfo):
+            return all(getattr(self, x) == getattr(other, x) for x in self.__slots__)
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return 'CommitInfo(sha={!r}, total={!r})'.format(self.sha, self.total)
+
+
+def get_total_changes(commit: Union[CommitInfo, dict]) -> int:
+    """Return the total number of changed lines of the given commit.
+
+    :param commit: a CommitInfo object or a dictionary in the format
+        described in CommitInfo
+    :rtype: int
+    :raise KeyError: if the commit is a dictionary without statistics
+    """
+    if isinstance(commit, CommitInfo):
+        return commit.total
+    return commit['stats']['total']
+
+
+class CommitFailure:
+    """Describes the errors found in a single commit that failed a check.
+
+    Keeps a reference to the commit instead of copying its information.
+    For compatibility, it can be converted to the dictionary that checks
+    used to create for each failed commit:
+        {
+          'sha': <sha>,
+          'url': <url>,
+          'message': <message>,
+          <error_id>: <error_message>,
+          ...,
+          'commit_order': <order>,
+        }
+    """
+
+    __slots__ = ('commit', 'errors', 'commit_order')
+
+    def __init__(
+        self,
+        commit: Union[CommitInfo, dict],
+        errors: List[Tuple[str, Any]],
+        commit_order: int = None,
+    ):
+        """Constructor.
+
+        :param commit: the commit that failed, as a CommitInfo object
+            or a dictionary
+        :param list errors: a list of (error_id, error_message) tuples;
+            each error message can be a string or a Message object
+        :param int commit_order: the position of the commit in the list of
+            commits that were checked, starting from 1
+        """
+        self.commit = commit
+        self.errors = errors
+        self.commit_order = commit_order
+
+    def keys(self) -> Iterator[str]:
+        yield 'sha'
+        yield 'url'
+        yield 'message'
+        for key, _ in self.errors:
+            yield key
+        yield 'commit_order'
+
+    def as_dict(self) -> dict:
+        """Return the failure as a new dictionary.
+
+        :rtype: dict
+        """
+        commit = self.commit
+        result = {
+            'sha': commit['sha'],
+            'url': commit['url'],
+            'message': commit['message'],
+        }
+        for key, value in self.errors:
+            result[key] = render_message(value)
+        result['commit_order'] = self.commit_order
+        return result
+
+    def __getitem__(self, key: str):
+        if key in ('sha', 'url', 'message'):
+            return self.commit[key]
+        if key == 'commit_order':
+            return self.commit_order
+        for error_key, value in self.errors:
+            if error_key == key:
+                return render_message(value)
+        raise KeyError(key)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (CommitFailure, dict)):
+            other_dict = other.as_dict() if isinstance(other, CommitFailure) else other
+            return self.as_dict() == other_dict
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self.as_dict())
+
+
+def as_compatible(value):
+    """Return the given value in its dictionary form, if it is a record,
+    or a list of records. Messages are rendered into strings.
+
+    :param value: any value
+    :return: the dictionary form of the value, or the value itself
+    """
+    if isinstance(value, Message):
+        return value.render()
+    if hasattr(value, 'as_dict'):
+        return value.as_dict()
+    if isinstance(value, list) and value and hasattr(value[0], 'as_dict'):
+        return [x.as_dict() if hasattr(x, 'as_dict') else x for x in value]
+    return value
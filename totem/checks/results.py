@@ -1,14 +1,17 @@
-from typing import List
+from typing import List, Union
 
 from totem.checks.config import FAILURE_LEVEL_ERROR, FAILURE_LEVEL_WARNING, CheckConfig
+from totem.checks.records import Message, as_compatible, render_message
 
 STATUS_PASS = 'pass'  # The check passed with success
 STATUS_FAIL = 'fail'  # The check was executed properly but failed
 STATUS_ERROR = 'error'  # The check could not be executed because of an error
+STATUS_TIMEOUT = 'timeout'  # The check did not finish in the allowed time
 
 ERROR_INVALID_CONTENT = 'invalid_content'
 ERROR_INVALID_CONFIG = 'invalid_config'
 ERROR_GENERIC = 'generic_error'
+ERROR_TIMEOUT = 'timeout'
 
 ERROR_INVALID_BRANCH_NAME = 'invalid_branch_name'
 ERROR_INVALID_PR_TITLE = 'invalid_pr_title'
@@ -19,7 +22,25 @@ ERROR_INVALID_COMMIT_MESSAGE_FORMAT = 'invalid_commit_message_format'
 
 
 class CheckResult:
-    """Contains the results of a single Check that was performed."""
+    """Contains the results of a single Check that was performed.
+
+    Uses `__slots__` to keep its memory footprint small. The message is kept
+    separately from any other details, which are only stored if they exist.
+
+    The message can be given either as a string or as a Message object,
+    i.e. a code plus parameters. In the latter case, it is only turned into
+    a string when it is rendered (e.g. by a reporter), and only once.
+    """
+
+    __slots__ = (
+        'config',
+        'status',
+        'error_code',
+        'duration',
+        '_message',
+        '_extra',
+        '_details',
+    )
 
     def __init__(
         self, config: CheckConfig, status: str, error_code: str = None, **details
@@ -29,13 +50,66 @@ class CheckResult:
         :param CheckConfig config: the related configuration with which the
             check was run
         :param str status: the status that shows how the check went,
-            one of STATUS_PASS, STATUS_FAIL, STATUS_ERROR
+            one of STATUS_PASS, STATUS_FAIL, STATUS_ERROR, STATUS_TIMEOUT
         :param str error_code: a string that shows what error occurred
         """
         self.config = config
         self.status = status
         self.error_code = error_code
-        self.details = details
+
+        # The time in seconds it took to fetch the content and run the check,
+        # set by the suite that executed it
+        self.duration: Union[float, None] = None
+        self._message: Union[Message, str, None] = details.pop('message', None)
+        self._extra = details or None
+        self._details: Union[dict, None] = None
+
+    @property
+    def message(self) -> Union[str, None]:
+        """The human-readable message of the result, if any.
+
+        It is rendered the first time it is accessed.
+        """
+        return render_message(self._message)
+
+    @property
+    def raw_message(self) -> Union[Message, str, None]:
+        """The message of the result, as given to the constructor,
+        i.e. without rendering it."""
+        return self._message
+
+    @property
+    def details(self) -> dict:
+        """All details of the result, including the message, if any.
+
+        This is a compatibility view, created the first time it is accessed.
+        Any records (e.g. CommitFailure objects) are converted to dictionaries
+        and any messages are rendered.
+
+        :rtype: dict
+        """
+        if self._details is None:
+            details = {}
+            if self._message is not None:
+                details['message'] = self.message
+            if self._extra:
+                for key, value in self._extra.items():
+                    details[key] = as_compatible(value)
+            self._details = details
+        return self._details
+
+    def get_detail(self, name: str, default=None):
+        """Return a single detail of the result, without creating
+        the compatibility view of all details.
+
+        :param str name: the name of the detail
+        :param default: the value to return if the detail does not exist
+        """
+        if name == 'message':
+            return default if self._message is None else self.message
+        if self._extra:
+            return self._extra.get(name, default)
+        return default
 
     @property
     def success(self) -> bool:
@@ -66,6 +140,7 @@ class CheckSuiteResults:
     def __init__(self):
         self._failed: List[CheckResult] = []
         self._successful: List[CheckResult] = []
+        self._skipped: List[CheckConfig] = []
 
     def add(self, result: CheckResult):
         """Store the given result.
@@ -77,6 +152,13 @@ class CheckSuiteResults:
         else:
             self._failed.append(result)
 
+    def skip(self, config: CheckConfig):
+        """Store that the check of the given configuration did not run.
+
+        :param CheckConfig config: the configuration of the skipped check
+        """
+        self._skipped.append(config)
+
     @property
     def successful(self) -> List[CheckResult]:
         """A list of all CheckResult objects that passed the check."""
@@ -87,6 +169,12 @@ class CheckSuiteResults:
         """A list of all CheckResult objects that failed the check."""
         return self._failed
 
+    @property
+    def skipped(self) -> List[CheckConfig]:
+        """A list of the CheckConfig objects of all checks that did not run,
+        e.g. because a previous check failed in fail-fast mode."""
+        return self._skipped
+
     @property
     def warnings(self) -> List[CheckResult]:
         """A list of all CheckResult objects that failed the check
@@ -1,12 +1,51 @@
-from totem.checks.config import CheckConfig, Config
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Tuple, Union
+
+from totem.checks.config import (
+    EXECUTION_PROCESSES,
+    EXECUTION_SERIAL,
+    FAILURE_LEVEL_ERROR,
+    ORDER_ADAPTIVE,
+    ORDER_CONFIG,
+    CheckConfig,
+    Config,
+)
 from totem.checks.content import BaseGitContentProviderFactory
-from totem.checks.core import CheckFactory
+from totem.checks.core import Check, CheckFactory
+from totem.checks.history import (
+    CheckHistory,
+    get_config_key,
+    get_default_history_path,
+)
+from totem.checks.hooks import (
+    EVENT_CHECK_END,
+    EVENT_CHECK_START,
+    EVENT_SUITE_END,
+    EVENT_SUITE_START,
+    Hooks,
+)
 from totem.checks.results import (
     ERROR_GENERIC,
+    ERROR_TIMEOUT,
     STATUS_ERROR,
+    STATUS_TIMEOUT,
     CheckResult,
     CheckSuiteResults,
 )
+from totem.instrumentation import (
+    STAGE_CHECK,
+    STAGE_FETCH,
+    listening,
+    measure,
+    propagate_context,
+    set_attributes,
+    span,
+)
 
 
 class CheckSuite:
@@ -19,7 +58,17 @@ class CheckSuite:
 
     In order to use it, you just need to create an instance with
     all necessary configuration and then call `run()`.
-    All checks run synchronously.
+
+    By default, all checks run synchronously. The `execution` settings
+    of the configuration can define that they run in parallel instead,
+    in a pool of threads or processes. In fail-fast mode, no more checks
+    are started after the first check that fails with an error failure level;
+    the checks that did not run are stored as skipped.
+
+    The checks can also run in an adaptive order, based on the history
+    of previous runs, so that cheap checks that are likely to fail run first.
+
+    Clients can observe the execution with hooks (see `totem.checks.hooks`).
     """
 
     def __init__(
@@ -27,6 +76,8 @@ class CheckSuite:
         config: Config,
         content_provider_factory: BaseGitContentProviderFactory,
         check_factory: CheckFactory,
+        history: CheckHistory = None,
+        hooks: Hooks = None,
     ):
         """Constructor.
 
@@ -36,21 +87,274 @@ class CheckSuite:
             knows how to create content providers for a specific Git service
         :param CheckFactory check_factory: an object that knows how to create
             Check subclasses for every known configuration type
+        :param CheckHistory history: the statistics of previous runs, used
+            in adaptive order; if None, they are loaded from the history file
+            of the configuration when needed
+        :param Hooks hooks: the hooks to call while the checks run, if any
         """
         self._content_provider_factory = content_provider_factory
         self._check_factory = check_factory
+        self._history = history
+        self._hooks = hooks
         self.config = config
         self.results = CheckSuiteResults()
 
     def run(self):
         """Execute all checks that the suite contains and store the results.
 
-        Checks are executed synchronously, one by one.
+        Depending on the execution mode of the configuration, checks are either
+        executed synchronously, one by one, or in parallel. In all cases,
+        the results are stored in the order the checks are configured.
         This is the main point of the application where the actual magic happens.
         """
-        for check_type, config in self.config.check_configs.items():
-            result = self._run_check(config, self._check_factory)
-            self.results.add(result)
+        execution = self.config.execution
+        mode = execution.get('mode', EXECUTION_SERIAL)
+        attributes = {
+            'totem.checks.count': len(self.config.check_configs),
+            'totem.execution.mode': mode,
+        }
+        hooks = self._hooks
+        with span('totem.suite', attributes), ExitStack() as stack:
+            if hooks:
+                if hooks.observes_measurements():
+                    stack.enter_context(listening(hooks))
+                hooks.emit(EVENT_SUITE_START, suite=self)
+            self._run(execution, mode)
+            if hooks:
+                hooks.emit(EVENT_SUITE_END, suite=self, results=self.results)
+
+    def _run(self, execution: dict, mode: str):
+        """Execute all checks and store the results.
+
+        :param dict execution: the execution settings of the configuration
+        :param str mode: the execution mode, one of EXECUTION_MODES
+        """
+        fail_fast = execution.get('fail_fast', False)
+        order = execution.get('order', ORDER_ADAPTIVE if fail_fast else ORDER_CONFIG)
+        deadline = execution.get('deadline')
+        if deadline is not None:
+            deadline = time.monotonic() + deadline
+
+        configs = list(self.config.check_configs.values())
+        history = None
+        if order == ORDER_ADAPTIVE:
+            history = self._get_history()
+            configs = history.sort(configs)
+
+        timed = deadline is not None or any(x.timeout for x in configs)
+        if mode == EXECUTION_SERIAL and (not timed or _can_interrupt()):
+            results = self._run_serial(configs, fail_fast, deadline)
+        else:
+            results = self._run_parallel(
+                configs, mode, execution.get('workers'), fail_fast, deadline
+            )
+
+        if history is not None:
+            for result in results:
+                if result is not None:
+                    history.record(
+                        result.config.check_type, result.duration, not result.success
+                    )
+            history.save()
+
+        executed = dict(zip(configs, results))
+        if execution.get('keep_report_order', True):
+            configs = list(self.config.check_configs.values())
+        for config in configs:
+            result = executed[config]
+            if result is None:
+                self.results.skip(config)
+            else:
+                self.results.add(result)
+
+    def _get_history(self) -> CheckHistory:
+        """Return the statistics of previous runs, loading them if necessary.
+
+        :rtype: CheckHistory
+        """
+        if self._history is None:
+            path = self.config.execution.get('history_file')
+            key = get_config_key(list(self.config.check_configs.values()))
+            self._history = CheckHistory.load(path or get_default_history_path(), key)
+        return self._history
+
+    def _run_serial(
+        self,
+        configs: List[CheckConfig],
+        fail_fast: bool,
+        deadline: Union[float, None] = None,
+    ) -> List[Union[CheckResult, None]]:
+        """Execute the checks of the given configurations one by one,
+        in the current thread.
+
+        A check that runs longer than its timeout or the deadline is
+        interrupted with SIGALRM (see `_can_interrupt()`), which also stops
+        the regex engine in the middle of a match, and gets a timeout result.
+        No check starts after the deadline.
+
+        :param list configs: the configurations of the checks to run
+        :param bool fail_fast: if True, the checks after the first blocking
+            failure do not run
+        :param float deadline: the time (as returned by `time.monotonic()`)
+            when all checks need to have finished, or None
+        :return: the results of the checks, in the same order as the
+            configurations, with None for each check that was skipped
+        :rtype: list
+        """
+        results: List[Union[CheckResult, None]] = [None] * len(configs)
+        for index, config in enumerate(configs):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            if self._hooks:
+                self._hooks.emit(EVENT_CHECK_START, config=config)
+            started = time.monotonic()
+            expiration = _get_expiration(config, started, deadline)
+            if expiration is None:
+                result = self._run_check(config, self._check_factory)
+            else:
+                result = None
+                try:
+                    with _time_limit(expiration - started):
+                        result = self._run_check(config, self._check_factory)
+                except _CheckInterrupted:
+                    # The alarm can go off after the check has finished,
+                    # before the timer is disarmed
+                    if result is None:
+                        result = _get_timeout_result(config, expiration - started)
+            results[index] = result
+            if self._hooks:
+                self._hooks.emit(EVENT_CHECK_END, config=config, result=result)
+            if fail_fast and _is_blocking(result):
+                break
+        return results
+
+    def _run_parallel(
+        self,
+        configs: List[CheckConfig],
+        mode: str,
+        workers: Union[int, None],
+        fail_fast: bool,
+        deadline: Union[float, None],
+    ) -> List[Union[CheckResult, None]]:
+        """Execute the checks of the given configurations in worker threads
+        or processes, so that the suite never blocks on a single check.
+
+        Only as many checks as can run at the same time are submitted, so that
+        no new check starts after a blocking failure in fail-fast mode, or
+        after the deadline. A check that runs longer than its timeout
+        or the deadline gets a timeout result and is abandoned; since
+        threads are daemons, it cannot keep the application from exiting,
+        and worker processes are terminated at the end.
+        An abandoned thread cannot be interrupted, though, and the time
+        budget of patterns is not enforced in it (see `RegexEngine`),
+        so serial checks with a timeout only run here if they cannot
+        be interrupted in the current thread.
+
+        Any error that happens while dispatching a check (e.g. if its
+        configuration cannot be sent to another process) is turned
+        into an error result for that check only.
+
+        :param list configs: the configurations of the checks to run
+        :param str mode: the execution mode; in EXECUTION_SERIAL mode
+            only one check runs at a time
+        :param int workers: the maximum number of checks that can run
+            at the same time; if None, it depends on the number of processors
+        :param bool fail_fast: if True, no check starts after the first
+            blocking failure
+        :param float deadline: the time (as returned by `time.monotonic()`)
+            when all checks need to have finished, or None
+        :return: the results of the checks, in the same order as the
+            configurations, with None for each check that was skipped
+        :rtype: list
+        """
+        if mode == EXECUTION_SERIAL:
+            workers = 1
+        elif not workers:
+            workers = os.cpu_count() or 1
+        executor = self._create_executor(mode, min(workers, len(configs)) or 1)
+
+        results: List[Union[CheckResult, None]] = [None] * len(configs)
+        pending: Dict[Future, Tuple[int, float]] = {}
+        next_index = 0
+        stopped = timed_out = False
+        while pending or (not stopped and next_index < len(configs)):
+            while not stopped and next_index < len(configs) and len(pending) < workers:
+                if deadline is not None and time.monotonic() >= deadline:
+                    stopped = True
+                    break
+                if self._hooks:
+                    self._hooks.emit(EVENT_CHECK_START, config=configs[next_index])
+                # The check may run before `submit()` returns
+                started = time.monotonic()
+                future = self._submit(executor, configs[next_index])
+                pending[future] = (next_index, started)
+                next_index += 1
+            if not pending:
+                break
+
+            expirations = [
+                _get_expiration(configs[index], started, deadline)
+                for index, started in pending.values()
+            ]
+            expirations = [x for x in expirations if x is not None]
+            timeout = None
+            if expirations:
+                timeout = max(0, min(expirations) - time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index, _ = pending.pop(future)
+                results[index] = _get_future_result(future, configs[index])
+                if self._hooks:
+                    self._hooks.emit(
+                        EVENT_CHECK_END, config=configs[index], result=results[index]
+                    )
+                if fail_fast and _is_blocking(results[index]):
+                    stopped = True
+
+            now = time.monotonic()
+            for future, (index, started) in list(pending.items()):
+                config = configs[index]
+                expiration = _get_expiration(config, started, deadline)
+                if expiration is not None and now >= expiration:
+                    del pending[future]
+                    results[index] = _get_timeout_result(config, now - started)
+                    timed_out = True
+                    if self._hooks:
+                        self._hooks.emit(
+                            EVENT_CHECK_END, config=config, result=results[index]
+                        )
+                    if fail_fast and _is_blocking(results[index]):
+                        stopped = True
+
+        # Do not wait for any abandoned checks; worker processes are stopped
+        executor.shutdown(wait=not timed_out)
+        return results
+
+    def _create_executor(self, mode: str, workers: int) -> Executor:
+        """Create an executor that runs checks in the background.
+
+        :param str mode: the execution mode, one of EXECUTION_MODES
+        :param int workers: the maximum number of checks that can run
+            at the same time
+        :return: the new executor
+        :rtype: Executor
+        """
+        if mode == EXECUTION_PROCESSES:
+            return _ProcessPoolExecutor(workers)
+        return _DaemonThreadExecutor()
+
+    def _submit(self, executor: Executor, config: CheckConfig) -> Future:
+        """Submit the check of the given configuration to the given executor.
+
+        :param Executor executor: the executor to submit the check to
+        :param CheckConfig config: the configuration of the check
+        :return: the future of the result of the check
+        :rtype: Future
+        """
+        return executor.submit(
+            _execute_check, config, self._check_factory, self._content_provider_factory
+        )
 
     def _run_check(self, config: CheckConfig, factory: CheckFactory) -> CheckResult:
         """Execute a check for the given configuration.
@@ -60,30 +364,277 @@ class CheckSuite:
         :return: the result of the check
         :rtype: CheckResult
         """
-        # For every configuration object a proper content provider
-        # is created and then given to a check object that knows
-        # what to test
-        check = factory.create(config)
-        if not check:
+        return _execute_check(config, factory, self._content_provider_factory)
+
+
+def _execute_check(
+    config: CheckConfig,
+    factory: CheckFactory,
+    content_provider_factory: BaseGitContentProviderFactory,
+) -> CheckResult:
+    """Execute a check for the given configuration.
+
+    Any exception is caught and turned into an error result, so that
+    a failing check never affects the rest. This is a module-level function
+    so that it can also be sent to other processes.
+
+    :param CheckConfig config: the configuration of the check
+    :param CheckFactory factory: the factory to use to create checks
+    :param BaseGitContentProviderFactory content_provider_factory: the factory
+        to use to create the content provider of the check
+    :return: the result of the check
+    :rtype: CheckResult
+    """
+    # For every configuration object a proper content provider
+    # is created and then given to a check object that knows
+    # what to test
+    check = factory.create(config)
+    if not check:
+        msg = (
+            'Check with type "{}" could not be created. '
+            'Make sure that CheckFactory knows how to create it'
+        ).format(config.check_type)
+        return CheckResult(config, STATUS_ERROR, ERROR_GENERIC, message=msg)
+
+    with span('totem.check', {'totem.check.type': config.check_type}):
+        start = time.monotonic()
+        result = _create_result(config, check, content_provider_factory)
+        result.duration = time.monotonic() - start
+        set_attributes({'totem.check.status': result.status})
+    return result
+
+
+def _create_result(
+    config: CheckConfig,
+    check: Check,
+    content_provider_factory: BaseGitContentProviderFactory,
+) -> CheckResult:
+    """Fetch the content of the given check and run it.
+
+    :param CheckConfig config: the configuration of the check
+    :param Check check: the check to run
+    :param BaseGitContentProviderFactory content_provider_factory: the factory
+        to use to create the content provider of the check
+    :return: the result of the check
+    :rtype: CheckResult
+    """
+    try:
+        content_provider = content_provider_factory.create(check)
+        if not content_provider:
+            factory_type = type(content_provider_factory)
             msg = (
-                'Check with type "{}" could not be created. '
-                'Make sure that CheckFactory knows how to create it'
-            ).format(config.check_type)
-            return CheckResult(config, STATUS_ERROR, ERROR_GENERIC, message=msg)
+                'Content provider could not be created for check "{}". '
+                'Make sure that {}.{} knows how to create it'
+            ).format(check.check_type, factory_type.__module__, factory_type.__name__)
 
-        try:
-            content_provider = self._content_provider_factory.create(check)
-            if not content_provider:
-                factory_type = type(self._content_provider_factory)
-                msg = (
-                    'Content provider could not be created for check "{}". '
-                    'Make sure that {}.{} knows how to create it'
-                ).format(
-                    check.check_type, factory_type.__module__, factory_type.__name__
-                )
-
-                return CheckResult(config, STATUS_ERROR, ERROR_GENERIC, message=msg)
+            return CheckResult(config, STATUS_ERROR, ERROR_GENERIC, message=msg)
+        with measure(STAGE_FETCH, type(content_provider).__name__):
             content = content_provider.get_content()
+            if 'commits' in content:
+                set_attributes({'totem.commits.count': len(content['commits'])})
+        # A single time budget covers all pattern evaluations of the check
+        with measure(STAGE_CHECK, check.check_type), config.regex_engine.budget():
             return check.run(content)
-        except Exception as e:
-            return CheckResult(config, STATUS_ERROR, ERROR_GENERIC, message=str(e))
+    except _CheckInterrupted:
+        raise
+    except Exception as e:
+        return CheckResult(config, STATUS_ERROR, ERROR_GENERIC, message=str(e))
+
+
+class _CheckInterrupted(Exception):
+    """Raised in a check that exceeded its time limit, to interrupt it."""
+
+
+def _can_interrupt() -> bool:
+    """Return True if checks that run in the current thread can be
+    interrupted when they exceed their time limit.
+
+    This relies on SIGALRM, which is only available on some platforms
+    and is always handled in the main thread.
+
+    :rtype: bool
+    """
+    return (
+        hasattr(signal, 'setitimer')
+        and threading.current_thread() is threading.main_thread()
+    )
+
+
+@contextmanager
+def _time_limit(seconds: float):
+    """Raise a _CheckInterrupted if the enclosed code takes longer than
+    the given time.
+
+    Needs to be called only if `_can_interrupt()` returns True.
+
+    :param float seconds: the time limit
+    """
+
+    armed = True
+
+    def handler(signum, frame):
+        # An alarm that goes off while the timer is being disarmed
+        # must not interrupt the cleanup
+        if armed:
+            raise _CheckInterrupted()
+
+    previous_handler = signal.signal(signal.SIGALRM, handler)
+    # A zero delay would disable the timer instead of expiring immediately
+    signal.setitimer(signal.ITIMER_REAL, max(seconds, 1e-6))
+    try:
+        yield
+    finally:
+        armed = False
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+class _DaemonThreadExecutor(Executor):
+    """An executor that runs each submitted call in a new daemon thread.
+
+    Unlike ThreadPoolExecutor, it never waits for running calls when
+    the application exits, so a check that hangs cannot block it.
+    The number of calls that run at the same time is controlled
+    by the caller.
+    """
+
+    def __init__(self):
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        # Spans started in the thread are nested under the current one
+        thread = threading.Thread(
+            target=_run_future,
+            args=(future, propagate_context(fn), args, kwargs),
+            daemon=True,
+        )
+        thread.start()
+        self._threads.append(thread)
+        return future
+
+    def shutdown(self, wait: bool = True, **kwargs):
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+class _ProcessPoolExecutor(Executor):
+    """An executor that runs each submitted call in a pool of worker
+    processes, which it owns.
+
+    Unlike ProcessPoolExecutor, it can stop its workers without waiting
+    for running calls, so a check that hangs does not keep a worker
+    (or the application) alive. Other child processes of the application
+    are not affected.
+    """
+
+    def __init__(self, workers: int):
+        """Constructor.
+
+        :param int workers: the number of worker processes
+        """
+        # Imported here, because multiprocessing is expensive to import
+        import multiprocessing
+
+        self._pool = multiprocessing.Pool(workers)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        # Errors while sending the call to a worker (e.g. if it cannot
+        # be pickled) are also set on the future
+        self._pool.apply_async(
+            fn,
+            args,
+            kwargs,
+            callback=future.set_result,
+            error_callback=future.set_exception,
+        )
+        return future
+
+    def shutdown(self, wait: bool = True, **kwargs):
+        if wait:
+            self._pool.close()
+            self._pool.join()
+        else:
+            self._pool.terminate()
+
+
+def _run_future(future: Future, fn, args: tuple, kwargs: dict):
+    """Call the given function and set its result on the given future.
+
+    :param Future future: the future to set the result or exception on
+    :param callable fn: the function to call
+    :param tuple args: the positional arguments of the call
+    :param dict kwargs: the keyword arguments of the call
+    """
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        future.set_result(result)
+
+
+def _get_expiration(
+    config: CheckConfig, started: float, deadline: Union[float, None]
+) -> Union[float, None]:
+    """Return the time when the check of the given configuration times out.
+
+    :param CheckConfig config: the configuration of the check
+    :param float started: the time the check started
+    :param float deadline: the time when all checks need to have finished,
+        or None
+    :return: the earliest of the check timeout and the deadline,
+        or None if there is no limit
+    :rtype: float
+    """
+    expiration = started + config.timeout if config.timeout else None
+    if deadline is not None and (expiration is None or deadline < expiration):
+        return deadline
+    return expiration
+
+
+def _get_timeout_result(config: CheckConfig, duration: float) -> CheckResult:
+    """Return the result of a check that did not finish in time.
+
+    :param CheckConfig config: the configuration of the check
+    :param float duration: the time in seconds the check was allowed to run
+    :rtype: CheckResult
+    """
+    result = CheckResult(
+        config,
+        STATUS_TIMEOUT,
+        ERROR_TIMEOUT,
+        message='Check did not finish after {:.1f} seconds'.format(duration),
+    )
+    result.duration = duration
+    return result
+
+
+def _get_future_result(future: Future, config: CheckConfig) -> CheckResult:
+    """Wait for the given future and return the result of its check.
+
+    :param Future future: the future of a check that was submitted to an executor
+    :param CheckConfig config: the configuration of the check
+    :return: the result of the check, or an error result if the check
+        could not be executed
+    :rtype: CheckResult
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        return CheckResult(config, STATUS_ERROR, ERROR_GENERIC, message=str(e))
+
+
+def _is_blocking(result: CheckResult) -> bool:
+    """Return True if the given result should stop the execution
+    of the remaining checks in fail-fast mode.
+
+    :param CheckResult result: the result of a check
+    :rtype: bool
+    """
+    return not result.success and result.failure_level == FAILURE_LEVEL_ERROR
@@ -0,0 +1,508 @@
+"""Contains a daemon that runs checks in a warm process, and its client.
+
+Every invocation of totem (e.g. from a Git hook) pays the startup cost
+of the interpreter, along with importing GitPython and all other dependencies.
+The daemon is a long-running process per user that has already paid
+that cost and keeps compiled configs and repository handles in memory.
+It listens on a Unix socket for requests.
+
+The client is deliberately minimal, so that it is cheap to import:
+it forwards the arguments, the working directory, the Git-related
+environment variables and the standard input of the invocation
+to the daemon, and prints the output it gets back. If the daemon is not
+running, the invocation runs in-process as usual.
+
+The standard input is forwarded as a file descriptor, instead of being read
+by the client, so that it is only read if the invocation needs it
+(e.g. a pre-push hook) and it is still available if the invocation
+ends up running in-process.
+
+Only local modes are supported by the daemon; PR checks always run in-process.
+
+The protocol is a single JSON document per connection in each direction:
+the client sends the request, along with the file descriptor of its standard
+input as ancillary data, and closes its side for writing, then the daemon
+sends the response and closes the connection.
+"""
+
+import json
+import os
+import socket
+import sys
+from typing import Callable, List, Sequence, TextIO, Tuple, Union
+
+from totem.paths import get_cache_dir
+
+DEFAULT_IDLE_TIMEOUT = 30 * 60  # seconds
+
+# Environment variables with these prefixes are forwarded to the daemon,
+# e.g. GIT_INDEX_FILE, which Git sets for hooks of partial commits
+FORWARDED_ENV_PREFIXES = ('GIT_', 'TOTEM_')
+
+# Options of the CLI that require running in-process; memory is traced
+# in a new process, since the daemon keeps the caches of previous runs,
+# and code is profiled without the other threads of the daemon
+_IN_PROCESS_OPTIONS = (
+    '-p',
+    '--pr-url',
+    '--help',
+    '--trace-memory',
+    '--trace-memory-json',
+    '--profile-output',
+)
+
+_CHUNK_SIZE = 65536
+
+# The maximum number of file descriptors a request can pass
+_MAX_FDS = 1
+
+
+def get_socket_path() -> str:
+    """Return the path of the Unix socket of the daemon of the current user.
+
+    It is $TOTEM_DAEMON_SOCKET if defined, otherwise `daemon.sock`
+    inside the cache directory of totem.
+
+    :rtype: str
+    """
+    path = os.environ.get('TOTEM_DAEMON_SOCKET')
+    if path:
+        return path
+    return os.path.join(get_cache_dir(), 'daemon.sock')
+
+
+def can_run_in_daemon(argv: List[str]) -> bool:
+    """Return True if an invocation with the given arguments can be served
+    by the daemon.
+
+    :param list argv: the command line arguments, without the program name
+    :rtype: bool
+    """
+    for arg in argv:
+        if arg.split('=', 1)[0] in _IN_PROCESS_OPTIONS:
+            return False
+    return True
+
+
+def run_in_daemon(argv: List[str], socket_path: str = None) -> Union[int, None]:
+    """Send the given invocation to the daemon, if it is running,
+    and print its output.
+
+    :param list argv: the command line arguments, without the program name
+    :param str socket_path: the path of the socket of the daemon;
+        if None, the default one is used
+    :return: the exit code of the invocation, or None if the daemon
+        did not handle it, in which case it needs to run in-process
+    :rtype: int
+    """
+    sock = _connect(socket_path)
+    if sock is None:
+        return None
+
+    stdin_fd = _get_stdin_fd()
+    request = {
+        'argv': argv,
+        'cwd': os.getcwd(),
+        'env': {
+            key: value
+            for key, value in os.environ.items()
+            if key.startswith(FORWARDED_ENV_PREFIXES)
+        },
+        'stdin': stdin_fd is not None,
+    }
+    response = _exchange(sock, request, fds=[stdin_fd] if stdin_fd is not None else [])
+    if response is None or 'exit_code' not in response:
+        return None
+
+    sys.stdout.write(response.get('stdout', ''))
+    sys.stdout.flush()
+    sys.stderr.write(response.get('stderr', ''))
+    sys.stderr.flush()
+    return response['exit_code']
+
+
+def send_request(request: dict, socket_path: str = None) -> Union[dict, None]:
+    """Send the given request to the daemon and return its response.
+
+    :param dict request: the request to send
+    :param str socket_path: the path of the socket of the daemon;
+        if None, the default one is used
+    :return: the response, or None if the daemon is not running
+        or the communication failed
+    :rtype: dict
+    """
+    sock = _connect(socket_path)
+    if sock is None:
+        return None
+    return _exchange(sock, request)
+
+
+def _connect(socket_path: str = None) -> Union[socket.socket, None]:
+    """Connect to the daemon.
+
+    :param str socket_path: the path of the socket of the daemon;
+        if None, the default one is used
+    :return: the connected socket, or None if the daemon is not running
+    :rtype: socket.socket
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path or get_socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _exchange(
+    sock: socket.socket, request: dict, fds: Sequence[int] = ()
+) -> Union[dict, None]:
+    """Send the given request over the given socket and return the response.
+
+    Closes the socket in all cases.
+
+    :param socket.socket sock: a socket connected to the daemon
+    :param dict request: the request to send
+    :param list fds: file descriptors to pass to the daemon along with
+        the request; they remain open in this process
+    :return: the response, or None if the communication failed
+    :rtype: dict
+    """
+    payload = json.dumps(request).encode('utf-8')
+    try:
+        if fds:
+            import array
+
+            # The descriptors are attached to the first part of the request
+            sent = sock.sendmsg(
+                [payload],
+                [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))],
+            )
+            payload = payload[sent:]
+        sock.sendall(payload)
+        sock.shutdown(socket.SHUT_WR)
+        return json.loads(_receive_all(sock).decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+
+def _receive_all(sock: socket.socket) -> bytes:
+    """Read from the given socket until the other side closes it.
+
+    :param socket.socket sock: a connected socket
+    :rtype: bytes
+    """
+    chunks = []
+    while True:
+        chunk = sock.recv(_CHUNK_SIZE)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def _receive_request(sock: socket.socket) -> Tuple[bytes, List[int]]:
+    """Read a request from the given socket until the other side closes it,
+    along with any file descriptors passed with it.
+
+    :param socket.socket sock: a connected socket
+    :return: the request and the received file descriptors, which
+        the caller needs to close
+    :rtype: tuple
+    """
+    import array
+
+    fds = array.array('i')
+    chunks = []
+    while True:
+        chunk, ancdata, _, _ = sock.recvmsg(
+            _CHUNK_SIZE, socket.CMSG_SPACE(_MAX_FDS * fds.itemsize)
+        )
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds.frombytes(data[: len(data) - len(data) % fds.itemsize])
+        if not chunk:
+            return b''.join(chunks), list(fds)
+        chunks.append(chunk)
+
+
+def _get_stdin_fd() -> Union[int, None]:
+    """Return the file descriptor of the standard input, unless it is
+    a terminal or it has no descriptor.
+
+    Some hooks (e.g. pre-push) provide information on the standard input.
+    Git connects the standard input of all other hooks to /dev/null.
+
+    :rtype: int
+    """
+    stdin = sys.stdin
+    try:
+        if stdin is None or stdin.isatty():
+            return None
+        return stdin.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def run_cli(argv: List[str]) -> int:
+    """Run the CLI with the given arguments in the current process.
+
+    :param list argv: the command line arguments, without the program name
+    :return: the exit code
+    :rtype: int
+    """
+    import cli
+
+    try:
+        cli.main(args=argv, prog_name='totem')
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    return 0
+
+
+class DaemonServer:
+    """Serves invocations of totem, one at a time, over a Unix socket.
+
+    Requests are handled sequentially, because each of them changes
+    process-wide state (the working directory, the environment
+    and the standard streams) while it runs.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        runner: Callable[[List[str]], int] = run_cli,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        """Constructor.
+
+        :param str socket_path: the path of the Unix socket to listen on
+        :param callable runner: the function that runs an invocation,
+            given its arguments, and returns the exit code
+        :param float idle_timeout: the daemon stops after this many seconds
+            without any request; if 0, it never stops on its own
+        """
+        self.socket_path = socket_path
+        self.runner = runner
+        self.idle_timeout = idle_timeout
+        self._socket: Union[socket.socket, None] = None
+        self._stopped = False
+
+    def start(self):
+        """Start listening on the socket.
+
+        :raise RuntimeError: if another daemon is already listening on it
+        """
+        if send_request({'command': 'ping'}, self.socket_path) is not None:
+            raise RuntimeError(
+                'A daemon is already running on "{}"'.format(self.socket_path)
+            )
+        # A socket file without a daemon is left over from a daemon that crashed
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+
+        # Make sure that only the current user can connect
+        previous_umask = os.umask(0o177)
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(self.socket_path)
+        finally:
+            os.umask(previous_umask)
+        sock.listen(16)
+        sock.settimeout(self.idle_timeout or None)
+        self._socket = sock
+
+    def serve_forever(self):
+        """Handle requests until the daemon is stopped or stays idle
+        for too long."""
+        try:
+            while not self._stopped:
+                try:
+                    connection, _ = self._socket.accept()
+                except socket.timeout:
+                    break
+                with connection:
+                    connection.settimeout(None)
+                    self._handle_connection(connection)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop listening and remove the socket file."""
+        self._stopped = True
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+    def _handle_connection(self, connection: socket.socket):
+        """Read a request from the given connection and send the response.
+
+        :param socket.socket connection: the connection to a client
+        """
+        stdin = None
+        try:
+            content, fds = _receive_request(connection)
+            # Only the standard input of the client is expected
+            for fd in fds[1:]:
+                os.close(fd)
+            if fds:
+                stdin = os.fdopen(fds[0], 'r')
+            request = json.loads(content.decode('utf-8'))
+            response = self.handle_request(request, stdin=stdin)
+        except Exception as e:
+            response = {'error': str(e)}
+        finally:
+            if stdin is not None:
+                stdin.close()
+        try:
+            connection.sendall(json.dumps(response).encode('utf-8'))
+        except OSError:
+            pass
+
+    def handle_request(self, request: dict, stdin: TextIO = None) -> dict:
+        """Handle the given request and return the response.
+
+        :param dict request: the request, as sent by the client
+        :param file stdin: the standard input of the client, if it passed it
+        :return: the response; for invocations, it contains the exit code
+            and the output
+        :rtype: dict
+        """
+        command = request.get('command', 'run')
+        if command == 'ping':
+            return {'pid': os.getpid()}
+        if command == 'stop':
+            self._stopped = True
+            return {'pid': os.getpid()}
+        if command != 'run':
+            return {'error': 'Unknown command: "{}"'.format(command)}
+
+        argv = request.get('argv', [])
+        if not can_run_in_daemon(argv):
+            return {'error': 'The arguments need to run in-process'}
+        return self._run(request, stdin)
+
+    def _run(self, request: dict, stdin: TextIO = None) -> dict:
+        """Run an invocation in the context of the client, i.e. with its
+        working directory, environment variables and standard input.
+
+        :param dict request: the request of the invocation
+        :param file stdin: the standard input of the client; if None,
+            the invocation has an empty standard input
+        :return: the response
+        :rtype: dict
+        """
+        import io
+        from contextlib import redirect_stderr, redirect_stdout
+
+        from totem.checks.content import clear_content_caches
+
+        previous_cwd = os.getcwd()
+        previous_env = dict(os.environ)
+        previous_stdin = sys.stdin
+        stdout, stderr = io.StringIO(), io.StringIO()
+        try:
+            # Variables of previous invocations must not leak into this one
+            for key in list(os.environ):
+                if key.startswith(FORWARDED_ENV_PREFIXES):
+                    del os.environ[key]
+            os.environ.update(request.get('env') or {})
+            if request.get('cwd'):
+                os.chdir(request['cwd'])
+            sys.stdin = stdin if stdin is not None else io.StringIO()
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    exit_code = self.runner(request.get('argv', []))
+                except Exception:
+                    import traceback
+
+                    traceback.print_exc()
+                    exit_code = 1
+        finally:
+            sys.stdin = previous_stdin
+            os.chdir(previous_cwd)
+            os.environ.clear()
+            os.environ.update(previous_env)
+            clear_content_caches()
+
+        return {
+            'exit_code': exit_code,
+            'stdout': stdout.getvalue(),
+            'stderr': stderr.getvalue(),
+        }
+
+
+def daemon_main(argv: List[str]) -> int:
+    """Handle the `totem daemon` subcommand.
+
+    :param list argv: the arguments after `daemon`
+    :return: the exit code
+    :rtype: int
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='totem daemon',
+        description='Run checks of local modes in a warm background process.',
+    )
+    parser.add_argument(
+        'action',
+        nargs='?',
+        default='start',
+        choices=('start', 'stop', 'status'),
+        help='start the daemon in the foreground (default), '
+        'stop a running daemon or show if it is running',
+    )
+    parser.add_argument('--socket', help='the path of the Unix socket')
+    parser.add_argument(
+        '--idle-timeout',
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help='stop after this many seconds without requests (0: never)',
+    )
+    args = parser.parse_args(argv)
+    socket_path = args.socket or get_socket_path()
+
+    if args.action in ('stop', 'status'):
+        command = 'stop' if args.action == 'stop' else 'ping'
+        response = send_request({'command': command}, socket_path)
+        if response is None:
+            print('The daemon is not running')
+            return 1
+        print(
+            'The daemon (pid {}) {}'.format(
+                response.get('pid'),
+                'was stopped' if args.action == 'stop' else 'is running',
+            )
+        )
+        return 0
+
+    server = DaemonServer(socket_path, idle_timeout=args.idle_timeout)
+    try:
+        server.start()
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    # Pay the import cost once, before the first request
+    import cli  # noqa: F401
+    import totem.git.content  # noqa: F401
+
+    print('Listening on "{}"'.format(socket_path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,90 @@
+"""This module contains code that deals with local Git repositories."""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+from git import Repo
+
+# The maximum number of Repo objects to keep per thread
+MAX_CACHED_REPOS = 32
+
+# The environment variables that define where the repository is,
+# which are read when a Repo object is created
+REPO_ENV_VARIABLES = (
+    'GIT_DIR',
+    'GIT_WORK_TREE',
+    'GIT_COMMON_DIR',
+    'GIT_INDEX_FILE',
+    'GIT_OBJECT_DIRECTORY',
+    'GIT_ALTERNATE_OBJECT_DIRECTORIES',
+    'GIT_CEILING_DIRECTORIES',
+    'GIT_DISCOVERY_ACROSS_FILESYSTEM',
+)
+
+
+# The cached Repo objects of each thread
+_local = threading.local()
+
+
+def get_repo(path: str) -> Repo:
+    """Return a Repo object for the Git repository at the given path.
+
+    Caches the object, so that the repository is only opened once
+    for the lifetime of the thread, e.g. in the sequential loop
+    of the daemon. The cache is keyed on the environment variables that define
+    where the repository is (e.g. GIT_DIR in a hook of a worktree), so an object
+    is only reused in the same environment. Git commands always run with
+    the current environment.
+
+    The objects are not shared between threads, because they keep
+    long-running `git cat-file` processes, which cannot serve multiple
+    threads at the same time (e.g. in the `threads` execution mode).
+
+    :param str path: the path of the repository
+    :rtype: git.Repo
+    """
+    repos = _get_thread_repos()
+    key = (path, _get_repo_env())
+    repo = repos.get(key)
+    if repo is not None:
+        repos.move_to_end(key)
+        return repo
+
+    repo = repos[key] = Repo(path)
+    if len(repos) > MAX_CACHED_REPOS:
+        _, oldest = repos.popitem(last=False)
+        oldest.close()
+    return repo
+
+
+def clear_repo_cache():
+    """Close and forget the cached Repo objects of the current thread."""
+    repos = _get_thread_repos()
+    while repos:
+        _, repo = repos.popitem()
+        repo.close()
+
+
+def _get_thread_repos() -> 'OrderedDict[tuple, Repo]':
+    """Return the cached Repo objects of the current thread,
+    keyed on their path and the environment they were created in.
+
+    :rtype: OrderedDict
+    """
+    repos = getattr(_local, 'repos', None)
+    if repos is None:
+        repos = _local.repos = OrderedDict()
+    return repos
+
+
+def _get_repo_env() -> Tuple[Tuple[str, str], ...]:
+    """Return the values of REPO_ENV_VARIABLES that are currently defined.
+
+    :return: (name, value) pairs
+    :rtype: tuple
+    """
+    return tuple(
+        (name, os.environ[name]) for name in REPO_ENV_VARIABLES if name in os.environ
+    )
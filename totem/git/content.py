@@ -3,10 +3,11 @@ import re
 from functools import lru_cache
 from typing import Type, Union
 
-from git import Repo
 from totem.checks.checks import TYPE_BRANCH_NAME, TYPE_COMMIT_MESSAGE
 from totem.checks.content import BaseContentProvider, BaseGitContentProviderFactory
 from totem.checks.core import Check
+from totem.checks.records import CommitInfo
+from totem.git import get_repo
 
 
 class BranchContentProvider(BaseContentProvider):
@@ -18,7 +19,7 @@ class BranchContentProvider(BaseContentProvider):
             {'branch': <branch_name>}
         :rtype: dict
         """
-        repo = Repo(os.getcwd())
+        repo = get_repo(os.getcwd())
         if repo.head.is_detached:
             branch_name = None
         else:
@@ -33,7 +34,8 @@ class CommitsContentProvider(BaseContentProvider):
         """Return a dictionary that contains information about all commits
         of the current branch (max 50).
 
-        :return: the information in a dictionary format as follows:
+        :return: the information in a dictionary format as follows
+            (each commit is a CommitInfo object, shown here in its dictionary form):
             {
               'commits': [
                 {
@@ -53,7 +55,7 @@ class CommitsContentProvider(BaseContentProvider):
             }
         :rtype: dict
         """
-        repo = Repo(os.getcwd())
+        repo = get_repo(os.getcwd())
         if repo.head.is_detached:
             branch_name = repo.head.commit.hexsha
         else:
@@ -68,20 +70,29 @@ class CommitsContentProvider(BaseContentProvider):
 
         return {
             'commits': [
-                {
-                    'message': commit.message,
-                    'sha': commit.hexsha,
-                    'url': '',
-                    'stats': {
-                        'additions': commit.stats.total['insertions'],
-                        'deletions': commit.stats.total['deletions'],
-                        'total': commit.stats.total['lines'],
-                    },
-                }
+                CommitsContentProvider._create_commit_info(commit)
                 for commit in commits
             ]
         }
 
+    @staticmethod
+    def _create_commit_info(commit) -> CommitInfo:
+        """Return the information of the given commit.
+
+        :param git.Commit commit: the commit object
+        :rtype: CommitInfo
+        """
+        # Calculating the statistics requires a Git call, so only do it once
+        stats = commit.stats.total
+        return CommitInfo(
+            commit.message,
+            sha=commit.hexsha,
+            url='',
+            additions=stats['insertions'],
+            deletions=stats['deletions'],
+            total=stats['lines'],
+        )
+
 
 class GitContentProviderFactory(BaseGitContentProviderFactory):
     """Responsible for creating the proper content provider for every type of check,
@@ -128,7 +139,7 @@ class PreCommitBranchContentProvider(BaseContentProvider):
             {'branch': <branch_name>}
         :rtype: dict
         """
-        repo = Repo(os.getcwd())
+        repo = get_repo(os.getcwd())
         branch_name = repo.head.ref.name
         return {'branch': branch_name}
 
@@ -139,7 +150,8 @@ class PreCommitCommitsContentProvider(BaseContentProvider):
         """Return a dictionary that contains information about
         the pending commit of the current branch.
 
-        :return: the information in a dictionary format as follows:
+        :return: the information in a dictionary format as follows
+            (each commit is a CommitInfo object, shown here in its dictionary form):
             {
               'commits': [
                 {
@@ -156,7 +168,7 @@ class PreCommitCommitsContentProvider(BaseContentProvider):
             }
         :rtype: dict
         """
-        repo = Repo(os.getcwd())
+        repo = get_repo(os.getcwd())
         git_dir = repo.git_dir
 
         # Find the pending commit message
@@ -179,16 +191,14 @@ class PreCommitCommitsContentProvider(BaseContentProvider):
 
         return {
             'commits': [
-                {
-                    'message': content,
-                    'sha': '',
-                    'url': '',
-                    'stats': {
-                        'additions': insertions,
-                        'deletions': deletions,
-                        'total': insertions + deletions,
-                    },
-                }
+                CommitInfo(
+                    content,
+                    sha='',
+                    url='',
+                    additions=insertions,
+                    deletions=deletions,
+                    total=insertions + deletions,
+                )
             ]
         }
 
@@ -2,15 +2,26 @@
 
 from functools import lru_cache
 import os
+from typing import TYPE_CHECKING
 
-from totem.github.wrappers import GithubService
+if TYPE_CHECKING:  # pragma: no cover
+    from totem.github.wrappers import GithubService
 
 
 @lru_cache(maxsize=None)
-def github_service() -> GithubService:
+def github_service() -> 'GithubService':
     """Return a GithubService instance to use for all Github-related calls.
 
     Uses an environment variable to get the access token for authentication.
+    The API can be served from a different URL, e.g. a Github Enterprise
+    installation or a local fake server, via the GITHUB_API_URL variable.
     Caches the object, so that it is used throughout the app.
     """
-    return GithubService(os.environ.get('GITHUB_ACCESS_TOKEN', ''))
+    # Imported here, so that the modules of this package that do not need
+    # PyGithub (e.g. usage) can be imported without it
+    from totem.github.wrappers import GithubService
+
+    return GithubService(
+        os.environ.get('GITHUB_ACCESS_TOKEN', ''),
+        base_url=os.environ.get('GITHUB_API_URL') or None,
+    )
@@ -26,6 +26,7 @@ from totem.checks.content import (
     BaseGitServiceContentProviderFactory,
 )
 from totem.checks.core import Check
+from totem.checks.records import CommitInfo
 from totem.github import github_service
 from totem.reporting.pr import PRCommentReport
 
@@ -134,21 +135,22 @@ class PRCommitsContentProvider(GithubContentProvider):
 
     @lru_cache(maxsize=None)
     def get_content(self) -> dict:
-        """Return a dictionary that contains various information about the commits."""
+        """Return a dictionary that contains various information about the commits.
+
+        Each commit is represented by a CommitInfo object.
+        """
         commits = self.get_pr().get_commits()
 
         return {
             'commits': [
-                {
-                    'message': commit.commit.message,
-                    'sha': commit.sha,
-                    'url': commit.html_url,
-                    'stats': {
-                        'additions': commit.stats.additions,
-                        'deletions': commit.stats.deletions,
-                        'total': commit.stats.total,
-                    },
-                }
+                CommitInfo(
+                    commit.commit.message,
+                    sha=commit.sha,
+                    url=commit.html_url,
+                    additions=commit.stats.additions,
+                    deletions=commit.stats.deletions,
+                    total=commit.stats.total,
+                )
                 for commit in commits
             ]
         }
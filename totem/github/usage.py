@@ -0,0 +1,173 @@
+"""Contains the accounting of the requests made to the Github API.
+
+PyGithub makes requests implicitly, e.g. when accessing lazy attributes
+like `commit.stats` or calling `as_issue()`, so the number of requests
+of a run cannot be known from the code that runs. Instead, every HTTP
+response from the API is observed (see `totem.instrumentation`), counted
+by endpoint and inspected for the rate limit headers of Github.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Union
+from urllib.parse import urlsplit
+
+from totem.instrumentation import observing_responses
+
+# The path segments that are followed by the number of a PR or an issue
+_NUMBERED_SEGMENTS = ('pulls', 'issues')
+
+# The HTTP status of a conditional request that was served from the cache
+# of the client; these do not count against the rate limit
+_STATUS_NOT_MODIFIED = 304
+
+
+class GithubAPIUsage:
+    """Keeps the number of requests to the Github API, per endpoint,
+    and the remaining rate limit before and after them.
+
+    The remaining rate limit before the requests is derived from the first
+    response, so that no extra request is needed.
+    """
+
+    def __init__(self, base_url: str):
+        """Constructor.
+
+        :param str base_url: the URL of the Github API, e.g.
+            'https://api.github.com'; only requests to its host are counted
+        """
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.base_path = parts.path.rstrip('/')
+
+        # The number of requests, with '<method> <endpoint>' as the key,
+        # e.g. 'GET /repos/{owner}/{repo}/pulls/{number}'
+        self.requests: Dict[str, int] = {}
+        self.rate_limit: Union[int, None] = None
+        self.remaining_before: Union[int, None] = None
+        self.remaining_after: Union[int, None] = None
+        self.reset: Union[int, None] = None
+        self._lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        """The total number of requests.
+
+        :rtype: int
+        """
+        return sum(self.requests.values())
+
+    @contextmanager
+    def tracking(self) -> Iterator['GithubAPIUsage']:
+        """Count all requests to the API made during the block.
+
+        :return: this object
+        :rtype: GithubAPIUsage
+        """
+        with observing_responses(self.observe):
+            yield self
+
+    def observe(self, host: str, method: str, path: str, response):
+        """Count the given response, if it comes from the Github API.
+
+        :param str host: the host the request was sent to
+        :param str method: the HTTP method of the request
+        :param str path: the path of the request, without the query
+        :param http.client.HTTPResponse response: the response
+        """
+        if host != self.host:
+            return
+        key = '{} {}'.format(method, get_endpoint(path, self.base_path))
+        limit = _get_int_header(response, 'X-RateLimit-Limit')
+        remaining = _get_int_header(response, 'X-RateLimit-Remaining')
+        reset = _get_int_header(response, 'X-RateLimit-Reset')
+
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if remaining is None:
+                return
+            # Responses can arrive in any order when checks run in parallel
+            before = remaining
+            if response.status != _STATUS_NOT_MODIFIED and remaining < (limit or 0):
+                before += 1
+            if self.remaining_before is None or before > self.remaining_before:
+                self.remaining_before = before
+            if self.remaining_after is None or remaining < self.remaining_after:
+                self.remaining_after = remaining
+            self.rate_limit = limit if limit is not None else self.rate_limit
+            self.reset = reset if reset is not None else self.reset
+
+    def as_data(self) -> dict:
+        """Return the usage in a form that can be serialized as JSON.
+
+        :return: a dictionary like
+            {
+              'total': 3,
+              'requests': {'GET /repos/{owner}/{repo}': 1, ...},
+              'rate_limit': {
+                'limit': 5000, 'remaining_before': 4990,
+                'remaining_after': 4987, 'reset': 1500000000,
+              },
+            }
+            where the values of `rate_limit` are None if Github
+            did not report them
+        :rtype: dict
+        """
+        return {
+            'total': self.total,
+            'requests': dict(sorted(self.requests.items())),
+            'rate_limit': {
+                'limit': self.rate_limit,
+                'remaining_before': self.remaining_before,
+                'remaining_after': self.remaining_after,
+                'reset': self.reset,
+            },
+        }
+
+
+def get_endpoint(path: str, base_path: str = '') -> str:
+    """Return the endpoint of the given path of the Github API,
+    with placeholders for identifiers, so that requests for different
+    objects are grouped together.
+
+    >>> get_endpoint('/repos/owner/repo/pulls/12/commits')
+    '/repos/{owner}/{repo}/pulls/{number}/commits'
+
+    :param str path: the path of a request
+    :param str base_path: the path of the API, e.g. '/api/v3' for
+        Github Enterprise, which is removed from the endpoint
+    :rtype: str
+    """
+    if base_path and path.startswith(base_path + '/'):
+        path = path[len(base_path) :]
+    segments = path.strip('/').split('/')
+    if len(segments) >= 3 and segments[0] == 'repos':
+        segments[1:3] = ['{owner}', '{repo}']
+    for index in range(1, len(segments)):
+        segment = segments[index]
+        previous = segments[index - 1]
+        if previous in _NUMBERED_SEGMENTS and segment.isdigit():
+            segments[index] = '{number}'
+        elif segment.isdigit():
+            segments[index] = '{id}'
+        elif previous == 'commits' and _is_sha(segment):
+            segments[index] = '{sha}'
+    return '/' + '/'.join(segments)
+
+
+def _is_sha(value: str) -> bool:
+    """Return True if the given value looks like the SHA of a commit."""
+    return 7 <= len(value) <= 40 and all(x in '0123456789abcdef' for x in value)
+
+
+def _get_int_header(response, name: str) -> Union[int, None]:
+    """Return the value of the given header as an integer, if it is valid.
+
+    :param http.client.HTTPResponse response: the response
+    :param str name: the name of the header
+    :rtype: int
+    """
+    try:
+        return int(response.getheader(name))
+    except (TypeError, ValueError):
+        return None
@@ -8,6 +8,9 @@ from typing import List
 
 from github.MainClass import Github
 from github.Repository import Repository
+from totem.instrumentation import STAGE_REMOTE, measured
+
+DEFAULT_BASE_URL = 'https://api.github.com'
 
 
 class GithubService:
@@ -15,16 +18,25 @@ class GithubService:
     functionality.
 
     An adapter to the functionality of the PyGithub library.
+    Every call that reaches the Github API is measured (see
+    `totem.instrumentation`); cached results are not.
     """
 
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, base_url: str = None):
         """Constructor.
 
         :param str access_token: the access token to use for connecting
+        :param str base_url: the URL of the Github API;
+            if not given, the public API is used
         """
-        self.client = Github(login_or_token=access_token)
+        self.base_url = base_url or DEFAULT_BASE_URL
+        if base_url:
+            self.client = Github(login_or_token=access_token, base_url=base_url)
+        else:
+            self.client = Github(login_or_token=access_token)
 
     @lru_cache(maxsize=None)
+    @measured(STAGE_REMOTE)
     def get_repo(self, repo_name: str) -> Repository:
         """Return the repository object with the given name.
 
@@ -35,6 +47,7 @@ class GithubService:
         return self.client.get_repo(repo_name)
 
     @lru_cache(maxsize=None)
+    @measured(STAGE_REMOTE)
     def get_pr(self, repo_name: str, pr_num: int):
         """Return the pull request object with the given number.
 
@@ -47,6 +60,7 @@ class GithubService:
         if repo:
             return repo.get_pull(pr_num)
 
+    @measured(STAGE_REMOTE)
     def create_pr_comment(self, repo_name: str, pr_num: int, body: str) -> dict:
         """Create a comment on the pull request with the given info.
 
@@ -61,6 +75,7 @@ class GithubService:
         comment = issue.create_comment(body)
         return {'id': comment.id, 'html_url': comment.html_url}
 
+    @measured(STAGE_REMOTE)
     def get_pr_comments(self, repo_name: str, pr_num: int) -> List[dict]:
         """Return a list of comments on the PR with the given number.
 
@@ -81,6 +96,7 @@ class GithubService:
             for comment in comments
         ]
 
+    @measured(STAGE_REMOTE)
     def delete_pr_comment(self, repo_name: str, pr_num: int, comment_id: int) -> bool:
         """Delete the PR comment with the given id
 
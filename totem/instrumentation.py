@@ -0,0 +1,667 @@
+"""Contains lightweight instrumentation for measuring where totem spends time.
+
+Code that does something worth measuring wraps it in `measure()`:
+
+    with measure(STAGE_FETCH, 'CommitsContentProvider'):
+        content = content_provider.get_content()
+
+Measurements are only kept while a Recorder is active (see `recording()`).
+Otherwise `measure()` returns a shared no-op context manager, so that
+the instrumentation costs next to nothing in normal runs.
+
+While recording, a Recorder can also count the subprocesses that are started
+(e.g. Git commands) and the HTTP requests that are made (e.g. to the Github
+API), by temporarily wrapping `subprocess.Popen` and `http.client`.
+
+While a Tracer is active (see `tracing()`), every measurement, along with
+every subprocess and HTTP request, is also kept as a span of a trace,
+nested under the span that was current when it started. Structural spans
+that are not measurements (e.g. the whole suite) are created with `span()`.
+The current span is kept per thread; use `propagate_context()` for
+functions that run in other threads.
+
+Listeners (see `listening()`) are notified of the start and end
+of every measurement, e.g. for calling the hooks of clients, and
+response observers (see `observing_responses()`) get every HTTP response.
+
+This module is imported on every run, so it should stay cheap to import.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+# The stages of a run
+STAGE_CONFIG = 'config'  # Loading and validating the configuration
+STAGE_FETCH = 'fetch'  # Fetching the content of a check, with a content provider
+STAGE_REMOTE = 'remote'  # Calling a remote service, e.g. the Github API
+STAGE_CHECK = 'check'  # Running a check on its content
+STAGE_REPORT = 'report'  # Rendering and publishing a report
+STAGES = (STAGE_CONFIG, STAGE_FETCH, STAGE_REMOTE, STAGE_CHECK, STAGE_REPORT)
+
+# The kinds of calls that are counted
+CALL_SUBPROCESS = 'subprocess'
+CALL_HTTP = 'http'
+
+# The kinds of spans, with the values of the OpenTelemetry protocol
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+_recorders: List['Recorder'] = []
+_listeners: list = []
+_response_observers: List[Callable] = []
+_tracer: Union['Tracer', None] = None
+_lock = threading.Lock()
+_patches: Dict[str, Tuple[object, str, object]] = {}
+_patch_users = 0
+
+# Keeps the current span of each thread
+_local = threading.local()
+
+
+class Recorder:
+    """Keeps all measurements and call counts while it is active."""
+
+    def __init__(self, count_calls: bool = True):
+        """Constructor.
+
+        :param bool count_calls: if True, subprocesses and HTTP requests
+            are also counted while the recorder is active
+        """
+        self.count_calls = count_calls
+
+        # The duration of each measurement, with (stage, name) as the key
+        self.timings: Dict[Tuple[str, str], List[float]] = {}
+
+        # The number of calls of each kind, with (kind, description) as the key,
+        # e.g. ('subprocess', 'git diff') or ('http', 'GET /repos/owner/repo')
+        self.calls: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, name: str, duration: float):
+        """Keep the duration of a measurement.
+
+        :param str stage: the stage that was measured, e.g. STAGE_FETCH
+        :param str name: what was measured in the stage, e.g. the name
+            of a content provider
+        :param float duration: the duration in seconds
+        """
+        with self._lock:
+            self.timings.setdefault((stage, name), []).append(duration)
+
+    def count(self, kind: str, description: str):
+        """Count a call.
+
+        :param str kind: the kind of the call, e.g. CALL_SUBPROCESS
+        :param str description: a short description of the call
+        """
+        key = (kind, description)
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def get_call_count(self, kind: str) -> int:
+        """Return the total number of calls of the given kind.
+
+        :param str kind: the kind of the calls, e.g. CALL_HTTP
+        :rtype: int
+        """
+        return sum(count for (k, _), count in self.calls.items() if k == kind)
+
+    def as_data(self) -> dict:
+        """Return all measurements in a form that can be serialized as JSON.
+
+        :return: a dictionary like
+            {
+              'timings': [[<stage>, <name>, [<duration>, ...]], ...],
+              'calls': [[<kind>, <description>, <count>], ...],
+            }
+        :rtype: dict
+        """
+        return {
+            'timings': [
+                [stage, name, durations]
+                for (stage, name), durations in self.timings.items()
+            ],
+            'calls': [
+                [kind, description, count]
+                for (kind, description), count in self.calls.items()
+            ],
+        }
+
+
+class Span:
+    """A timed operation of a trace, e.g. the execution of a check."""
+
+    __slots__ = (
+        'name',
+        'kind',
+        'trace_id',
+        'span_id',
+        'parent_id',
+        'start_time',
+        'end_time',
+        'attributes',
+        'error',
+        '_tracer',
+    )
+
+    def __init__(
+        self,
+        tracer: 'Tracer',
+        name: str,
+        parent: Union['Span', None],
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: dict = None,
+    ):
+        """Constructor.
+
+        :param Tracer tracer: the tracer the span belongs to
+        :param str name: the name of the span
+        :param Span parent: the span this one is nested under, if any
+        :param int kind: the kind of the span, e.g. SPAN_KIND_CLIENT
+        :param dict attributes: the attributes of the span
+        """
+        self._tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = tracer.trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.error: Union[str, None] = None
+        self.start_time = tracer.get_time()
+        self.end_time: Union[int, None] = None
+
+    def set_attribute(self, key: str, value):
+        """Set an attribute of the span.
+
+        :param str key: the name of the attribute, e.g. 'totem.check.type'
+        :param value: a string, a boolean or a number
+        """
+        self.attributes[key] = value
+
+    def end(self, error: BaseException = None):
+        """End the span and add it to the finished spans of its tracer.
+
+        :param Exception error: the error that ended the operation, if any
+        """
+        if self.end_time is not None:
+            return
+        if error is not None:
+            self.error = '{}: {}'.format(type(error).__name__, error)
+        self.end_time = self._tracer.get_time()
+        self._tracer.finish(self)
+
+
+class Tracer:
+    """Keeps all finished spans of a trace while it is active."""
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+        # Spans are timed with the performance counter, which is precise
+        # and monotonic, relative to the time the tracer was created
+        self._epoch = int(time.time() * 1e9)
+        self._origin = time.perf_counter()
+
+    def get_time(self) -> int:
+        """Return the current time in nanoseconds since the epoch.
+
+        :rtype: int
+        """
+        return self._epoch + int((time.perf_counter() - self._origin) * 1e9)
+
+    def start_span(
+        self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: dict = None
+    ) -> Span:
+        """Start a span, nested under the current span of this thread.
+
+        The span does not become the current span.
+
+        :param str name: the name of the span
+        :param int kind: the kind of the span, e.g. SPAN_KIND_CLIENT
+        :param dict attributes: the attributes of the span
+        :rtype: Span
+        """
+        return Span(self, name, get_current_span(), kind, attributes)
+
+    def finish(self, span: Span):
+        """Keep the given span, which has just ended.
+
+        :param Span span: the span
+        """
+        with self._lock:
+            self.spans.append(span)
+
+
+class _NullMeasurement:
+    """A context manager that does nothing, used when nothing is recorded."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Measurement:
+    """A context manager that measures the time of its block and records it
+    in all active recorders, as well as in a span, if a tracer is active.
+
+    Without a stage, it only creates a span.
+    """
+
+    __slots__ = ('stage', 'name', 'attributes', 'start', 'span', 'previous')
+
+    def __init__(self, stage: Union[str, None], name: str, attributes: dict = None):
+        self.stage = stage
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+        self.span: Union[Span, None] = None
+        self.previous: Union[Span, None] = None
+
+    def __enter__(self):
+        if _listeners and self.stage is not None:
+            for listener in list(_listeners):
+                listener.measurement_started(self.stage, self.name)
+        tracer = _tracer
+        if tracer is not None:
+            name = self.name
+            if self.stage is not None:
+                name = '{} {}'.format(self.stage, self.name)
+            self.previous = get_current_span()
+            self.span = tracer.start_span(name, attributes=self.attributes)
+            _local.span = self.span
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        error = exc if isinstance(exc, Exception) else None
+        if self.stage is not None:
+            for recorder in list(_recorders):
+                recorder.record(self.stage, self.name, duration)
+            for listener in list(_listeners):
+                listener.measurement_ended(self.stage, self.name, duration, error)
+        if self.span is not None:
+            _local.span = self.previous
+            self.span.end(error)
+        return False
+
+
+_NULL_MEASUREMENT = _NullMeasurement()
+
+
+def measure(stage: str, name: str, attributes: dict = None):
+    """Return a context manager that measures the time of its block.
+
+    :param str stage: the stage being measured, e.g. STAGE_CHECK
+    :param str name: what is measured in the stage, e.g. the type of a check
+    :param dict attributes: the attributes of its span, if traced
+    :return: a context manager
+    """
+    if not _recorders and not _listeners and _tracer is None:
+        return _NULL_MEASUREMENT
+    return _Measurement(stage, name, attributes)
+
+
+def span(name: str, attributes: dict = None):
+    """Return a context manager that traces its block as a span,
+    if a tracer is active. The span becomes the current span of the thread
+    for the duration of the block.
+
+    :param str name: the name of the span, e.g. 'totem.suite'
+    :param dict attributes: the attributes of the span
+    :return: a context manager
+    """
+    if _tracer is None:
+        return _NULL_MEASUREMENT
+    return _Measurement(None, name, attributes)
+
+
+def get_current_span() -> Union[Span, None]:
+    """Return the current span of this thread, if any.
+
+    :rtype: Span
+    """
+    return getattr(_local, 'span', None)
+
+
+def set_attributes(attributes: dict):
+    """Set the given attributes on the current span, if traced.
+
+    :param dict attributes: the attributes, e.g. {'totem.cache': 'hit'}
+    """
+    current = get_current_span()
+    if current is not None and _tracer is not None:
+        current.attributes.update(attributes)
+
+
+def propagate_context(func):
+    """Return a function that calls the given function with the current span
+    of this thread, so that spans started in another thread are nested
+    under it.
+
+    :param callable func: the function that will run in another thread
+    :rtype: callable
+    """
+    current = get_current_span()
+    if current is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = get_current_span()
+        _local.span = current
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.span = previous
+
+    return wrapper
+
+
+def measured(stage: str, name: str = None):
+    """Return a decorator that measures every call of a function.
+
+    >>> @measured(STAGE_REMOTE)
+    ... def get_repo(self, repo_name):
+    ...     ...
+
+    :param str stage: the stage being measured, e.g. STAGE_REMOTE
+    :param str name: what is measured in the stage; defaults to the
+        qualified name of the function, e.g. 'GithubService.get_repo'
+    :return: the decorator
+    """
+
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _recorders and not _listeners and _tracer is None:
+                return func(*args, **kwargs)
+            with _Measurement(stage, label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def is_recording() -> bool:
+    """Return True if any recorder is active.
+
+    :rtype: bool
+    """
+    return bool(_recorders)
+
+
+@contextmanager
+def recording(recorder: Recorder = None) -> Iterator[Recorder]:
+    """Activate the given recorder for the duration of the block.
+
+    :param Recorder recorder: the recorder to activate; a new one if not given
+    :return: the active recorder
+    :rtype: Recorder
+    """
+    recorder = recorder or Recorder()
+    with _lock:
+        _recorders.append(recorder)
+        if recorder.count_calls:
+            _acquire_patches()
+    try:
+        yield recorder
+    finally:
+        with _lock:
+            _recorders.remove(recorder)
+            if recorder.count_calls:
+                _release_patches()
+
+
+@contextmanager
+def listening(listener) -> Iterator:
+    """Notify the given listener of every measurement, for the duration
+    of the block.
+
+    The listener needs to have the methods `measurement_started(stage, name)`
+    and `measurement_ended(stage, name, duration, error)`. They are called
+    in the thread of the measurement, so they need to be thread-safe.
+
+    :param listener: the listener to notify
+    :return: the listener
+    """
+    with _lock:
+        _listeners.append(listener)
+    try:
+        yield listener
+    finally:
+        with _lock:
+            _listeners.remove(listener)
+
+
+@contextmanager
+def observing_responses(observer: Callable) -> Iterator[Callable]:
+    """Call the given function with every HTTP response that is received,
+    for the duration of the block.
+
+    It is called as `observer(host, method, path, response)`, in the thread
+    of the request, where `response` is the `http.client.HTTPResponse`,
+    before its body is read. It needs to be thread-safe and must not read
+    the body. If it raises an exception, a warning is printed and the
+    request continues as usual.
+
+    :param callable observer: the function to call
+    :return: the function
+    """
+    with _lock:
+        _response_observers.append(observer)
+        _acquire_patches()
+    try:
+        yield observer
+    finally:
+        with _lock:
+            _response_observers.remove(observer)
+            _release_patches()
+
+
+def is_tracing() -> bool:
+    """Return True if a tracer is active.
+
+    :rtype: bool
+    """
+    return _tracer is not None
+
+
+@contextmanager
+def tracing(tracer: Tracer = None) -> Iterator[Tracer]:
+    """Activate the given tracer for the duration of the block.
+
+    Only one tracer can be active at a time; a nested one replaces
+    the outer one until the end of its block.
+
+    :param Tracer tracer: the tracer to activate; a new one if not given
+    :return: the active tracer
+    :rtype: Tracer
+    """
+    global _tracer
+
+    tracer = tracer or Tracer()
+    with _lock:
+        previous = _tracer
+        _tracer = tracer
+        _acquire_patches()
+    try:
+        yield tracer
+    finally:
+        with _lock:
+            _tracer = previous
+            _release_patches()
+
+
+def _acquire_patches():
+    """Make sure that subprocesses and HTTP requests are observed,
+    until a matching call of `_release_patches()`.
+    Needs to be called with the lock held."""
+    global _patch_users
+
+    _patch_users += 1
+    if _patch_users == 1:
+        _patch_calls()
+
+
+def _release_patches():
+    """Stop observing subprocesses and HTTP requests, if nothing else
+    needs it. Needs to be called with the lock held."""
+    global _patch_users
+
+    _patch_users -= 1
+    if _patch_users == 0:
+        _unpatch_calls()
+
+
+def _count(kind: str, description: str):
+    """Count a call in all active recorders that count calls."""
+    for recorder in list(_recorders):
+        if recorder.count_calls:
+            recorder.count(kind, description)
+
+
+def _describe_command(args) -> str:
+    """Return a short description of the given subprocess command,
+    e.g. 'git diff' for ['git', 'diff', '--cached'].
+
+    :param args: the arguments given to subprocess.Popen
+    :rtype: str
+    """
+    if isinstance(args, (str, bytes)):
+        args = args.split()
+    words = [str(x) for x in list(args)[:2]]
+    if words and '/' in words[0]:
+        words[0] = words[0].rsplit('/', 1)[-1]
+    if len(words) > 1 and words[1].startswith('-'):
+        words = words[:1]
+    return ' '.join(words)
+
+
+def _patch_calls():
+    """Wrap the functions that start subprocesses and make HTTP requests,
+    so that they are counted and traced.
+
+    The span of a subprocess ends when it is waited for, and the span
+    of an HTTP request ends when the response is received.
+    """
+    import http.client
+    import subprocess
+
+    popen_init = subprocess.Popen.__init__
+    popen_wait = subprocess.Popen.wait
+
+    def __init__(self, args, *other_args, **kwargs):
+        description = _describe_command(args)
+        _count(CALL_SUBPROCESS, description)
+        tracer = _tracer
+        if tracer is not None:
+            self._totem_span = tracer.start_span(
+                description,
+                kind=SPAN_KIND_CLIENT,
+                attributes={'process.command': description},
+            )
+        try:
+            popen_init(self, args, *other_args, **kwargs)
+        except Exception as e:
+            _end_call_span(self, e)
+            raise
+
+    def wait(self, *args, **kwargs):
+        try:
+            return popen_wait(self, *args, **kwargs)
+        finally:
+            if self.returncode is not None:
+                _end_call_span(self, attributes={'process.exit_code': self.returncode})
+
+    putrequest = http.client.HTTPConnection.putrequest
+    getresponse = http.client.HTTPConnection.getresponse
+
+    def _putrequest(self, method, url, *other_args, **kwargs):
+        path = url.split('?', 1)[0]
+        _count(CALL_HTTP, '{} {}'.format(method, path))
+        if _response_observers:
+            self._totem_request = (method, path)
+        tracer = _tracer
+        if tracer is not None:
+            _end_call_span(self)
+            self._totem_span = tracer.start_span(
+                'HTTP {}'.format(method),
+                kind=SPAN_KIND_CLIENT,
+                attributes={
+                    'http.request.method': method,
+                    'server.address': self.host,
+                    'url.path': path,
+                },
+            )
+        return putrequest(self, method, url, *other_args, **kwargs)
+
+    def _getresponse(self, *args, **kwargs):
+        try:
+            response = getresponse(self, *args, **kwargs)
+        except Exception as e:
+            _end_call_span(self, e)
+            raise
+        _end_call_span(self, attributes={'http.response.status_code': response.status})
+        request = self.__dict__.pop('_totem_request', None)
+        if request is not None:
+            for observer in list(_response_observers):
+                # An observer never affects the request, as with hooks
+                try:
+                    observer(self.host, request[0], request[1], response)
+                except Exception as e:
+                    print(
+                        'Warning: response observer {!r} failed: {}'.format(
+                            observer, e
+                        ),
+                        file=sys.stderr,
+                    )
+        return response
+
+    _patches['popen'] = (subprocess.Popen, '__init__', popen_init)
+    _patches['popen_wait'] = (subprocess.Popen, 'wait', popen_wait)
+    _patches['http'] = (http.client.HTTPConnection, 'putrequest', putrequest)
+    _patches['http_response'] = (
+        http.client.HTTPConnection,
+        'getresponse',
+        getresponse,
+    )
+    subprocess.Popen.__init__ = __init__
+    subprocess.Popen.wait = wait
+    http.client.HTTPConnection.putrequest = _putrequest
+    http.client.HTTPConnection.getresponse = _getresponse
+
+
+def _end_call_span(owner, error: Exception = None, attributes: dict = None):
+    """End the span of a subprocess or HTTP request, if it is traced.
+
+    :param owner: the Popen or HTTPConnection object of the call
+    :param Exception error: the error that ended the call, if any
+    :param dict attributes: more attributes of the span
+    """
+    call_span = owner.__dict__.pop('_totem_span', None)
+    if call_span is not None:
+        call_span.attributes.update(attributes or {})
+        call_span.end(error)
+
+
+def _unpatch_calls():
+    """Restore the functions wrapped by `_patch_calls()`."""
+    for owner, name, original in _patches.values():
+        setattr(owner, name, original)
+    _patches.clear()
@@ -5,6 +5,8 @@ For example, a client could be a CLI.
 
 If more Git services need to be supported in the future (other than Github),
 this needs to be refactored.
+
+This module should stay cheap to import; see the comment on the imports below.
 """
 
 from totem.checks.checks import (
@@ -21,16 +23,25 @@ from totem.checks.checks import (
     PRBodyIncludesCheck,
     PRTitleCheck,
 )
-from totem.checks.config import ConfigFactory
+from totem.checks.cache import ConfigSnapshot
+from totem.checks.config import Config, ConfigFactory
 from totem.checks.content import BaseContentProvider, BaseGitContentProviderFactory
 from totem.checks.core import CheckFactory
+from totem.checks.hooks import Hooks
 from totem.checks.results import CheckSuiteResults
 from totem.checks.suite import CheckSuite
-from totem.git.content import GitContentProviderFactory, PreCommitContentProviderFactory
-from totem.github.content import GithubContentProviderFactory, GithubPRContentProvider
-from totem.github.utils import parse_pr_url
+from totem.instrumentation import (
+    STAGE_CONFIG,
+    STAGE_REPORT,
+    measure,
+    set_attributes,
+)
 from totem.reporting.console import Color, LocalConsoleReport, PRConsoleReport
-from totem.reporting.pr import PRCommentReport
+
+# The Git and Github backends, along with their content providers and
+# the PR comment reporter, are imported only by the classes that need them,
+# because importing GitPython or PyGithub adds significantly to the startup
+# time, e.g. of every Git hook
 
 
 class BaseCheck:
@@ -44,6 +55,7 @@ class BaseCheck:
         self._check_factory: CheckFactory = CheckFactory()
         self._register_defaults()
         self._content_provider_factory: BaseGitContentProviderFactory = None
+        self._hooks: Hooks = Hooks()
 
     def run(self) -> CheckSuiteResults:
         """Run all checks.
@@ -67,6 +79,12 @@ class BaseCheck:
     def content_provider_factory(self) -> BaseGitContentProviderFactory:
         return self._content_provider_factory
 
+    @property
+    def hooks(self) -> Hooks:
+        """The hooks that are called while the checks run,
+        see `totem.checks.hooks`."""
+        return self._hooks
+
     def _register_defaults(self):
         """Add the default functionality."""
         defaults = {
@@ -80,6 +98,25 @@ class BaseCheck:
         for config_type, check_class in defaults.items():
             self.check_factory.register(config_type, check_class)
 
+    def _create_config(self, include_pr: bool) -> Config:
+        """Create the configuration of the suite and print any warnings
+        found while creating it.
+
+        :param bool include_pr: if False, all checks that can only
+            be applied on PRs will not be included in the config
+        :return: the full configuration of all checks
+        :rtype: Config
+        """
+        with measure(STAGE_CONFIG, 'create'):
+            if isinstance(self._config_dict, ConfigSnapshot):
+                # Avoid creating the config again if it is already cached
+                config = self._config_dict.create_config(include_pr=include_pr)
+            else:
+                config = ConfigFactory.create(self._config_dict, include_pr=include_pr)
+        for warning in config.pattern_warnings:
+            print(Color.format('[warning]Warning: {}[end]'.format(warning)))
+        return config
+
     def _create_suite(self, config) -> CheckSuite:
         """Create a check suite to run all checks defined in the
         given config.
@@ -92,6 +129,7 @@ class BaseCheck:
             config=config,
             content_provider_factory=self._content_provider_factory,
             check_factory=self._check_factory,
+            hooks=self._hooks,
         )
 
 
@@ -110,6 +148,7 @@ class PRCheck(BaseCheck):
         >>> check = PRCheck({}, '')
         >>> check.content_provider_factory.register('new_type', MyProviderClass)
         >>> check.check_factory.register('new_type', MyCheckClass)
+        >>> check.hooks.register(EVENT_CHECK_END, my_hook)
 
         :param dict config_dict: the full configuration of the suite
             formatted as follows:
@@ -131,6 +170,9 @@ class PRCheck(BaseCheck):
         :param str details_url: the URL to visit for more details about the results
             e.g. this could be the CI page that ran the check suite
         """
+        from totem.github.content import GithubContentProviderFactory
+        from totem.github.utils import parse_pr_url
+
         super().__init__()
         self._config_dict = config_dict
 
@@ -150,21 +192,49 @@ class PRCheck(BaseCheck):
             self.full_repo_name, self.pr_number
         )
 
+        # The requests made to the Github API by the last run
+        self.api_usage = None
+
     def run(self) -> CheckSuiteResults:
         """Run all registered checks of the suite.
 
+        All requests to the Github API are counted, in `api_usage`,
+        and reported at the end.
+
+        :return: the results of the execution of the tests
+        :rtype: CheckSuiteResults
+        """
+        from totem.github import github_service
+        from totem.github.usage import GithubAPIUsage
+
+        self.api_usage = GithubAPIUsage(github_service().base_url)
+        with self.api_usage.tracking():
+            results = self._run()
+        print(PRConsoleReport.get_api_usage(self.api_usage))
+        return results
+
+    def _run(self) -> CheckSuiteResults:
+        """Run all registered checks of the suite and create the PR comment.
+
         :return: the results of the execution of the tests
         :rtype: CheckSuiteResults
         """
-        config = ConfigFactory.create(self._config_dict, include_pr=True)
+        set_attributes(
+            {'totem.pr.repo': self.full_repo_name, 'totem.pr.number': self.pr_number}
+        )
+        config = self._create_config(include_pr=True)
         suite = self._create_suite(config)
 
-        report = PRConsoleReport(suite)
-        print(report.get_pre_run_report(config, self.pr_url))
+        with measure(STAGE_REPORT, 'console'):
+            report = PRConsoleReport(suite)
+            print(report.get_pre_run_report(config, self.pr_url))
 
         suite.run()
-        print(report.get_detailed_results(suite.results))
-        print(report.get_summary(suite.results))
+        with measure(STAGE_REPORT, 'console'):
+            print(report.get_detailed_results(suite.results))
+            print(report.get_summary(suite.results))
+
+        from totem.github.content import GithubPRContentProvider
 
         content_provider = GithubPRContentProvider(
             repo_name=self.full_repo_name, pr_num=self.pr_number
@@ -173,13 +243,17 @@ class PRCheck(BaseCheck):
         # See if we need to add a PR comment report
         if config.pr_comment_report.get('enabled', True):
             # Attempt to create the comment. If it fails, `results` will be None
-            results = self._create_pr_comment_report(suite, content_provider)
+            with measure(STAGE_REPORT, 'pr_comment'):
+                results = self._create_pr_comment_report(suite, content_provider)
 
             # See if we need to delete previous PR comments
             # Do NOT do that if the new comment failed to be created
             delete_previous = config.pr_comment_report.get('delete_previous', False)
             if results is not None and delete_previous:
-                self._delete_previous_pr_comment(suite, results['id'], content_provider)
+                with measure(STAGE_REPORT, 'pr_comment_cleanup'):
+                    self._delete_previous_pr_comment(
+                        suite, results['id'], content_provider
+                    )
 
         return suite.results
 
@@ -194,6 +268,8 @@ class PRCheck(BaseCheck):
         :return: information about the created comment
         :rtype: dict
         """
+        from totem.reporting.pr import PRCommentReport
+
         pr_report = PRCommentReport(suite, self.details_url)
         console_report = PRConsoleReport(suite)
         try:
@@ -254,6 +330,7 @@ class LocalCheck(BaseCheck):
         >>> check = LocalCheck(config_dict)
         >>> check.content_provider_factory.register('new_type', MyProviderClass)
         >>> check.check_factory.register('new_type', MyCheckClass)
+        >>> check.hooks.register(EVENT_CHECK_END, my_hook)
 
         :param dict config_dict: the full configuration of the suite
             formatted as follows:
@@ -272,6 +349,8 @@ class LocalCheck(BaseCheck):
               }
             }
         """
+        from totem.git.content import GitContentProviderFactory
+
         super().__init__()
         self._config_dict = config_dict
         self._content_provider_factory = GitContentProviderFactory()
@@ -282,12 +361,13 @@ class LocalCheck(BaseCheck):
         :return: the results of the execution of the tests
         :rtype: CheckSuiteResults
         """
-        config = ConfigFactory.create(self._config_dict, include_pr=False)
+        config = self._create_config(include_pr=False)
         suite = self._create_suite(config)
         suite.run()
 
-        report = LocalConsoleReport(suite)
-        print(report.get_detailed_results(suite.results))
+        with measure(STAGE_REPORT, 'console'):
+            report = LocalConsoleReport(suite)
+            print(report.get_detailed_results(suite.results))
 
         return suite.results
 
@@ -307,6 +387,7 @@ class PreCommitLocalCheck(BaseCheck):
         >>> check = PreCommitLocalCheck(config_dict)
         >>> check.content_provider_factory.register('new_type', MyProviderClass)
         >>> check.check_factory.register('new_type', MyCheckClass)
+        >>> check.hooks.register(EVENT_CHECK_END, my_hook)
 
         :param dict config_dict: the full configuration of the suite
             formatted as follows:
@@ -325,6 +406,8 @@ class PreCommitLocalCheck(BaseCheck):
               }
             }
         """
+        from totem.git.content import PreCommitContentProviderFactory
+
         super().__init__()
         self._config_dict = config_dict
         self._content_provider_factory = PreCommitContentProviderFactory()
@@ -335,13 +418,27 @@ class PreCommitLocalCheck(BaseCheck):
         :return: the results of the execution of the tests
         :rtype: CheckSuiteResults
         """
-        config = ConfigFactory.create(self._config_dict, include_pr=False)
+        config = self._create_config(include_pr=False)
         suite = self._create_suite(config)
         suite.run()
 
-        report = LocalConsoleReport(suite)
-        show_warnings = report.report_details.get('show_warnings', True)
-        if suite.results.errors or (show_warnings and suite.results.warnings):
-            print(report.get_detailed_results(suite.results))
+        with measure(STAGE_REPORT, 'console'):
+            report = LocalConsoleReport(suite)
+            show_warnings = report.report_details.get('show_warnings', True)
+            if suite.results.errors or (show_warnings and suite.results.warnings):
+                print(report.get_detailed_results(suite.results))
 
         return suite.results
+
+
+def get_mode_name(pr_url: str = None, pre_commit: bool = False) -> str:
+    """Return the name of the class that runs the checks, as the CLI
+    would choose it.
+
+    :param str pr_url: the URL of the PR to check, if any
+    :param bool pre_commit: True for the pre-commit mode
+    :rtype: str
+    """
+    if pr_url:
+        return 'PRCheck'
+    return 'PreCommitLocalCheck' if pre_commit else 'LocalCheck'
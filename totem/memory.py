@@ -0,0 +1,235 @@
+"""Contains the tracing of the memory that a run allocates, with `tracemalloc`,
+for finding out how much memory large PRs need, e.g. for setting the memory
+limit of the containers that run totem.
+
+While tracing, every measurement (see `totem.instrumentation`) is
+attributed the peak of the traced memory during it, above the memory that
+was allocated when it started, and the memory that it left allocated
+(e.g. the commits returned by a content provider). Checks can run
+in parallel, in which case the peak of a measurement also includes
+the allocations of the checks that run at the same time.
+
+Whenever the traced memory reaches a new high at the end of a measurement,
+a snapshot is taken, so that the top allocation sites can be reported
+for the point of the run that held the most memory.
+
+Only the memory of the process that runs the suite is traced, so checks
+that run in the `processes` execution mode are not included. Before
+Python 3.9, the peak cannot be reset between measurements, so it is
+approximated by the memory allocated when each measurement ends.
+"""
+
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from totem.instrumentation import listening
+
+# The number of allocation sites that are reported
+TOP_ALLOCATIONS = 20
+
+# A snapshot is only taken if the traced memory grew by this ratio
+# since the previous one, since each snapshot copies all traces
+SNAPSHOT_GROWTH = 1.05
+
+_CAN_RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+
+class _Allocation:
+    """The traced memory of a measurement that has not ended yet."""
+
+    __slots__ = ('start', 'peak')
+
+    def __init__(self, start: int):
+        self.start = start
+        self.peak = start
+
+
+class MemoryTracer:
+    """Attributes the traced memory of a run to its measurements.
+
+    It is notified of measurements as a listener of `totem.instrumentation`;
+    use `tracing_memory()` for tracing a block.
+    """
+
+    def __init__(self, top: int = TOP_ALLOCATIONS):
+        """Constructor.
+
+        :param int top: the number of allocation sites to keep
+        """
+        self.top = top
+        # The memory of each measurement, with (stage, name) as the key
+        # and a dict with the number of `calls`, the highest `peak`
+        # and the total `retained` bytes as the value
+        self.stages: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.peak = 0
+        self.current = 0
+        # The top allocation sites of the snapshot with the most memory,
+        # and the traced memory when it was taken
+        self.top_allocations: List[dict] = []
+        self.snapshot_size = 0
+
+        self._open: List[_Allocation] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def measurement_started(self, stage: str, name: str):
+        """Start attributing memory to the given measurement.
+
+        :param str stage: the measured stage
+        :param str name: what is measured in the stage
+        """
+        with self._lock:
+            allocation = _Allocation(self._update())
+            self._open.append(allocation)
+        self._get_stack().append(allocation)
+
+    def measurement_ended(
+        self, stage: str, name: str, duration: float, error: Exception = None
+    ):
+        """Stop attributing memory to the given measurement and keep its memory.
+
+        :param str stage: the measured stage
+        :param str name: what is measured in the stage
+        :param float duration: the duration of the measurement in seconds
+        :param Exception error: the exception raised in the measurement, if any
+        """
+        stack = self._get_stack()
+        if not stack:
+            # The tracer started listening during the measurement
+            return
+        allocation = stack.pop()
+        with self._lock:
+            current = self._update()
+            self._open.remove(allocation)
+            stats = self.stages.setdefault(
+                (stage, name), {'calls': 0, 'peak': 0, 'retained': 0}
+            )
+            stats['calls'] += 1
+            stats['peak'] = max(stats['peak'], allocation.peak - allocation.start)
+            stats['retained'] += current - allocation.start
+            if current > self.snapshot_size * SNAPSHOT_GROWTH:
+                self._take_snapshot(current)
+
+    def finish(self):
+        """Update the memory of the run, at its end."""
+        with self._lock:
+            current = self._update()
+            if current > self.snapshot_size * SNAPSHOT_GROWTH:
+                self._take_snapshot(current)
+            self.current = current
+
+    def as_data(self) -> dict:
+        """Return the traced memory in a form that can be serialized as JSON.
+
+        :return: a dictionary like
+            {
+              'peak': <bytes>,
+              'current': <bytes>,
+              'stages': [
+                {'stage': 'fetch', 'name': 'GitCommitsContentProvider',
+                 'calls': 1, 'peak': <bytes>, 'retained': <bytes>},
+                ...
+              ],
+              'snapshot_size': <bytes>,
+              'top_allocations': [
+                {'file': 'totem/github/content.py', 'line': 42,
+                 'size': <bytes>, 'count': <number of blocks>},
+                ...
+              ],
+            }
+        :rtype: dict
+        """
+        return {
+            'peak': self.peak,
+            'current': self.current,
+            'stages': [
+                dict(stage=stage, name=name, **stats)
+                for (stage, name), stats in self.stages.items()
+            ],
+            'snapshot_size': self.snapshot_size,
+            'top_allocations': list(self.top_allocations),
+        }
+
+    def _get_stack(self) -> List[_Allocation]:
+        """Return the measurements of the current thread that have not ended.
+
+        :rtype: list
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _update(self) -> int:
+        """Attribute the peak since the previous update to all measurements
+        that have not ended and start a new peak.
+
+        Needs to be called with the lock held.
+
+        :return: the traced memory, in bytes
+        :rtype: int
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if _CAN_RESET_PEAK:
+            tracemalloc.reset_peak()
+        else:
+            peak = current
+        for allocation in self._open:
+            allocation.peak = max(allocation.peak, peak)
+        self.peak = max(self.peak, peak)
+        return current
+
+    def _take_snapshot(self, current: int):
+        """Keep the top allocation sites of the traced memory.
+
+        Needs to be called with the lock held.
+
+        :param int current: the traced memory, in bytes
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+                tracemalloc.Filter(False, '<unknown>'),
+            )
+        )
+        self.top_allocations = [
+            {
+                'file': x.traceback[0].filename,
+                'line': x.traceback[0].lineno,
+                'size': x.size,
+                'count': x.count,
+            }
+            for x in snapshot.statistics('lineno')[: self.top]
+        ]
+        self.snapshot_size = current
+        del snapshot
+        if _CAN_RESET_PEAK:
+            # The snapshot itself is not memory of the run
+            tracemalloc.reset_peak()
+
+
+@contextmanager
+def tracing_memory(tracer: MemoryTracer = None) -> Iterator[MemoryTracer]:
+    """Trace the memory that is allocated during the block.
+
+    :param MemoryTracer tracer: the tracer to use; a new one is created
+        if not given
+    :return: the tracer
+    :rtype: MemoryTracer
+    """
+    tracer = tracer or MemoryTracer()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        with listening(tracer):
+            yield tracer
+    finally:
+        tracer.finish()
+        if started:
+            tracemalloc.stop()
@@ -0,0 +1,42 @@
+"""Contains the locations where totem stores local data.
+
+This module is imported by the client of the daemon on every invocation,
+so it should not import anything expensive.
+"""
+
+import os
+
+
+def get_cache_dir() -> str:
+    """Return the path of the directory where totem stores local data.
+
+    It is $TOTEM_CACHE_DIR if defined, otherwise a `totem` directory inside
+    $XDG_CACHE_HOME or `~/.cache`. The directory might not exist yet.
+
+    :rtype: str
+    """
+    path = os.environ.get('TOTEM_CACHE_DIR')
+    if path:
+        return path
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+    return os.path.join(cache_home, 'totem')
+
+
+def get_config_path(config_file: str = None) -> str:
+    """Return the path of the configuration file to use.
+
+    It is the given file if any, otherwise `.totem.yml` in the current
+    directory if it exists. If that is not found, it defaults to
+    `contrib/config/default.yml`.
+
+    :param str config_file: the path given by the user, if any
+    :rtype: str
+    """
+    if config_file:
+        return config_file
+    if os.path.isfile('.totem.yml'):
+        return '.totem.yml'
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(package_root, 'contrib/config/default.yml')
@@ -0,0 +1,230 @@
+"""Contains the profiling of the Python code of a run, for finding hot spots
+in checks, reports or the libraries they use, without patching totem.
+
+Two formats are supported:
+ - pstats: a deterministic profile, by `cProfile`, which can be inspected
+   with the `pstats` module or tools like snakeviz
+ - speedscope: a sampling profile of all threads, in the JSON format
+   of https://www.speedscope.app, which shows where the time went
+   as a flame graph
+
+The format is chosen from the extension of the file: `.json` files get
+the speedscope format and all other files get the pstats format.
+
+`cProfile` only profiles the thread that enables it before Python 3.12,
+so checks need to run serially for a deterministic profile to include
+them. Neither profiler sees checks that run in the `processes`
+execution mode.
+"""
+
+import json
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple, Union
+
+FORMAT_PSTATS = 'pstats'
+FORMAT_SPEEDSCOPE = 'speedscope'
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+# The time between two samples of the sampling profiler, in seconds
+DEFAULT_INTERVAL = 0.001
+
+
+def get_profile_format(path: str) -> str:
+    """Return the format of the profile to write to the given file.
+
+    :param str path: the path of the file
+    :return: FORMAT_SPEEDSCOPE for `.json` files, FORMAT_PSTATS otherwise
+    :rtype: str
+    """
+    return FORMAT_SPEEDSCOPE if path.lower().endswith('.json') else FORMAT_PSTATS
+
+
+def create_profiler(path: str) -> 'BaseProfiler':
+    """Return a profiler for writing a profile to the given file,
+    in the format of its extension.
+
+    :param str path: the path of the file
+    :rtype: BaseProfiler
+    """
+    if get_profile_format(path) == FORMAT_SPEEDSCOPE:
+        return SamplingProfiler()
+    return DeterministicProfiler()
+
+
+class BaseProfiler:
+    """Profiles the code that runs between `start()` and `stop()`,
+    or inside a `with` block.
+    """
+
+    def __enter__(self) -> 'BaseProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        """Start profiling."""
+        raise NotImplementedError()
+
+    def stop(self):
+        """Stop profiling."""
+        raise NotImplementedError()
+
+    def write(self, path: str):
+        """Write the profile to the given file.
+
+        :param str path: the path of the file
+        :raise OSError: if the file cannot be written
+        """
+        raise NotImplementedError()
+
+
+class DeterministicProfiler(BaseProfiler):
+    """Profiles every function call with `cProfile` and writes pstats."""
+
+    def __init__(self):
+        import cProfile
+
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path: str):
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler(BaseProfiler):
+    """Samples the stacks of all threads periodically, from a separate thread,
+    and writes them in the speedscope format.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        """Constructor.
+
+        :param float interval: the time between two samples, in seconds
+        """
+        self.interval = interval
+        # The functions seen in the samples, as (name, file, line),
+        # with their index in the `shared.frames` list of speedscope
+        self.frames: Dict[Tuple[str, str, int], int] = {}
+        # The samples of each thread, with the ID of the thread as the key
+        # and (name, stacks, weights in seconds) as the value;
+        # each stack is a list of indices of `frames`, from the outermost
+        self.samples: Dict[int, Tuple[str, List[List[int]], List[float]]] = {}
+
+        self._stopped = threading.Event()
+        self._thread: Union[threading.Thread, None] = None
+        self._last = 0.0
+
+    def start(self):
+        self._stopped.clear()
+        self._last = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name='totem-profiler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.as_speedscope(), f, separators=(',', ':'))
+
+    def as_speedscope(self) -> dict:
+        """Return the samples in the speedscope file format.
+
+        :return: a dictionary with a sampled profile per thread,
+            with weights in milliseconds
+        :rtype: dict
+        """
+        import totem
+
+        frames = sorted(self.frames, key=self.frames.get)
+        profiles = []
+        for name, stacks, weights in self.samples.values():
+            weights = [x * 1000 for x in weights]
+            profiles.append(
+                {
+                    'type': 'sampled',
+                    'name': name,
+                    'unit': 'milliseconds',
+                    'startValue': 0,
+                    'endValue': sum(weights),
+                    'samples': stacks,
+                    'weights': weights,
+                }
+            )
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'shared': {
+                'frames': [
+                    {'name': name, 'file': file, 'line': line}
+                    for name, file, line in frames
+                ]
+            },
+            'profiles': profiles,
+            'name': 'totem',
+            'activeProfileIndex': 0,
+            'exporter': 'totem {}'.format(totem.__version__),
+        }
+
+    def _run(self):
+        """Take samples until the profiler is stopped."""
+        while not self._stopped.wait(self.interval):
+            self._sample()
+        self._sample()
+
+    def _sample(self):
+        """Keep the current stack of every thread, except this one,
+        weighted by the time since the previous sample.
+        """
+        now = time.perf_counter()
+        weight = now - self._last
+        self._last = now
+
+        own = threading.get_ident()
+        names = {x.ident: x.name for x in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._get_frame_index(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+
+            if ident not in self.samples:
+                self.samples[ident] = (names.get(ident, str(ident)), [], [])
+            _, stacks, weights = self.samples[ident]
+            stacks.append(stack)
+            weights.append(weight)
+
+    def _get_frame_index(self, code) -> int:
+        """Return the index of the function of the given code object
+        in the list of frames.
+
+        :param code code: the code object of a frame
+        :rtype: int
+        """
+        key = (
+            getattr(code, 'co_qualname', code.co_name),
+            code.co_filename,
+            code.co_firstlineno,
+        )
+        index = self.frames.get(key)
+        if index is None:
+            index = self.frames[key] = len(self.frames)
+        return index
@@ -1,6 +1,5 @@
 """Includes functionality for writing output on the console."""
 
-import pyaml
 from totem.checks.config import Config
 from totem.checks.results import STATUS_FAIL, CheckResult, CheckSuiteResults
 from totem.checks.suite import CheckSuite
@@ -128,6 +127,22 @@ class BaseConsoleReport:
             for result in successful:
                 builder.add(PRConsoleReport._format_result(result))
 
+        skipped = results.skipped
+        if skipped:
+            builder.add(
+                Color.format(
+                    '\n[h]Skipped checks ({})[end]\n-----------------'.format(
+                        len(skipped)
+                    )
+                )
+            )
+            for config in skipped:
+                builder.add(
+                    Color.format(
+                        '[check][{}][end] ... SKIPPED'.format(config.check_type)
+                    )
+                )
+
         return builder.render()
 
     def get_summary(self, results: CheckSuiteResults) -> str:
@@ -186,6 +201,47 @@ class BaseConsoleReport:
                 )
             builder.add()
 
+        skipped = results.skipped
+        if skipped:
+            builder.add(
+                Color.format(
+                    '[h]Skipped ({})[end] - These did not run because of '
+                    'a previous failure or the deadline'.format(len(skipped))
+                )
+            )
+            for config in skipped:
+                builder.add(
+                    Color.format('- [check][{}][end]'.format(config.check_type))
+                )
+            builder.add()
+
+        return builder.render()
+
+    @staticmethod
+    def get_api_usage(usage) -> str:
+        """Return a summary of the requests made to the Github API.
+
+        :param GithubAPIUsage usage: the requests made during the run
+        :rtype: str
+        """
+        builder = StringBuilder()
+        builder.add()
+        builder.add('GITHUB API USAGE')
+        builder.add('----------------')
+        builder.add('Requests: {}'.format(usage.total))
+        for endpoint, count in sorted(usage.requests.items(), key=lambda x: -x[1]):
+            builder.add('- {}: {}'.format(endpoint, count))
+
+        if usage.remaining_after is None:
+            builder.add('Rate limit: not reported by Github')
+        else:
+            builder.add(
+                'Rate limit: {} of {} remaining ({} used by this run)'.format(
+                    usage.remaining_after,
+                    usage.rate_limit,
+                    usage.remaining_before - usage.remaining_after,
+                )
+            )
         return builder.render()
 
     class PRComments:
@@ -267,6 +323,10 @@ class BaseConsoleReport:
                 Color.format('[h]Error code[end]: {}'.format(result.error_code))
             )
             builder.add(Color.format('[h]Details[end]:'))
+
+            # Imported here, because it is only needed when showing failures
+            import pyaml
+
             builder.add(pyaml.dump(result.details))
             builder.add()
 
@@ -0,0 +1,118 @@
+"""Includes functionality for reporting where the memory of a run went."""
+
+import os
+
+from totem.instrumentation import STAGES
+from totem.memory import MemoryTracer
+from totem.reporting import StringBuilder
+from totem.reporting.console import Color
+
+
+class MemoryReport:
+    """Creates a breakdown of the memory of a run, per stage, from a
+    MemoryTracer (see `totem.memory`).
+
+    Measurements can be nested (e.g. a call to the Github API happens
+    while the content of a check is fetched), so the memory of a stage
+    can also be included in another one.
+    """
+
+    def __init__(self, tracer: MemoryTracer):
+        """Constructor.
+
+        :param MemoryTracer tracer: the tracer that was active during the run
+        """
+        self.tracer = tracer
+
+    def get_data(self) -> dict:
+        """Return the breakdown in a form that can be serialized as JSON.
+
+        :return: the data, as returned by `MemoryTracer.as_data()`,
+            with the stages in the order of the run
+        :rtype: dict
+        """
+        data = self.tracer.as_data()
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        data['stages'].sort(key=lambda x: order.get(x['stage'], len(STAGES)))
+        return data
+
+    def get_summary(self) -> str:
+        """Return a table with the memory of each stage and the top
+        allocation sites.
+
+        :rtype: str
+        """
+        data = self.get_data()
+        builder = StringBuilder()
+        builder.add()
+        builder.add(
+            Color.format(
+                '[h]MEMORY[end] (peak: {}, at the end: {})'.format(
+                    format_size(data['peak']), format_size(data['current'])
+                )
+            )
+        )
+        builder.add('------')
+        builder.add(
+            '{:<8}{:<40}{:>7}{:>12}{:>12}'.format(
+                'Stage', 'Name', 'Calls', 'Peak', 'Retained'
+            )
+        )
+        for stats in data['stages']:
+            builder.add(
+                '{:<8}{:<40}{:>7}{:>12}{:>12}'.format(
+                    stats['stage'],
+                    stats['name'][:39],
+                    stats['calls'],
+                    format_size(stats['peak']),
+                    format_size(stats['retained']),
+                )
+            )
+
+        if data['top_allocations']:
+            builder.add()
+            builder.add(
+                'Top allocation sites (with {} allocated):'.format(
+                    format_size(data['snapshot_size'])
+                )
+            )
+            for allocation in data['top_allocations']:
+                builder.add(
+                    '{:>12} {:>8} blocks  {}:{}'.format(
+                        format_size(allocation['size']),
+                        allocation['count'],
+                        _get_relative_path(allocation['file']),
+                        allocation['line'],
+                    )
+                )
+        return builder.render()
+
+
+def format_size(size: int) -> str:
+    """Return the given number of bytes in a human-readable form.
+
+    >>> format_size(1536)
+    '1.5 KiB'
+
+    :param int size: the number of bytes
+    :rtype: str
+    """
+    if abs(size) < 1024:
+        return '{} B'.format(size)
+    value = size / 1024
+    for unit in ('KiB', 'MiB'):
+        if abs(value) < 1024:
+            return '{:.1f} {}'.format(value, unit)
+        value /= 1024
+    return '{:.1f} GiB'.format(value)
+
+
+def _get_relative_path(path: str) -> str:
+    """Return the given path relative to the current directory, if it is
+    inside it.
+
+    :param str path: an absolute path
+    :rtype: str
+    """
+    relative = os.path.relpath(path) if os.path.isabs(path) else path
+    return path if relative.startswith('..') else relative
@@ -1,6 +1,5 @@
 import re
 
-import pyaml
 from totem.checks.results import CheckResult
 from totem.checks.suite import CheckSuite
 from totem.reporting import StringBuilder
@@ -30,6 +29,7 @@ class PRCommentReport:
         errors = self.suite.results.errors
         warnings = self.suite.results.warnings
         successful = self.suite.results.successful
+        skipped = self.suite.results.skipped
         total = len(errors) + len(warnings) + len(successful)
 
         builder = StringBuilder()
@@ -102,6 +102,16 @@ class PRCommentReport:
                 builder.add('- **{}**'.format(result.config.check_type))
             builder.add()
 
+        # Checks that did not run, e.g. in fail-fast mode
+        if skipped:
+            builder.add(
+                ':fast_forward: **Skipped ({})** - *These did not run because of '
+                'a previous failure or the deadline*'.format(len(skipped))
+            )
+            for config in skipped:
+                builder.add('- **{}**'.format(config.check_type))
+            builder.add()
+
         if self.details_url:
             builder.add(
                 '\nVisit the [details page]({}) for more information.'.format(
@@ -123,8 +133,8 @@ class PRCommentReport:
         msg = None
         show_message = self.suite.config.pr_comment_report.get('show_message', True)
         if show_message:
-            # Get the message if it exists
-            msg = result.details.get('message', '')
+            # Get the message if it exists (it is rendered at this point)
+            msg = result.message or ''
 
             # Enclose any occurrence of "...." inside ``, to make it more readable
             msg = PRCommentReport._increase_readability(msg)
@@ -144,6 +154,9 @@ class PRCommentReport:
             if not result_details:
                 details = None
             else:
+                # Imported here, because it is only needed when showing failures
+                import pyaml
+
                 details = PRCommentReport._increase_readability(
                     pyaml.dump(result_details)
                 )
@@ -0,0 +1,123 @@
+"""Includes functionality for reporting where the time of a run went."""
+
+from typing import List
+
+from totem.instrumentation import CALL_HTTP, CALL_SUBPROCESS, STAGES, Recorder
+from totem.reporting import StringBuilder
+from totem.reporting.console import Color
+
+
+class ProfileReport:
+    """Creates a breakdown of the time of a run, per stage, from the
+    measurements of a Recorder (see `totem.instrumentation`).
+
+    Some measurements are nested (e.g. a call to the Github API happens
+    while the content of a check is fetched) and checks can run in parallel,
+    so the durations do not necessarily add up to the total.
+    """
+
+    def __init__(self, recorder: Recorder, total: float):
+        """Constructor.
+
+        :param Recorder recorder: the recorder that was active during the run
+        :param float total: the total duration of the run, in seconds
+        """
+        self.recorder = recorder
+        self.total = total
+
+    def get_data(self) -> dict:
+        """Return the breakdown in a form that can be serialized as JSON.
+
+        :return: a dictionary like
+            {
+              'total': <seconds>,
+              'stages': [
+                {'stage': 'fetch', 'name': 'GitCommitsContentProvider',
+                 'calls': 1, 'duration': <seconds>},
+                ...
+              ],
+              'calls': [
+                {'kind': 'subprocess', 'description': 'git log', 'count': 2},
+                ...
+              ],
+            }
+        :rtype: dict
+        """
+        return {
+            'total': self.total,
+            'stages': [
+                {
+                    'stage': stage,
+                    'name': name,
+                    'calls': len(durations),
+                    'duration': sum(durations),
+                }
+                for (stage, name), durations in self._get_timings()
+            ],
+            'calls': [
+                {'kind': kind, 'description': description, 'count': count}
+                for (kind, description), count in sorted(
+                    self.recorder.calls.items(), key=lambda x: (x[0][0], -x[1])
+                )
+            ],
+        }
+
+    def get_summary(self) -> str:
+        """Return a table with the duration of each stage.
+
+        :rtype: str
+        """
+        builder = StringBuilder()
+        builder.add()
+        builder.add(
+            Color.format('[h]PROFILE[end] (total: {:.1f} ms)'.format(self.total * 1000))
+        )
+        builder.add('-------')
+        builder.add(
+            '{:<8}{:<40}{:>7}{:>12}{:>8}'.format('Stage', 'Name', 'Calls', 'ms', '%')
+        )
+        for (stage, name), durations in self._get_timings():
+            duration = sum(durations)
+            builder.add(
+                '{:<8}{:<40}{:>7}{:>12.2f}{:>7.1f}%'.format(
+                    stage,
+                    name[:39],
+                    len(durations),
+                    duration * 1000,
+                    duration / self.total * 100 if self.total else 0,
+                )
+            )
+
+        builder.add()
+        for kind, label in (
+            (CALL_SUBPROCESS, 'Subprocesses'),
+            (CALL_HTTP, 'HTTP requests'),
+        ):
+            details = [
+                '{}: {}'.format(description, count)
+                for (k, description), count in sorted(
+                    self.recorder.calls.items(), key=lambda x: -x[1]
+                )
+                if k == kind
+            ]
+            builder.add(
+                '{}: {}{}'.format(
+                    label,
+                    self.recorder.get_call_count(kind),
+                    ' ({})'.format(', '.join(details)) if details else '',
+                )
+            )
+        return builder.render()
+
+    def _get_timings(self) -> List[tuple]:
+        """Return the measurements, ordered by stage and then
+        by the order they were first recorded in.
+
+        :return: a list of ((stage, name), durations) items
+        :rtype: list
+        """
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        return sorted(
+            self.recorder.timings.items(),
+            key=lambda x: order.get(x[0][0], len(STAGES)),
+        )
@@ -0,0 +1,161 @@
+"""Contains the export of traces to a local file, in the JSON encoding
+of the OpenTelemetry protocol (OTLP), so that no collector is needed.
+
+Tracing is enabled by setting TOTEM_OTLP_TRACES_FILE to the path
+of the file. Each run appends a line to it, with an
+ExportTraceServiceRequest that contains all its spans, e.g.:
+
+    suite → check → provider fetch → HTTP request or Git subprocess
+
+The file can be imported by tools that read OTLP JSON files, e.g.
+the `otlpjsonfile` receiver of the OpenTelemetry collector.
+
+Spans are created in the process that runs the suite, so checks that run
+in the `processes` execution mode only have their top-level span.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from typing import Iterator, List, Union
+
+from totem.instrumentation import Span, Tracer, tracing
+
+TRACES_FILE_ENV = 'TOTEM_OTLP_TRACES_FILE'
+
+SERVICE_NAME = 'totem'
+
+# The status codes of the OpenTelemetry protocol
+STATUS_CODE_UNSET = 0
+STATUS_CODE_ERROR = 2
+
+
+class OTLPJSONFileExporter:
+    """Writes spans to a file, in the OTLP JSON format, one line per export."""
+
+    def __init__(self, path: str):
+        """Constructor.
+
+        :param str path: the path of the file; it is created if it does not exist
+        """
+        self.path = path
+
+    def export(self, spans: List[Span]) -> bool:
+        """Append the given spans to the file, as a single line.
+
+        :param list spans: the finished spans
+        :return: True if the spans were written, False otherwise
+        :rtype: bool
+        """
+        if not spans:
+            return True
+        line = json.dumps(self.encode(spans), separators=(',', ':'))
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+        except OSError:
+            return False
+        return True
+
+    @staticmethod
+    def encode(spans: List[Span]) -> dict:
+        """Return the given spans as an ExportTraceServiceRequest,
+        in the OTLP JSON encoding.
+
+        :param list spans: the finished spans
+        :rtype: dict
+        """
+        import totem
+
+        return {
+            'resourceSpans': [
+                {
+                    'resource': {
+                        'attributes': _encode_attributes(
+                            {
+                                'service.name': SERVICE_NAME,
+                                'service.version': totem.__version__,
+                                'process.pid': os.getpid(),
+                            }
+                        )
+                    },
+                    'scopeSpans': [
+                        {
+                            'scope': {'name': 'totem'},
+                            'spans': [
+                                _encode_span(x)
+                                for x in sorted(spans, key=lambda x: x.start_time)
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+@contextmanager
+def traced_from_env() -> Iterator[Union[Tracer, None]]:
+    """Trace the block and export its spans, if TOTEM_OTLP_TRACES_FILE
+    is defined; otherwise do nothing.
+
+    :return: the active tracer, or None if tracing is not enabled
+    :rtype: Tracer
+    """
+    path = os.environ.get(TRACES_FILE_ENV)
+    if not path:
+        yield None
+        return
+
+    tracer = Tracer()
+    try:
+        with tracing(tracer):
+            yield tracer
+    finally:
+        OTLPJSONFileExporter(path).export(tracer.spans)
+
+
+def _encode_span(span: Span) -> dict:
+    """Return the given span in the OTLP JSON encoding.
+
+    :param Span span: a finished span
+    :rtype: dict
+    """
+    data = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': span.kind,
+        # 64-bit integers are encoded as strings
+        'startTimeUnixNano': str(span.start_time),
+        'endTimeUnixNano': str(span.end_time),
+        'attributes': _encode_attributes(span.attributes),
+        'status': {'code': STATUS_CODE_UNSET},
+    }
+    if span.parent_id:
+        data['parentSpanId'] = span.parent_id
+    if span.error:
+        data['status'] = {'code': STATUS_CODE_ERROR, 'message': span.error}
+    return data
+
+
+def _encode_attributes(attributes: dict) -> List[dict]:
+    """Return the given attributes in the OTLP JSON encoding.
+
+    :param dict attributes: the attributes, with string keys
+    :rtype: list
+    """
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            encoded_value = {'boolValue': value}
+        elif isinstance(value, int):
+            encoded_value = {'intValue': str(value)}
+        elif isinstance(value, float):
+            encoded_value = {'doubleValue': value}
+        else:
+            encoded_value = {'stringValue': str(value)}
+        encoded.append({'key': key, 'value': encoded_value})
+    return encoded